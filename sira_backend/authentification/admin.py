@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Utilisateur, Role, UtilisateurRole
+from .models import Utilisateur, Role, UtilisateurRole, ImportUtilisateurs
 
 class CustomUserAdmin(UserAdmin):
     # 1. Supprimez la référence à username
@@ -30,4 +30,10 @@ class CustomUserAdmin(UserAdmin):
 
 admin.site.register(Utilisateur, CustomUserAdmin)
 admin.site.register(Role)
-admin.site.register(UtilisateurRole)
\ No newline at end of file
+admin.site.register(UtilisateurRole)
+
+@admin.register(ImportUtilisateurs)
+class ImportUtilisateursAdmin(admin.ModelAdmin):
+    list_display = ('id', 'type_profil', 'statut', 'total', 'importes', 'ignores', 'date_creation')
+    list_filter = ('statut', 'type_profil')
+    exclude = ('contenu',)
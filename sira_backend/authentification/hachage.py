@@ -0,0 +1,44 @@
+"""
+Hachage des mots de passe d'un import dans un pool de processus.
+
+Les processus démarrent par `spawn`, jamais par fork : un import peut
+partir d'un thread de requête, dont les connexions et verrous ouverts ne
+doivent pas être copiés. Chaque processus réimporte donc ce module avant
+d'initialiser Django ; il ne doit importer aucun modèle.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.contrib.auth.hashers import make_password
+
+# En dessous, le démarrage du pool coûte plus cher que le hachage lui-même
+SEUIL_PARALLELE = 50
+
+
+def _initialiser_processus():
+    """Prépare Django dans un processus du pool"""
+    import django
+    from django.apps import apps
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sira_backend.settings')
+    if not apps.ready:
+        django.setup()
+
+
+def creer_pool(nombre):
+    """Pool pour hacher `nombre` mots de passe ; None s'il ne vaut pas la peine"""
+    if nombre < SEUIL_PARALLELE or (os.cpu_count() or 1) < 2:
+        return nullcontext(None)
+    return ProcessPoolExecutor(
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_initialiser_processus
+    )
+
+
+def hacher(pool, mots_de_passe):
+    if pool is None:
+        return [make_password(mot_de_passe) for mot_de_passe in mots_de_passe]
+    taille = max(1, len(mots_de_passe) // (4 * (os.cpu_count() or 1)))
+    return list(pool.map(make_password, mots_de_passe, chunksize=taille))
@@ -0,0 +1,237 @@
+"""
+Import en masse d'étudiants et d'enseignants depuis un CSV.
+
+Le fichier est entièrement validé avant toute écriture. Les mots de passe
+sont ensuite hachés en parallèle dans un pool de processus (PBKDF2 coûte
+plusieurs centaines de millisecondes par mot de passe) et les lignes sont
+insérées par lots avec `bulk_create`, chaque lot dans sa propre
+transaction. La progression est enregistrée après chaque lot : un import
+interrompu peut être repris, les comptes déjà créés étant ignorés.
+
+Le fichier contient les mots de passe en clair : il est effacé de la base
+dès que l'import est terminé ou en échec. Après un échec, on renvoie le
+fichier ; les comptes déjà créés sont ignorés.
+"""
+import csv
+import io
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from gestion_academique.models import Etudiant, Enseignant
+from gestion_academique.recherche import indexer
+from .hachage import creer_pool, hacher
+from .models import Utilisateur, Role, UtilisateurRole, ImportUtilisateurs
+from .serializers import ImportEtudiantLigneSerializer, ImportEnseignantLigneSerializer
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 500
+
+PROFILS = {
+    'ETUDIANT': {
+        'serializer': ImportEtudiantLigneSerializer,
+        'modele': Etudiant,
+        'champs': ['matricule', 'date_naissance', 'lieu_naissance', 'genre'],
+    },
+    'ENSEIGNANT': {
+        'serializer': ImportEnseignantLigneSerializer,
+        'modele': Enseignant,
+        'champs': ['specialite', 'bureau', 'est_responsable'],
+    },
+}
+
+
+def lire_csv(contenu):
+    """Lit un CSV séparé par des virgules ou des points-virgules"""
+    texte = contenu.lstrip('\ufeff')
+    try:
+        dialecte = csv.Sniffer().sniff(texte.split('\n', 1)[0], delimiters=',;')
+    except csv.Error:
+        dialecte = csv.excel
+    return list(csv.DictReader(io.StringIO(texte), dialect=dialecte))
+
+
+def valider(type_profil, lignes):
+    """
+    Valide toutes les lignes d'un fichier.
+
+    Retourne (lignes_valides, erreurs) ; les erreurs sont indexées par
+    numéro de ligne du fichier (l'en-tête étant la ligne 1). Les emails et
+    matricules sont contrôlés en une requête chacun pour tout le fichier.
+    """
+    serializer_class = PROFILS[type_profil]['serializer']
+    valides = []
+    erreurs = []
+    for numero, ligne in enumerate(lignes, start=2):
+        donnees = {cle.strip(): (valeur or '').strip() for cle, valeur in ligne.items() if cle}
+        serializer = serializer_class(data=donnees)
+        if not serializer.is_valid():
+            erreurs.append({'ligne': numero, 'erreurs': serializer.errors})
+            continue
+        valeurs = dict(serializer.validated_data)
+        valeurs['email'] = Utilisateur.objects.normalize_email(valeurs['email'])
+        valides.append((numero, valeurs))
+
+    emails_vus = set()
+    matricules_vus = set()
+    doublons = []
+    for numero, valeurs in valides:
+        if valeurs['email'] in emails_vus:
+            doublons.append({'ligne': numero, 'erreurs': {'email': ["Email en double dans le fichier"]}})
+        if valeurs.get('matricule') in matricules_vus:
+            doublons.append({'ligne': numero, 'erreurs': {'matricule': ["Matricule en double dans le fichier"]}})
+        emails_vus.add(valeurs['email'])
+        if 'matricule' in valeurs:
+            matricules_vus.add(valeurs['matricule'])
+
+    if matricules_vus:
+        # Un matricule déjà attribué n'est une erreur que s'il appartient à un autre compte
+        pris = dict(
+            Etudiant.objects.filter(matricule__in=matricules_vus)
+            .values_list('matricule', 'utilisateur__email')
+        )
+        for numero, valeurs in valides:
+            proprietaire = pris.get(valeurs['matricule'])
+            if proprietaire is not None and proprietaire != valeurs['email']:
+                doublons.append({'ligne': numero, 'erreurs': {'matricule': ["Matricule déjà attribué"]}})
+
+    erreurs += doublons
+    erreurs.sort(key=lambda erreur: erreur['ligne'])
+    return [valeurs for _, valeurs in valides], erreurs
+
+
+def creer_import(type_profil, contenu, utilisateur=None):
+    """
+    Valide un fichier et enregistre l'import s'il ne contient aucune erreur.
+    Retourne (import, erreurs) ; `import` vaut None en cas d'erreur.
+    """
+    lignes, erreurs = valider(type_profil, lire_csv(contenu))
+    if erreurs:
+        return None, erreurs
+    if not lignes:
+        return None, [{'ligne': 1, 'erreurs': {'fichier': ["Le fichier ne contient aucune ligne"]}}]
+    import_utilisateurs = ImportUtilisateurs.objects.create(
+        type_profil=type_profil,
+        contenu=contenu,
+        total=len(lignes),
+        cree_par=utilisateur
+    )
+    return import_utilisateurs, []
+
+
+def executer_import(import_id, progression=None):
+    """
+    Exécute (ou reprend) un import. `progression`, si fourni, est appelé
+    après chaque lot avec l'import à jour.
+    """
+    import_utilisateurs = ImportUtilisateurs.objects.get(pk=import_id)
+    profil = PROFILS[import_utilisateurs.type_profil]
+    _mettre_a_jour(import_id, statut='EN_COURS', message='')
+
+    try:
+        if not import_utilisateurs.contenu:
+            raise ValueError("Fichier déjà effacé : renvoyer le fichier (les comptes existants sont ignorés)")
+        lignes, erreurs = valider(import_utilisateurs.type_profil, lire_csv(import_utilisateurs.contenu))
+        if erreurs:
+            raise ValueError(f"{len(erreurs)} ligne(s) invalide(s), dont la ligne {erreurs[0]['ligne']}")
+
+        existants = set(
+            Utilisateur.objects.filter(
+                email__in=[valeurs['email'] for valeurs in lignes]
+            ).values_list('email', flat=True)
+        )
+        a_creer = [valeurs for valeurs in lignes if valeurs['email'] not in existants]
+        _mettre_a_jour(
+            import_id,
+            total=len(lignes),
+            ignores=len(existants) - import_utilisateurs.importes
+        )
+        role = Role.objects.get(nom=import_utilisateurs.type_profil)
+
+        with creer_pool(len(a_creer)) as pool:
+            for debut in range(0, len(a_creer), TAILLE_LOT):
+                lot = a_creer[debut:debut + TAILLE_LOT]
+                mots_de_passe = hacher(pool, [valeurs['password'] for valeurs in lot])
+                _inserer_lot(import_id, profil, role, lot, mots_de_passe)
+                if progression is not None:
+                    import_utilisateurs.refresh_from_db()
+                    progression(import_utilisateurs)
+
+        _mettre_a_jour(import_id, statut='TERMINE', contenu='')
+    except Exception as exc:
+        logger.exception("Échec de l'import %s", import_id)
+        # Seul le message d'erreur est gardé : le fichier et ses mots de passe sont effacés
+        _mettre_a_jour(import_id, statut='ECHEC', message=str(exc), contenu='')
+    import_utilisateurs.refresh_from_db()
+    return import_utilisateurs
+
+
+def _mettre_a_jour(import_id, **champs):
+    ImportUtilisateurs.objects.filter(pk=import_id).update(date_maj=timezone.now(), **champs)
+
+
+def _inserer_lot(import_id, profil, role, lot, mots_de_passe):
+    with transaction.atomic():
+        utilisateurs = Utilisateur.objects.bulk_create([
+            Utilisateur(
+                email=valeurs['email'],
+                password=mot_de_passe,
+                first_name=valeurs['first_name'],
+                last_name=valeurs['last_name'],
+                telephone=valeurs.get('telephone', '')
+            )
+            for valeurs, mot_de_passe in zip(lot, mots_de_passe)
+        ])
+        if any(utilisateur.pk is None for utilisateur in utilisateurs):
+            # Bases sans RETURNING : on relit les identifiants
+            ids = dict(
+                Utilisateur.objects.filter(
+                    email__in=[valeurs['email'] for valeurs in lot]
+                ).values_list('email', 'pk')
+            )
+        else:
+            ids = {utilisateur.email: utilisateur.pk for utilisateur in utilisateurs}
+
+        UtilisateurRole.objects.bulk_create([
+            UtilisateurRole(utilisateur_id=ids[valeurs['email']], role=role)
+            for valeurs in lot
+        ])
+        profil['modele'].objects.bulk_create([
+            profil['modele'](
+                utilisateur_id=ids[valeurs['email']],
+                **{champ: valeurs[champ] for champ in profil['champs']}
+            )
+            for valeurs in lot
+        ])
+        # bulk_create n'émet pas de signal : indexation explicite pour la
+        # recherche (le nom du rôle est aussi le type d'entrée)
+        indexer(role.nom, ids.values())
+        _mettre_a_jour(import_id, importes=F('importes') + len(lot))
+
+
+def _executer_en_arriere_plan(import_id):
+    try:
+        executer_import(import_id)
+    finally:
+        connection.close()
+
+
+def lancer_import(import_utilisateurs):
+    """
+    Lance l'import hors de la requête (thread) ou immédiatement si
+    `IMPORTS_EN_ARRIERE_PLAN` est désactivé.
+    Un import interrompu se reprend avec `manage.py importer_utilisateurs --reprendre ID`.
+    """
+    if getattr(settings, 'IMPORTS_EN_ARRIERE_PLAN', True):
+        threading.Thread(
+            target=_executer_en_arriere_plan,
+            args=(import_utilisateurs.pk,),
+            daemon=True
+        ).start()
+    else:
+        executer_import(import_utilisateurs.pk)
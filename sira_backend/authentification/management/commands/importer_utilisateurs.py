@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authentification.imports import creer_import, executer_import
+from authentification.models import ImportUtilisateurs
+
+
+class Command(BaseCommand):
+    help = "Importe en masse des étudiants ou des enseignants depuis un CSV, ou reprend un import interrompu"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', nargs='?', help="Chemin du fichier CSV (UTF-8, avec en-tête)")
+        parser.add_argument(
+            '--type',
+            choices=[choix for choix, _ in ImportUtilisateurs.TYPE_CHOICES],
+            help="Type de profil à créer"
+        )
+        parser.add_argument('--reprendre', type=int, metavar='ID', help="Reprend l'import indiqué")
+
+    def handle(self, *args, **options):
+        if options['reprendre']:
+            if not ImportUtilisateurs.objects.filter(pk=options['reprendre']).exists():
+                raise CommandError(f"Import {options['reprendre']} introuvable")
+            import_id = options['reprendre']
+        else:
+            if not options['fichier'] or not options['type']:
+                raise CommandError("Indiquez un fichier et --type, ou --reprendre ID")
+            with open(options['fichier'], encoding='utf-8-sig') as fichier:
+                contenu = fichier.read()
+            import_utilisateurs, erreurs = creer_import(options['type'], contenu)
+            if erreurs:
+                for erreur in erreurs:
+                    self.stderr.write(f"Ligne {erreur['ligne']} : {erreur['erreurs']}")
+                raise CommandError(f"{len(erreurs)} erreur(s), aucun compte créé")
+            import_id = import_utilisateurs.pk
+            self.stdout.write(f"Import {import_id} : {import_utilisateurs.total} ligne(s) valides")
+
+        resultat = executer_import(import_id, progression=self.afficher_progression)
+        if resultat.statut != 'TERMINE':
+            raise CommandError(
+                f"Import {import_id} en échec : {resultat.message} "
+                f"(renvoyer le fichier : les comptes déjà créés sont ignorés)"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Import {import_id} terminé : {resultat.importes} créé(s), {resultat.ignores} déjà existant(s)"
+        ))
+
+    def afficher_progression(self, import_utilisateurs):
+        self.stdout.write(
+            f"  {import_utilisateurs.importes + import_utilisateurs.ignores}/{import_utilisateurs.total}"
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportUtilisateurs',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_profil', models.CharField(choices=[('ETUDIANT', 'Étudiants'), ('ENSEIGNANT', 'Enseignants')], max_length=20)),
+                ('contenu', models.TextField()),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINE', 'Terminé'), ('ECHEC', 'Échec')], default='EN_ATTENTE', max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('importes', models.IntegerField(default=0)),
+                ('ignores', models.IntegerField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_maj', models.DateTimeField(auto_now=True)),
+                ('cree_par', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='imports', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
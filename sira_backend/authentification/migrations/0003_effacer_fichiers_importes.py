@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:05
+
+from django.db import migrations
+
+
+def effacer_fichiers(apps, schema_editor):
+    """Les fichiers des imports finis contiennent des mots de passe en clair"""
+    ImportUtilisateurs = apps.get_model('authentification', 'ImportUtilisateurs')
+    ImportUtilisateurs.objects.filter(statut__in=['TERMINE', 'ECHEC']).update(contenu='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentification', '0002_importutilisateurs'),
+    ]
+
+    operations = [
+        migrations.RunPython(effacer_fichiers, migrations.RunPython.noop),
+    ]
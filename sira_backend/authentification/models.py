@@ -56,4 +56,41 @@ class UtilisateurRole(models.Model):
     class Meta:
         unique_together = ('utilisateur', 'role')
     def __str__(self):
-        return f"{self.utilisateur.email} - {self.role.nom}"
\ No newline at end of file
+        return f"{self.utilisateur.email} - {self.role.nom}"
+
+class ImportUtilisateurs(models.Model):
+    """
+    Import en masse d'étudiants ou d'enseignants depuis un fichier CSV.
+    Le fichier, qui contient les mots de passe en clair, n'est conservé que
+    le temps de l'import (pour reprendre un import interrompu) : il est
+    effacé dès que l'import est terminé ou en échec.
+    """
+    TYPE_CHOICES = [
+        ('ETUDIANT', 'Étudiants'),
+        ('ENSEIGNANT', 'Enseignants'),
+    ]
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('TERMINE', 'Terminé'),
+        ('ECHEC', 'Échec'),
+    ]
+
+    type_profil = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    contenu = models.TextField()
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='EN_ATTENTE')
+    total = models.IntegerField(default=0)
+    importes = models.IntegerField(default=0)
+    ignores = models.IntegerField(default=0)
+    message = models.TextField(blank=True)
+    cree_par = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='imports'
+    )
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Import {self.get_type_profil_display()} #{self.pk} ({self.statut})"
@@ -3,7 +3,7 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 import re
-from .models import Utilisateur, Role, UtilisateurRole
+from .models import Utilisateur, Role, UtilisateurRole, ImportUtilisateurs
 from gestion_academique.models import Etudiant, Enseignant
 
 def validate_phone_number(value):
@@ -218,4 +218,40 @@ class AdminEnseignantCreateSerializer(serializers.ModelSerializer):
         UtilisateurRole.objects.create(utilisateur=user, role=role)
         
         # Création du profil enseignant
-        return Enseignant.objects.create(utilisateur=user, **validated_data)
\ No newline at end of file
+        return Enseignant.objects.create(utilisateur=user, **validated_data)
+
+class ImportEtudiantLigneSerializer(serializers.Serializer):
+    """
+    Ligne d'un fichier d'import d'étudiants.
+    L'unicité (email, matricule) est vérifiée pour tout le fichier à la fois.
+    """
+    email = serializers.EmailField()
+    password = serializers.CharField()
+    first_name = serializers.CharField()
+    last_name = serializers.CharField()
+    telephone = serializers.CharField(required=False, allow_blank=True, max_length=20)
+    matricule = serializers.CharField(max_length=20)
+    date_naissance = serializers.DateField()
+    lieu_naissance = serializers.CharField(max_length=100)
+    genre = serializers.ChoiceField(choices=Etudiant._meta.get_field('genre').choices)
+
+class ImportEnseignantLigneSerializer(serializers.Serializer):
+    """Ligne d'un fichier d'import d'enseignants"""
+    email = serializers.EmailField()
+    password = serializers.CharField()
+    first_name = serializers.CharField()
+    last_name = serializers.CharField()
+    telephone = serializers.CharField(required=False, allow_blank=True, max_length=20)
+    specialite = serializers.CharField(max_length=100)
+    bureau = serializers.CharField(max_length=50)
+    est_responsable = serializers.BooleanField(required=False, default=False)
+
+class ImportUtilisateursSerializer(serializers.ModelSerializer):
+    """Suivi d'un import en masse (sans le contenu du fichier)"""
+    class Meta:
+        model = ImportUtilisateurs
+        fields = [
+            'id', 'type_profil', 'statut', 'total', 'importes', 'ignores',
+            'message', 'date_creation', 'date_maj'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,8 @@
+from sira_backend.conditionnel import suivre
+from gestion_academique.models import Etudiant, Enseignant
+from .models import Utilisateur, UtilisateurRole
+
+# Tampon de version de /api/me/ : tout ce que renvoie le profil d'un utilisateur
+suivre(Utilisateur, objet=lambda utilisateur: utilisateur.pk)
+for modele in (UtilisateurRole, Etudiant, Enseignant):
+    suivre(modele, tampon=Utilisateur, objet=lambda instance: instance.utilisateur_id)
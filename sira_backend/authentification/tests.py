@@ -1,3 +1,145 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from gestion_academique.models import Etudiant, EntreeRecherche
+from .hachage import SEUIL_PARALLELE, creer_pool, hacher
+from .imports import creer_import, executer_import
+from .models import Utilisateur, Role, UtilisateurRole, ImportUtilisateurs
+
+ENTETE_ETUDIANTS = 'email;password;first_name;last_name;matricule;date_naissance;lieu_naissance;genre\n'
+
+
+def csv_etudiants(nombre, debut=0):
+    return ENTETE_ETUDIANTS + ''.join(
+        f'etudiant{i}@sira.com;motdepasse{i};Étudiant{i};Test;MAT{i:04d};2000-01-01;Goma;M\n'
+        for i in range(debut, debut + nombre)
+    )
+
+
+@override_settings(
+    IMPORTS_EN_ARRIERE_PLAN=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']
+)
+class ImportUtilisateursTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for nom in ('ETUDIANT', 'ENSEIGNANT', 'ADMIN'):
+            Role.objects.create(nom=nom)
+        cls.admin = Utilisateur.objects.create_user(
+            email='admin@sira.com', password='admin123', is_staff=True
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def envoyer(self, contenu, type_profil='ETUDIANT'):
+        return self.client.post('/api/admin/imports/', {
+            'type': type_profil,
+            'fichier': SimpleUploadedFile('import.csv', contenu.encode('utf-8')),
+        }, format='multipart')
+
+    def test_import_etudiants(self):
+        response = self.envoyer(csv_etudiants(5))
+
+        self.assertEqual(response.status_code, 202, response.content)
+        suivi = self.client.get(f"/api/admin/imports/{response.data['id']}/").data
+        self.assertEqual((suivi['statut'], suivi['importes']), ('TERMINE', 5))
+        self.assertEqual(Etudiant.objects.count(), 5)
+        self.assertEqual(UtilisateurRole.objects.filter(role__nom='ETUDIANT').count(), 5)
+        utilisateur = Utilisateur.objects.get(email='etudiant3@sira.com')
+        self.assertTrue(utilisateur.check_password('motdepasse3'))
+        self.assertEqual(utilisateur.profil_etudiant.matricule, 'MAT0003')
+        # Indexés pour la recherche malgré bulk_create
+        self.assertEqual(EntreeRecherche.objects.filter(type='ETUDIANT').count(), 5)
+
+    def test_fichier_invalide_rien_n_est_cree(self):
+        contenu = csv_etudiants(3) + 'pas-un-email;x;A;B;MAT0001;2000-13-01;Goma;Z\n'
+
+        response = self.envoyer(contenu)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([erreur['ligne'] for erreur in response.data['erreurs']], [5])
+        self.assertEqual(Etudiant.objects.count(), 0)
+
+    def test_reprise_ignore_les_comptes_deja_crees(self):
+        import_utilisateurs, _ = creer_import('ETUDIANT', csv_etudiants(4))
+        Utilisateur.objects.create_user(email='etudiant1@sira.com', password='x')
+
+        resultat = executer_import(import_utilisateurs.pk)
+
+        self.assertEqual(resultat.statut, 'TERMINE')
+        self.assertEqual((resultat.importes, resultat.ignores), (3, 1))
+        self.assertEqual(Etudiant.objects.count(), 3)
+
+
+    def assertAucunMotDePasseEnClair(self, *mots_de_passe):
+        for import_utilisateurs in ImportUtilisateurs.objects.all():
+            for mot_de_passe in mots_de_passe:
+                self.assertNotIn(mot_de_passe, import_utilisateurs.contenu)
+                self.assertNotIn(mot_de_passe, import_utilisateurs.message)
+
+    def test_mots_de_passe_effaces_apres_import(self):
+        response = self.envoyer(csv_etudiants(3))
+        self.assertEqual(response.status_code, 202)
+        self.assertAucunMotDePasseEnClair('motdepasse0', 'motdepasse1', 'motdepasse2')
+
+    def test_mots_de_passe_effaces_apres_echec(self):
+        import_utilisateurs, _ = creer_import('ETUDIANT', csv_etudiants(2))
+        # Rôle manquant : l'import échoue
+        Role.objects.filter(nom='ETUDIANT').delete()
+
+        resultat = executer_import(import_utilisateurs.pk)
+
+        self.assertEqual(resultat.statut, 'ECHEC')
+        self.assertAucunMotDePasseEnClair('motdepasse0', 'motdepasse1')
+        # Relancé sans fichier : échec explicite, rien n'est créé
+        self.assertEqual(executer_import(import_utilisateurs.pk).statut, 'ECHEC')
+        self.assertEqual(Etudiant.objects.count(), 0)
+
+
+class HachageParalleleTests(SimpleTestCase):
+
+    def test_processus_demarres_par_spawn(self):
+        with mock.patch('authentification.hachage.os.cpu_count', return_value=2):
+            with creer_pool(SEUIL_PARALLELE) as pool:
+                self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
+                empreintes = hacher(pool, ['un', 'deux'])
+
+        self.assertTrue(check_password('un', empreintes[0]))
+        self.assertTrue(check_password('deux', empreintes[1]))
+
+
+class ProfilConditionnelTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(nom='ETUDIANT')
+        cls.utilisateur = Utilisateur.objects.create_user(email='moi@sira.com', password='x')
+
+    def setUp(self):
+        self.client.force_authenticate(self.utilisateur)
+
+    def test_304_puis_invalidation_par_les_roles(self):
+        etag = self.client.get('/api/me/')['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        UtilisateurRole.objects.create(utilisateur=self.utilisateur, role=Role.objects.get())
+        response = self.client.get('/api/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['roles'], ['ETUDIANT'])
+
+    def test_etag_propre_a_chaque_utilisateur(self):
+        etag = self.client.get('/api/me/')['ETag']
+        autre = Utilisateur.objects.create_user(email='autre@sira.com', password='x')
+        self.client.force_authenticate(autre)
+
+        response = self.client.get('/api/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
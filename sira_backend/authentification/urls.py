@@ -2,6 +2,8 @@ from django.urls import path
 from .views import (
     AdminEtudiantCreateView, 
     AdminEnseignantCreateView,
+    AdminImportUtilisateursView,
+    AdminImportDetailView,
     LoginView,
     UserProfileView,
     change_password
@@ -10,6 +12,8 @@ from .views import (
 urlpatterns = [
     path('admin/create-etudiant/', AdminEtudiantCreateView.as_view(), name='admin-create-etudiant'),
     path('admin/create-enseignant/', AdminEnseignantCreateView.as_view(), name='admin-create-enseignant'),
+    path('admin/imports/', AdminImportUtilisateursView.as_view(), name='admin-imports'),
+    path('admin/imports/<int:pk>/', AdminImportDetailView.as_view(), name='admin-import-detail'),
     path('login/', LoginView.as_view(), name='login'),
     path('me/', UserProfileView.as_view(), name='current-user'),
     path('me/password/', change_password, name='change-password'),
@@ -2,14 +2,17 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .models import Utilisateur
+from sira_backend.conditionnel import ReponseConditionnelleMixin, nom_tampon
+from .imports import creer_import, lancer_import
+from .models import Utilisateur, ImportUtilisateurs
 from .serializers import (
     CustomTokenObtainPairSerializer,
     UserProfileSerializer,
     UserUpdateSerializer,
     ChangePasswordSerializer,
     AdminEtudiantCreateSerializer,
-    AdminEnseignantCreateSerializer
+    AdminEnseignantCreateSerializer,
+    ImportUtilisateursSerializer
 )
 
 class LoginView(TokenObtainPairView):
@@ -19,7 +22,7 @@ class LoginView(TokenObtainPairView):
     """
     serializer_class = CustomTokenObtainPairSerializer
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(ReponseConditionnelleMixin, generics.RetrieveUpdateAPIView):
     """
     Gestion complète du profil utilisateur :
     - GET : Récupère toutes les informations du profil
@@ -29,6 +32,10 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     http_method_names = ['get', 'patch']  # Seules ces méthodes sont autorisées
 
+    def get_tampons(self):
+        """Tampon propre à l'utilisateur : compte, rôles et profil"""
+        return [nom_tampon(Utilisateur, self.request.user.pk)]
+
     def get_serializer_class(self):
         """
         Choisit dynamiquement le serializer selon la méthode :
@@ -114,6 +121,53 @@ class AdminEnseignantCreateView(generics.CreateAPIView):
     serializer_class = AdminEnseignantCreateSerializer
     permission_classes = [permissions.IsAdminUser]
 
+class AdminImportUtilisateursView(generics.GenericAPIView):
+    """
+    Endpoint ADMIN d'import en masse depuis un fichier CSV
+    Requiert :
+    - fichier : CSV (séparateur virgule ou point-virgule) avec en-tête
+    - type : ETUDIANT ou ENSEIGNANT
+    Le fichier est entièrement validé avant toute création ; l'import
+    s'exécute ensuite hors de la requête et se suit via admin/imports/<id>/
+    """
+    serializer_class = ImportUtilisateursSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        fichier = request.FILES.get('fichier')
+        type_profil = (request.data.get('type') or '').upper()
+        if fichier is None or type_profil not in dict(ImportUtilisateurs.TYPE_CHOICES):
+            return Response(
+                {'error': 'Paramètres fichier et type (ETUDIANT ou ENSEIGNANT) requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            contenu = fichier.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return Response(
+                {'error': 'Le fichier doit être encodé en UTF-8'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        import_utilisateurs, erreurs = creer_import(type_profil, contenu, request.user)
+        if erreurs:
+            return Response({'erreurs': erreurs}, status=status.HTTP_400_BAD_REQUEST)
+
+        lancer_import(import_utilisateurs)
+        import_utilisateurs.refresh_from_db()
+        return Response(
+            self.get_serializer(import_utilisateurs).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class AdminImportDetailView(generics.RetrieveAPIView):
+    """
+    Endpoint ADMIN de suivi d'un import (statut et progression)
+    """
+    queryset = ImportUtilisateurs.objects.all()
+    serializer_class = ImportUtilisateursSerializer
+    permission_classes = [permissions.IsAdminUser]
+
 # Fonction utilitaire optionnelle pour envoi d'email
 # def send_password_change_email(user):
 #     from django.core.mail import send_mail
@@ -0,0 +1,113 @@
+"""
+Compteurs de non-lus par utilisateur (notifications et messages).
+
+Chaque événement ajuste la ligne `CompteurNonLus` de l'utilisateur par une
+mise à jour `F()`, dans la transaction qui le produit : création d'une
+notification non lue ou d'un message (+1), lecture d'une notification ou
+d'une conversation (-n). Le cache de l'utilisateur est vidé à la
+validation ; `/communication/compteurs/` le relit ensuite sans toucher
+aux tables.
+
+La ligne est créée à la première lecture, à partir des tables (notifications
+non lues, non-lus des conversations) ; `recalculer` la remet d'aplomb si
+besoin. Tant qu'elle n'existe pas, les ajustements ne font rien.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from sira_backend.routeurs import lecture_principale
+
+from .models import CompteurNonLus, Conversation, Notification
+
+PREFIXE = 'communication:compteurs:'
+# Borne le retard possible si une lecture remet en cache juste avant une
+# validation concurrente
+DUREE_CACHE = 5 * 60
+
+
+def _cle(utilisateur_id):
+    return f'{PREFIXE}{utilisateur_id}'
+
+
+def _vider_cache(utilisateur_id):
+    transaction.on_commit(lambda: cache.delete(_cle(utilisateur_id)))
+
+
+def ajuster(utilisateur_id, notifications=0, messages=0):
+    """Ajoute `notifications` et `messages` (éventuellement négatifs) aux compteurs"""
+    if not (notifications or messages):
+        return
+    CompteurNonLus.objects.filter(utilisateur_id=utilisateur_id).update(
+        notifications=F('notifications') + notifications,
+        messages=F('messages') + messages
+    )
+    _vider_cache(utilisateur_id)
+
+
+def notifications_ajoutees(utilisateur_ids):
+    """Une notification non lue de plus pour chacun de `utilisateur_ids`, en une mise à jour"""
+    utilisateur_ids = list(utilisateur_ids)
+    if not utilisateur_ids:
+        return
+    CompteurNonLus.objects.filter(utilisateur_id__in=utilisateur_ids).update(
+        notifications=F('notifications') + 1
+    )
+    transaction.on_commit(
+        lambda: cache.delete_many([_cle(utilisateur_id) for utilisateur_id in utilisateur_ids])
+    )
+
+
+def valeurs_reelles(utilisateur_id):
+    """Compteurs calculés à partir des tables"""
+    messages = Conversation.objects.filter(
+        Q(participant_a_id=utilisateur_id) | Q(participant_b_id=utilisateur_id)
+    ).aggregate(
+        total=Coalesce(Sum('non_lus_a', filter=Q(participant_a_id=utilisateur_id)), 0)
+        + Coalesce(Sum('non_lus_b', filter=Q(participant_b_id=utilisateur_id)), 0)
+    )['total']
+    return {
+        'notifications': Notification.objects.filter(utilisateur_id=utilisateur_id, est_lue=False).count(),
+        'messages': messages,
+    }
+
+
+def recalculer(utilisateur_id):
+    """Réaligne la ligne de compteurs sur les tables et la retourne"""
+    with transaction.atomic():
+        compteur, _ = CompteurNonLus.objects.update_or_create(
+            utilisateur_id=utilisateur_id,
+            defaults=valeurs_reelles(utilisateur_id)
+        )
+    _vider_cache(utilisateur_id)
+    return compteur
+
+
+def compteurs(utilisateur_id):
+    """{'notifications': n, 'messages': m}, depuis le cache si possible"""
+    cle = _cle(utilisateur_id)
+    valeurs = cache.get(cle)
+    if valeurs is None:
+        # Jamais d'état en retard d'une réplique dans le cache
+        with lecture_principale():
+            compteur = CompteurNonLus.objects.filter(utilisateur_id=utilisateur_id).first()
+            if compteur is None:
+                compteur = recalculer(utilisateur_id)
+        valeurs = {'notifications': compteur.notifications, 'messages': compteur.messages}
+        cache.set(cle, valeurs, timeout=DUREE_CACHE)
+    return valeurs
+
+
+def notifications_lues(utilisateur_id, notifications=None):
+    """
+    Marque comme lues, en une mise à jour, les notifications non lues de
+    l'utilisateur (parmi `notifications` si fourni) ; retourne leur nombre.
+    Le compteur baisse du nombre exact de lignes modifiées.
+    """
+    if notifications is None:
+        notifications = Notification.objects.all()
+    with transaction.atomic():
+        nombre = notifications.filter(utilisateur_id=utilisateur_id, est_lue=False).update(est_lue=True)
+        ajuster(utilisateur_id, notifications=-nombre)
+    return nombre
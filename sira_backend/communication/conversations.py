@@ -0,0 +1,100 @@
+"""
+Conversations entre deux utilisateurs.
+
+Avant son insertion, chaque message est rattaché à la conversation de sa
+paire d'utilisateurs, créée au premier message. Après l'insertion, une
+seule mise à jour fait avancer la conversation : dernier message, date
+d'activité et compteur de non-lus du destinataire (incrémenté par `F()`,
+sans lecture préalable). La boîte de réception se lit ensuite en une
+requête sur les index (participant, dernière activité).
+
+Les compteurs de non-lus de chaque utilisateur (compteurs.py) suivent les
+mêmes événements.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from .compteurs import ajuster
+from .models import Conversation
+
+
+def paire(premier_id, second_id):
+    """Identifiants des participants dans l'ordre de stockage"""
+    return (premier_id, second_id) if premier_id <= second_id else (second_id, premier_id)
+
+
+def conversation_entre(expediteur_id, destinataire_id):
+    participant_a_id, participant_b_id = paire(expediteur_id, destinataire_id)
+    conversation, _ = Conversation.objects.get_or_create(
+        participant_a_id=participant_a_id,
+        participant_b_id=participant_b_id,
+        defaults={'derniere_activite': timezone.now()}
+    )
+    return conversation
+
+
+def champ_non_lus(conversation, utilisateur_id):
+    """Colonne du compteur de non-lus de `utilisateur_id` dans la conversation"""
+    return 'non_lus_a' if utilisateur_id == conversation.participant_a_id else 'non_lus_b'
+
+
+def message_ajoute(message):
+    champ = champ_non_lus(message.conversation, message.destinataire_id)
+    Conversation.objects.filter(pk=message.conversation_id).update(
+        dernier_message=message,
+        derniere_activite=message.date_envoi,
+        **{champ: F(champ) + 1}
+    )
+    ajuster(message.destinataire_id, messages=1)
+
+
+def message_supprime(message):
+    """
+    Retire des non-lus un message supprimé qui n'avait pas été lu. Les
+    non-lus d'un participant étant ses derniers messages reçus, le message
+    l'était si le destinataire en a reçu moins que son compteur depuis.
+    """
+    with transaction.atomic():
+        conversation = Conversation.objects.select_for_update().filter(pk=message.conversation_id).first()
+        if conversation is None:
+            return
+        recus = conversation.messages.filter(destinataire_id=message.destinataire_id)
+        plus_recents = recus.filter(
+            Q(date_envoi__gt=message.date_envoi) | Q(date_envoi=message.date_envoi, pk__gt=message.pk)
+        ).count()
+        champ = champ_non_lus(conversation, message.destinataire_id)
+        champs = {}
+        if plus_recents < getattr(conversation, champ):
+            champs[champ] = F(champ) - 1
+            ajuster(message.destinataire_id, messages=-1)
+        if conversation.dernier_message_id is None:
+            # Le dernier message était celui-ci (remis à NULL par la suppression)
+            champs['dernier_message'] = conversation.messages.order_by('-date_envoi', '-pk').first()
+        if champs:
+            Conversation.objects.filter(pk=conversation.pk).update(**champs)
+
+
+def marquer_lue(conversation, utilisateur_id):
+    """Remet à zéro les non-lus de `utilisateur_id` et retourne leur nombre"""
+    champ = champ_non_lus(conversation, utilisateur_id)
+    with transaction.atomic():
+        non_lus = Conversation.objects.select_for_update().filter(
+            pk=conversation.pk
+        ).values_list(champ, flat=True).first()
+        if not non_lus:
+            return 0
+        Conversation.objects.filter(pk=conversation.pk).update(**{champ: 0})
+        ajuster(utilisateur_id, messages=-non_lus)
+    return non_lus
+
+
+def boite_de_reception(utilisateur):
+    """Conversations d'un utilisateur, la plus récente d'abord, avec ses non-lus (`non_lus`)"""
+    return Conversation.objects.filter(
+        Q(participant_a=utilisateur) | Q(participant_b=utilisateur)
+    ).annotate(
+        non_lus=Case(When(participant_a=utilisateur, then=F('non_lus_a')), default=F('non_lus_b'))
+    ).select_related(
+        'participant_a', 'participant_b', 'dernier_message'
+    ).order_by('-derniere_activite')
@@ -0,0 +1,84 @@
+"""
+Diffusion d'une notification à de nombreux utilisateurs.
+
+Les destinataires sont traités par lots de `TAILLE_LOT`, chacun dans sa
+transaction. Dans un lot, une requête repère ceux qui ont déjà une
+notification non lue du même type et du même lien : elle est rafraîchie
+(une mise à jour pour tout le lot) au lieu d'être dupliquée. Les autres
+reçoivent la leur par un `bulk_create`, et leurs compteurs de non-lus
+avancent en une mise à jour. Les connexions en flux sont prévenues à la
+validation de chaque lot.
+
+`lancer_diffusion` exécute la diffusion hors de la requête (thread), sauf
+si `NOTIFICATIONS_EN_ARRIERE_PLAN` est désactivé.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .compteurs import notifications_ajoutees
+from .models import Notification
+from .temps_reel import notifications_diffusees
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 500
+
+
+def diffuser(utilisateur_ids, contenu, type, lien='', contenu_regroupe=None):
+    """
+    Notifie chacun de `utilisateur_ids` (doublons ignorés). Une notification
+    non lue identique déjà en attente prend le texte `contenu_regroupe`
+    (par défaut `contenu`) et la date du jour.
+    Retourne {'creees': n, 'regroupees': m}.
+    """
+    utilisateur_ids = sorted(set(utilisateur_ids))
+    bilan = {'creees': 0, 'regroupees': 0}
+    for debut in range(0, len(utilisateur_ids), TAILLE_LOT):
+        lot = utilisateur_ids[debut:debut + TAILLE_LOT]
+        with transaction.atomic():
+            en_attente = Notification.objects.filter(
+                utilisateur_id__in=lot, type=type, lien=lien, est_lue=False
+            )
+            # Verrouillées : une lecture concurrente ne peut s'intercaler
+            # entre le repérage et le rafraîchissement
+            deja_notifies = set(en_attente.select_for_update().values_list('utilisateur_id', flat=True))
+            maintenant = timezone.now()
+            if deja_notifies:
+                en_attente.update(contenu=contenu_regroupe or contenu, date_creation=maintenant)
+                notifications_diffusees(deja_notifies, contenu_regroupe or contenu, type, lien, maintenant)
+            nouveaux = [utilisateur_id for utilisateur_id in lot if utilisateur_id not in deja_notifies]
+            Notification.objects.bulk_create([
+                Notification(utilisateur_id=utilisateur_id, contenu=contenu, type=type, lien=lien)
+                for utilisateur_id in nouveaux
+            ])
+            # bulk_create n'émet pas post_save : compteurs ajustés pour tout le lot
+            notifications_ajoutees(nouveaux)
+            notifications_diffusees(nouveaux, contenu, type, lien, maintenant)
+        bilan['creees'] += len(nouveaux)
+        bilan['regroupees'] += len(deja_notifies)
+    return bilan
+
+
+def _executer_en_arriere_plan(fonction, args):
+    try:
+        fonction(*args)
+    except Exception:
+        logger.exception("Échec de la diffusion de notifications")
+    finally:
+        connection.close()
+
+
+def lancer_diffusion(fonction, *args):
+    """
+    Exécute `fonction(*args)`, qui diffuse des notifications, hors de la
+    requête (thread) ou immédiatement si `NOTIFICATIONS_EN_ARRIERE_PLAN`
+    est désactivé
+    """
+    if getattr(settings, 'NOTIFICATIONS_EN_ARRIERE_PLAN', True):
+        threading.Thread(target=_executer_en_arriere_plan, args=(fonction, args), daemon=True).start()
+    else:
+        fonction(*args)
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Greatest, Least
+
+
+def remplir_conversations(apps, schema_editor):
+    """Une conversation par paire existante ; les anciens messages sont considérés comme lus"""
+    Message = apps.get_model('communication', 'Message')
+    Conversation = apps.get_model('communication', 'Conversation')
+    paires = Message.objects.values(
+        a=Least('expediteur_id', 'destinataire_id'),
+        b=Greatest('expediteur_id', 'destinataire_id'),
+    ).annotate(dernier=Max('pk'), derniere_activite=Max('date_envoi')).order_by()
+    Conversation.objects.bulk_create([
+        Conversation(
+            participant_a_id=paire['a'],
+            participant_b_id=paire['b'],
+            dernier_message_id=paire['dernier'],
+            derniere_activite=paire['derniere_activite'],
+        )
+        for paire in paires.iterator()
+    ], batch_size=1000)
+    Message.objects.update(conversation=Subquery(
+        Conversation.objects.filter(
+            participant_a=Least(OuterRef('expediteur_id'), OuterRef('destinataire_id')),
+            participant_b=Greatest(OuterRef('expediteur_id'), OuterRef('destinataire_id')),
+        ).values('pk')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0002_index_acces'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('derniere_activite', models.DateTimeField()),
+                ('non_lus_a', models.IntegerField(default=0)),
+                ('non_lus_b', models.IntegerField(default=0)),
+                ('dernier_message', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='communication.message')),
+                ('participant_a', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='conversations_a', to=settings.AUTH_USER_MODEL)),
+                ('participant_b', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='conversations_b', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='communication.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-date_envoi'], name='message_conv_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['participant_a', '-derniere_activite'], name='conv_a_activite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['participant_b', '-derniere_activite'], name='conv_b_activite_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('participant_a', 'participant_b'), name='conversation_paire_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.CheckConstraint(condition=models.Q(('participant_a__lte', models.F('participant_b'))), name='conversation_paire_ordonnee'),
+        ),
+        migrations.RunPython(remplir_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentification', '0002_importutilisateurs'),
+        ('communication', '0003_conversations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurNonLus',
+            fields=[
+                ('utilisateur', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='compteur_non_lus', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('notifications', models.IntegerField(default=0)),
+                ('messages', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
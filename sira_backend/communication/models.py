@@ -13,13 +13,30 @@ class Notification(models.Model):
     utilisateur = models.ForeignKey(
         'authentification.Utilisateur',
         on_delete=models.CASCADE,
-        related_name='notifications'
+        related_name='notifications',
+        db_index=False
     )
     contenu = models.TextField()
     type = models.CharField(max_length=50, choices=TYPE_CHOICES)
     date_creation = models.DateTimeField(auto_now_add=True)
     est_lue = models.BooleanField(default=False)
     lien = models.URLField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Remplace l'index simple de la clé étrangère : sert aussi le
+            # filtre par utilisateur seul, déjà trié
+            models.Index(
+                fields=['utilisateur', '-date_creation'],
+                name='notif_util_date_idx'
+            ),
+            # Index partiel : seules les notifications non lues y figurent
+            models.Index(
+                fields=['utilisateur', '-date_creation'],
+                name='notif_non_lues_idx',
+                condition=models.Q(est_lue=False)
+            ),
+        ]
     
     def __str__(self):
         return f"{self.type} pour {self.utilisateur}"
@@ -28,20 +45,104 @@ class Message(models.Model):
     expediteur = models.ForeignKey(
         'authentification.Utilisateur',
         on_delete=models.CASCADE,
-        related_name='messages_envoyes'
+        related_name='messages_envoyes',
+        db_index=False
     )
     destinataire = models.ForeignKey(
         'authentification.Utilisateur',
         on_delete=models.CASCADE,
-        related_name='messages_recus'
+        related_name='messages_recus',
+        db_index=False
+    )
+    # Renseignée à l'enregistrement (voir signals.py) ; vide uniquement
+    # pour un message en cours de création
+    conversation = models.ForeignKey(
+        'Conversation',
+        on_delete=models.CASCADE,
+        related_name='messages',
+        null=True,
+        db_index=False
     )
     contenu = models.TextField()
     date_envoi = models.DateTimeField(auto_now_add=True)
     est_archive = models.BooleanField(default=False)
+
+    class Meta:
+        # Les index composites couvrent aussi le filtre par clé étrangère seule
+        indexes = [
+            models.Index(fields=['expediteur', '-date_envoi'], name='message_exp_date_idx'),
+            models.Index(fields=['destinataire', '-date_envoi'], name='message_dest_date_idx'),
+            models.Index(fields=['conversation', '-date_envoi'], name='message_conv_date_idx'),
+        ]
     
     def __str__(self):
         return f"De {self.expediteur} à {self.destinataire}"
 
+class Conversation(models.Model):
+    """
+    Fil de discussion entre deux utilisateurs, tenu à jour à chaque message.
+
+    La paire n'est pas ordonnée : `participant_a` est toujours celui de plus
+    petit identifiant. Chaque participant a son compteur de messages non
+    lus ; la boîte de réception se lit sans parcourir les messages.
+    """
+    participant_a = models.ForeignKey(
+        'authentification.Utilisateur',
+        on_delete=models.CASCADE,
+        related_name='conversations_a',
+        db_index=False
+    )
+    participant_b = models.ForeignKey(
+        'authentification.Utilisateur',
+        on_delete=models.CASCADE,
+        related_name='conversations_b',
+        db_index=False
+    )
+    dernier_message = models.ForeignKey(
+        Message,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    derniere_activite = models.DateTimeField()
+    non_lus_a = models.IntegerField(default=0)
+    non_lus_b = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['participant_a', 'participant_b'], name='conversation_paire_unique'),
+            models.CheckConstraint(
+                condition=models.Q(participant_a__lte=models.F('participant_b')),
+                name='conversation_paire_ordonnee'
+            ),
+        ]
+        indexes = [
+            # Boîte de réception de chacun des deux participants
+            models.Index(fields=['participant_a', '-derniere_activite'], name='conv_a_activite_idx'),
+            models.Index(fields=['participant_b', '-derniere_activite'], name='conv_b_activite_idx'),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.participant_a} / {self.participant_b}"
+
+class CompteurNonLus(models.Model):
+    """
+    Nombre de notifications et de messages non lus d'un utilisateur, tenu à
+    jour à chaque création et lecture (voir compteurs.py) : le badge du
+    tableau de bord se lit sans compter les tables.
+    """
+    utilisateur = models.OneToOneField(
+        'authentification.Utilisateur',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='compteur_non_lus'
+    )
+    notifications = models.IntegerField(default=0)
+    messages = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Non-lus de {self.utilisateur}"
+
 class GroupeMessage(models.Model):
     nom = models.CharField(max_length=100)
     date_creation = models.DateField(auto_now_add=True)
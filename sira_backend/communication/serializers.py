@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Notification, Message, GroupeMessage, MembreGroupe
+from .models import Notification, Message, Conversation, GroupeMessage, MembreGroupe
 from authentification.models import Utilisateur
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -26,6 +26,25 @@ class NotificationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Type de notification invalide")
         return value
 
+class LectureNotificationsSerializer(serializers.Serializer):
+    """
+    Filtres de `marquer_tout_comme_lu` : type de notification et date limite
+    (notifications créées jusqu'à cette date incluse)
+    """
+    type = serializers.ChoiceField(choices=Notification.TYPE_CHOICES, required=False)
+    avant = serializers.DateTimeField(required=False)
+
+class SelectionSerializer(serializers.Serializer):
+    """Identifiants d'une sélection d'objets pour une opération groupée"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+
+class ArchivageMessagesSerializer(SelectionSerializer):
+    est_archive = serializers.BooleanField(default=True)
+
 class MessageSerializer(serializers.ModelSerializer):
     expediteur_id = serializers.PrimaryKeyRelatedField(
         queryset=Utilisateur.objects.all(),
@@ -49,10 +68,58 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = [
-            'id', 'expediteur_id', 'expediteur_nom', 'destinataire_id',
+            'id', 'conversation', 'expediteur_id', 'expediteur_nom', 'destinataire_id',
             'destinataire_nom', 'contenu', 'date_envoi', 'est_archive'
         ]
-        read_only_fields = ['date_envoi']
+        read_only_fields = ['conversation', 'date_envoi']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if isinstance(self.instance, Message):
+            # Un message reste dans la conversation de ses participants :
+            # ils ne changent pas à la modification
+            del fields['expediteur_id']
+            del fields['destinataire_id']
+        return fields
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """
+    Conversation vue par l'utilisateur de la requête : son interlocuteur,
+    le dernier message et ses propres non-lus (annotation `non_lus`)
+    """
+    contact_id = serializers.SerializerMethodField()
+    contact_nom = serializers.SerializerMethodField()
+    dernier_message = serializers.SerializerMethodField()
+    non_lus = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Conversation
+        fields = [
+            'id', 'contact_id', 'contact_nom', 'dernier_message',
+            'derniere_activite', 'non_lus'
+        ]
+        read_only_fields = fields
+
+    def contact(self, obj):
+        utilisateur = self.context['request'].user
+        return obj.participant_b if obj.participant_a_id == utilisateur.pk else obj.participant_a
+
+    def get_contact_id(self, obj):
+        return self.contact(obj).pk
+
+    def get_contact_nom(self, obj):
+        return self.contact(obj).get_full_name()
+
+    def get_dernier_message(self, obj):
+        message = obj.dernier_message
+        if message is None:
+            return None
+        return {
+            'id': message.pk,
+            'expediteur_id': message.expediteur_id,
+            'contenu': message.contenu,
+            'date_envoi': serializers.DateTimeField().to_representation(message.date_envoi),
+        }
 
 class MembreGroupeSerializer(serializers.ModelSerializer):
     utilisateur_id = serializers.PrimaryKeyRelatedField(
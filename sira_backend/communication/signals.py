@@ -0,0 +1,63 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .compteurs import ajuster
+from .conversations import conversation_entre, message_ajoute, message_supprime
+from .models import Conversation, Message, Notification
+from .temps_reel import message_publie, notification_publiee
+
+
+@receiver(pre_save, sender=Message)
+def rattacher_message(sender, instance, **kwargs):
+    if instance.conversation_id is None:
+        instance.conversation = conversation_entre(instance.expediteur_id, instance.destinataire_id)
+
+
+@receiver(post_save, sender=Message)
+def message_enregistre(sender, instance, created, **kwargs):
+    if created:
+        message_ajoute(instance)
+        message_publie(instance)
+
+
+@receiver(post_delete, sender=Message)
+def message_efface(sender, instance, origin=None, **kwargs):
+    # Supprimé avec sa conversation ou un utilisateur : les compteurs sont
+    # corrigés par `conversation_supprimee`
+    modele = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if modele is Message:
+        message_supprime(instance)
+
+
+@receiver(post_delete, sender=Conversation)
+def conversation_supprimee(sender, instance, **kwargs):
+    ajuster(instance.participant_a_id, messages=-instance.non_lus_a)
+    ajuster(instance.participant_b_id, messages=-instance.non_lus_b)
+
+
+@receiver(pre_save, sender=Notification)
+def lire_etat_notification(sender, instance, **kwargs):
+    # État enregistré, pour repérer une notification lue (ou remise non lue)
+    # par un simple save()
+    instance._etait_non_lue = None
+    if not instance._state.adding:
+        instance._etait_non_lue = Notification.objects.filter(
+            pk=instance.pk, est_lue=False
+        ).exists()
+
+
+@receiver(post_save, sender=Notification)
+def notification_enregistree(sender, instance, created, **kwargs):
+    avant = False if created else instance._etait_non_lue
+    apres = not instance.est_lue
+    if avant is not None and avant != apres:
+        ajuster(instance.utilisateur_id, notifications=1 if apres else -1)
+    if created:
+        notification_publiee(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_supprimee(sender, instance, **kwargs):
+    if not instance.est_lue:
+        ajuster(instance.utilisateur_id, notifications=-1)
@@ -0,0 +1,85 @@
+"""
+Flux Server-Sent Events des notifications et messages d'un utilisateur.
+
+Les signaux publient (voir `sira_backend.evenements`) chaque notification
+et chaque message créés ; `/communication/flux/` les pousse au navigateur
+dès leur validation, au lieu d'un sondage périodique. Le jeton JWT n'est
+vérifié qu'à l'ouverture du flux. `EventSource` ne permettant pas d'en-tête
+`Authorization`, le jeton d'accès peut aussi passer dans `?jeton=`.
+
+Le flux suppose un service ASGI (`sira_backend/asgi.py`) : sous WSGI, il
+occuperait un worker pour toute la durée de la connexion.
+"""
+import asyncio
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from sira_backend.evenements import backend, publier
+
+# Commentaire envoyé sur une connexion inactive, pour les proxys qui
+# coupent les connexions muettes
+INTERVALLE_PING = 15
+# Délai de reconnexion demandé au navigateur, en millisecondes
+RECONNEXION = 3000
+
+
+def notification_publiee(notification):
+    publier([notification.utilisateur_id], 'notification', {
+        'id': notification.pk,
+        'type': notification.type,
+        'contenu': notification.contenu,
+        'lien': notification.lien,
+        'date_creation': notification.date_creation,
+    })
+
+
+def notifications_diffusees(utilisateur_ids, contenu, type, lien, date_creation):
+    """Notifications de masse (sans identifiant, une publication pour le lot)"""
+    publier(utilisateur_ids, 'notification', {
+        'type': type,
+        'contenu': contenu,
+        'lien': lien,
+        'date_creation': date_creation,
+    })
+
+
+def message_publie(message):
+    # L'expéditeur le reçoit aussi, pour ses autres onglets et appareils
+    publier({message.expediteur_id, message.destinataire_id}, 'message', {
+        'id': message.pk,
+        'conversation': message.conversation_id,
+        'expediteur_id': message.expediteur_id,
+        'destinataire_id': message.destinataire_id,
+        'contenu': message.contenu,
+        'date_envoi': message.date_envoi,
+    })
+
+
+def utilisateur_du_flux(request):
+    """Utilisateur du jeton (`?jeton=` ou en-tête Authorization), sinon None"""
+    authentification = JWTAuthentication()
+    brut = request.GET.get('jeton')
+    if not brut:
+        entete = authentification.get_header(request)
+        brut = authentification.get_raw_token(entete) if entete else None
+    if not brut:
+        return None
+    try:
+        return authentification.get_user(authentification.get_validated_token(brut))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def evenements(utilisateur_id):
+    """Contenu du flux SSE : les événements de l'utilisateur, jusqu'à la déconnexion"""
+    async with backend().abonnement(utilisateur_id) as file:
+        yield f'retry: {RECONNEXION}\n\n'
+        while True:
+            try:
+                type_evenement, donnees = await asyncio.wait_for(file.get(), INTERVALLE_PING)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield f'event: {type_evenement}\ndata: {donnees}\n\n'
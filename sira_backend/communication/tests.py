@@ -1,3 +1,469 @@
+import asyncio
+import json
+from collections import Counter
+from unittest import skipUnless
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentification.models import Utilisateur
+from sira_backend.evenements import BackendMemoire, backend
+from .compteurs import valeurs_reelles
+from .conversations import boite_de_reception
+from .diffusion import TAILLE_LOT, diffuser
+from .models import Notification, Message, Conversation, CompteurNonLus, GroupeMessage, MembreGroupe
+
+
+class BudgetRequetesTests(APITestCase):
+    """Les listes de communication s'exécutent en un nombre de requêtes fixe"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = Utilisateur.objects.create_user(email='moi@sira.com', password='x')
+        contacts = [
+            Utilisateur.objects.create_user(email=f'contact{i}@sira.com', password='x')
+            for i in range(5)
+        ]
+        groupe = GroupeMessage.objects.create(nom='Licence 1')
+        MembreGroupe.objects.create(groupe=groupe, utilisateur=cls.utilisateur, role='ADMIN')
+        for i, contact in enumerate(contacts):
+            Notification.objects.create(
+                utilisateur=cls.utilisateur, contenu=f'Note {i}', type='NOTE'
+            )
+            Message.objects.create(expediteur=contact, destinataire=cls.utilisateur, contenu='Bonjour')
+            Message.objects.create(expediteur=cls.utilisateur, destinataire=contact, contenu='Salut')
+            MembreGroupe.objects.create(groupe=groupe, utilisateur=contact)
+
+    def setUp(self):
+        self.client.force_authenticate(self.utilisateur)
+
+    def assertBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_listes(self):
+        self.assertBudget('/communication/notifications/', 1)
+        self.assertBudget('/communication/notifications/non_lues/', 1)
+        self.assertBudget('/communication/messages/', 1)
+        self.assertBudget('/communication/messages/conversations/', 1)
+        self.assertBudget('/communication/conversations/', 1)
+        self.assertBudget('/communication/membres-groupes/', 1)
+        # Groupes + membres préchargés
+        self.assertBudget('/communication/groupes/', 2)
+
+
+class ConversationTests(APITestCase):
+    """Conversations dénormalisées : une par paire, tenues à jour à chaque message"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carole = [
+            Utilisateur.objects.create_user(email=f'{nom}@sira.com', password='x')
+            for nom in ('alice', 'bob', 'carole')
+        ]
+
+    def envoyer(self, expediteur, destinataire, contenu='Bonjour'):
+        return Message.objects.create(expediteur=expediteur, destinataire=destinataire, contenu=contenu)
+
+    def test_une_conversation_par_paire(self):
+        aller = self.envoyer(self.alice, self.bob)
+        retour = self.envoyer(self.bob, self.alice)
+        self.assertEqual(aller.conversation_id, retour.conversation_id)
+        self.assertEqual(Conversation.objects.count(), 1)
+
+    def test_compteurs_et_dernier_message(self):
+        self.envoyer(self.alice, self.bob)
+        self.envoyer(self.alice, self.bob)
+        dernier = self.envoyer(self.bob, self.alice, 'Salut')
+
+        self.client.force_authenticate(self.bob)
+        conversation = self.client.get('/communication/conversations/').data['results'][0]
+        self.assertEqual(conversation['contact_id'], self.alice.pk)
+        self.assertEqual(conversation['non_lus'], 2)
+        self.assertEqual(conversation['dernier_message']['id'], dernier.pk)
+
+        response = self.client.post(f"/communication/conversations/{conversation['id']}/lire/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(boite_de_reception(self.bob).get().non_lus, 0)
+        # Les non-lus d'Alice ne bougent pas
+        self.assertEqual(boite_de_reception(self.alice).get().non_lus, 1)
+
+    def test_boite_de_reception(self):
+        self.envoyer(self.alice, self.bob)
+        self.envoyer(self.carole, self.alice)
+        self.envoyer(self.bob, self.carole)
+
+        self.client.force_authenticate(self.alice)
+        contacts = [
+            conversation['contact_id']
+            for conversation in self.client.get('/communication/messages/conversations/').data['results']
+        ]
+        self.assertEqual(contacts, [self.carole.pk, self.bob.pk])
+
+    def test_messages_et_acces(self):
+        self.envoyer(self.alice, self.bob, 'Un')
+        self.envoyer(self.bob, self.alice, 'Deux')
+        conversation = Conversation.objects.get()
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(f'/communication/conversations/{conversation.pk}/messages/')
+        self.assertEqual([message['contenu'] for message in response.data['results']], ['Deux', 'Un'])
+
+        self.client.force_authenticate(self.carole)
+        response = self.client.get(f'/communication/conversations/{conversation.pk}/messages/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_participants_fixes_a_la_modification(self):
+        message = self.envoyer(self.alice, self.bob)
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.patch(f'/communication/messages/{message.pk}/', {
+            'destinataire_id': self.carole.pk, 'contenu': 'Corrigé'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        message.refresh_from_db()
+        self.assertEqual(message.contenu, 'Corrigé')
+        self.assertEqual(message.destinataire_id, self.bob.pk)
+        self.assertEqual(boite_de_reception(self.bob).get().non_lus, 1)
+        self.assertFalse(boite_de_reception(self.carole).exists())
+
+        # Envoi : les participants restent requis
+        response = self.client.post('/communication/messages/', {'contenu': 'Seul'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('destinataire_id', response.data)
+
+
+class CompteursTests(APITestCase):
+    """Compteurs de non-lus tenus à jour à chaque création et lecture"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = [
+            Utilisateur.objects.create_user(email=f'{nom}@sira.com', password='x')
+            for nom in ('alice', 'bob')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.bob)
+
+    def notifier(self, nombre=1):
+        return [
+            Notification.objects.create(utilisateur=self.bob, contenu=f'Note {i}', type='NOTE')
+            for i in range(nombre)
+        ]
+
+    def lire_compteurs(self):
+        response = self.client.get('/communication/compteurs/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def assertCoherent(self):
+        self.assertEqual(
+            CompteurNonLus.objects.values('notifications', 'messages').get(utilisateur=self.bob),
+            valeurs_reelles(self.bob.pk)
+        )
+
+    def test_initialisation_et_cache(self):
+        self.notifier(2)
+        Message.objects.create(expediteur=self.alice, destinataire=self.bob, contenu='Bonjour')
+        # Ligne créée à la première lecture, à partir des tables
+        self.assertEqual(self.lire_compteurs(), {'notifications': 2, 'messages': 1})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lire_compteurs(), {'notifications': 2, 'messages': 1})
+
+    def test_suivi_des_evenements(self):
+        self.lire_compteurs()
+        with self.captureOnCommitCallbacks(execute=True):
+            premiere, seconde, troisieme = self.notifier(3)
+            Message.objects.create(expediteur=self.alice, destinataire=self.bob, contenu='Un')
+            Message.objects.create(expediteur=self.alice, destinataire=self.bob, contenu='Deux')
+            # Les messages envoyés ne comptent pas pour l'expéditeur
+            Message.objects.create(expediteur=self.bob, destinataire=self.alice, contenu='Trois')
+        self.assertEqual(self.lire_compteurs(), {'notifications': 3, 'messages': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/communication/notifications/{premiere.pk}/marquer_comme_lue/')
+            # Relire une notification déjà lue ne décompte rien
+            self.client.post(f'/communication/notifications/{premiere.pk}/marquer_comme_lue/')
+            seconde.delete()
+            self.client.post(f'/communication/conversations/{Conversation.objects.get().pk}/lire/')
+        self.assertEqual(self.lire_compteurs(), {'notifications': 1, 'messages': 0})
+        self.assertCoherent()
+
+    def test_modification_directe(self):
+        notification, = self.notifier()
+        self.lire_compteurs()
+        notification.est_lue = True
+        notification.save()
+        self.assertCoherent()
+        notification.est_lue = False
+        notification.save()
+        self.assertCoherent()
+
+    def test_suppression_de_messages(self):
+        lus = [
+            Message.objects.create(expediteur=self.alice, destinataire=self.bob, contenu=f'Lu {i}')
+            for i in range(2)
+        ]
+        self.client.post(f'/communication/conversations/{Conversation.objects.get().pk}/lire/')
+        non_lus = [
+            Message.objects.create(expediteur=self.alice, destinataire=self.bob, contenu=f'Non lu {i}')
+            for i in range(2)
+        ]
+        envoye = Message.objects.create(expediteur=self.bob, destinataire=self.alice, contenu='Réponse')
+        self.lire_compteurs()
+
+        # Un message déjà lu ne change rien aux non-lus
+        lus[0].delete()
+        self.assertEqual(boite_de_reception(self.bob).get().non_lus, 2)
+
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.delete(f'/communication/messages/{non_lus[1].pk}/').status_code, 204)
+        self.assertEqual(boite_de_reception(self.bob).get().non_lus, 1)
+        self.assertCoherent()
+
+        # Le dernier message de la conversation est remplacé par le précédent
+        envoye.delete()
+        self.assertEqual(Conversation.objects.get().dernier_message, non_lus[0])
+        self.assertEqual(boite_de_reception(self.alice).get().non_lus, 0)
+        self.assertCoherent()
+
+    def test_suppression_d_un_utilisateur(self):
+        Message.objects.create(expediteur=self.alice, destinataire=self.bob, contenu='Bonjour')
+        self.lire_compteurs()
+        self.alice.delete()
+        self.assertCoherent()
+
+
+class OperationsGroupeesTests(APITestCase):
+    """Lecture et archivage groupés : une mise à jour, compteurs cohérents"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = [
+            Utilisateur.objects.create_user(email=f'{nom}@sira.com', password='x')
+            for nom in ('alice', 'bob')
+        ]
+        for numero in range(6):
+            Notification.objects.create(
+                utilisateur=cls.bob, contenu=f'Note {numero}', type='NOTE' if numero % 2 else 'ABSENCE'
+            )
+        cls.autre = Notification.objects.create(utilisateur=cls.alice, contenu='Note', type='NOTE')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.bob)
+        # Ligne de compteurs créée, comme après un premier affichage du badge
+        self.client.get('/communication/compteurs/')
+
+    def assertCoherent(self):
+        self.assertEqual(
+            CompteurNonLus.objects.values('notifications', 'messages').get(utilisateur=self.bob),
+            valeurs_reelles(self.bob.pk)
+        )
+
+    def test_tout_marquer_par_type(self):
+        # Une mise à jour des notifications, une des compteurs (et le point de sauvegarde)
+        with self.assertNumQueries(4):
+            response = self.client.post(
+                '/communication/notifications/marquer_tout_comme_lu/', {'type': 'NOTE'}
+            )
+        self.assertEqual(response.data['nombre'], 3)
+        self.assertEqual(Notification.objects.filter(utilisateur=self.bob, est_lue=False).count(), 3)
+        self.assertCoherent()
+
+        response = self.client.post('/communication/notifications/marquer_tout_comme_lu/')
+        self.assertEqual(response.data['nombre'], 3)
+        self.assertCoherent()
+        self.assertFalse(Notification.objects.get(pk=self.autre.pk).est_lue)
+
+    def test_tout_marquer_avant_une_date(self):
+        limite = Notification.objects.filter(utilisateur=self.bob).order_by('date_creation')[2]
+        response = self.client.post(
+            '/communication/notifications/marquer_tout_comme_lu/',
+            {'avant': limite.date_creation.isoformat()}
+        )
+        self.assertEqual(response.data['nombre'], 3)
+        self.assertCoherent()
+
+    def test_selection(self):
+        ids = list(Notification.objects.filter(utilisateur=self.bob).values_list('pk', flat=True)[:2])
+        response = self.client.post(
+            '/communication/notifications/marquer_comme_lues/',
+            {'ids': ids + [self.autre.pk]}, format='json'
+        )
+        self.assertEqual(response.data['nombre'], 2)
+        self.assertFalse(Notification.objects.get(pk=self.autre.pk).est_lue)
+        self.assertCoherent()
+
+        response = self.client.post('/communication/notifications/marquer_comme_lues/', {'ids': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_archivage(self):
+        recu = Message.objects.create(expediteur=self.alice, destinataire=self.bob, contenu='Un')
+        envoye = Message.objects.create(expediteur=self.bob, destinataire=self.alice, contenu='Deux')
+        etranger = Message.objects.create(expediteur=self.alice, destinataire=self.alice, contenu='Trois')
+        ids = [recu.pk, envoye.pk, etranger.pk]
+
+        with self.assertNumQueries(1):
+            response = self.client.post('/communication/messages/archiver/', {'ids': ids}, format='json')
+        self.assertEqual(response.data['nombre'], 2)
+        self.assertEqual(
+            set(Message.objects.filter(est_archive=True).values_list('pk', flat=True)),
+            {recu.pk, envoye.pk}
+        )
+        self.assertCoherent()
+
+        response = self.client.post(
+            '/communication/messages/archiver/', {'ids': [recu.pk], 'est_archive': False}, format='json'
+        )
+        self.assertEqual(response.data['nombre'], 1)
+        self.assertFalse(Message.objects.get(pk=recu.pk).est_archive)
+
+
+class DiffusionTests(TestCase):
+    """Notifications de masse : par lots, sans doublon en attente, compteurs à jour"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateurs = Utilisateur.objects.bulk_create([
+            Utilisateur(email=f'etudiant{i}@sira.com') for i in range(TAILLE_LOT + 10)
+        ])
+        cls.ids = [utilisateur.pk for utilisateur in cls.utilisateurs]
+        for utilisateur_id in cls.ids[:2]:
+            CompteurNonLus.objects.create(utilisateur_id=utilisateur_id)
+
+    def test_lots_en_nombre_de_requetes_fixe(self):
+        with CaptureQueriesContext(connection) as requetes:
+            bilan = diffuser(self.ids + self.ids[:5], 'Notes publiées', 'NOTE', '/resultats/')
+        # Par lot : un repérage des notifications en attente, une mise à jour
+        # des compteurs ; les insertions dépendent de la limite de paramètres
+        # du moteur
+        instructions = Counter(requete['sql'].split()[0] for requete in requetes.captured_queries)
+        self.assertEqual(instructions['SELECT'], 2)
+        self.assertEqual(instructions['UPDATE'], 2)
+        self.assertEqual(bilan, {'creees': TAILLE_LOT + 10, 'regroupees': 0})
+        self.assertEqual(Notification.objects.count(), TAILLE_LOT + 10)
+
+    def test_regroupement(self):
+        diffuser(self.ids[:3], 'Notes de Physique publiées', 'NOTE', '/resultats/')
+        Notification.objects.filter(utilisateur_id=self.ids[1]).update(est_lue=True)
+        CompteurNonLus.objects.filter(utilisateur_id=self.ids[1]).update(notifications=0)
+        # Même lien, autre type : pas de regroupement
+        diffuser(self.ids[:1], 'Paiement reçu', 'PAIEMENT', '/resultats/')
+
+        bilan = diffuser(self.ids[:3], 'Notes de Chimie publiées', 'NOTE', '/resultats/', 'Nouvelles notes')
+        self.assertEqual(bilan, {'creees': 1, 'regroupees': 2})
+        self.assertEqual(
+            list(Notification.objects.filter(utilisateur_id=self.ids[0], type='NOTE').values_list('contenu', flat=True)),
+            ['Nouvelles notes']
+        )
+        for utilisateur_id in self.ids[:2]:
+            self.assertEqual(
+                CompteurNonLus.objects.values('notifications', 'messages').get(utilisateur_id=utilisateur_id),
+                valeurs_reelles(utilisateur_id)
+            )
+
+
+class TempsReelTests(TestCase):
+    """Notifications et messages poussés aux connexions en flux"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = [
+            Utilisateur.objects.create_user(email=f'{nom}@sira.com', password='x')
+            for nom in ('alice', 'bob')
+        ]
+
+    def test_backend_memoire(self):
+        memoire = BackendMemoire()
+
+        async def scenario():
+            async with memoire.abonnement(self.bob.pk) as file:
+                # Publication depuis un autre thread, comme depuis une vue synchrone
+                await asyncio.to_thread(memoire.publier, [self.alice.pk, self.bob.pk], ('notification', '{}'))
+                self.assertEqual(await asyncio.wait_for(file.get(), 1), ('notification', '{}'))
+                self.assertEqual(memoire.nombre_abonnes(self.bob.pk), 1)
+            self.assertEqual(memoire.nombre_abonnes(self.bob.pk), 0)
+
+        asyncio.run(scenario())
+
+    def ecrire(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(utilisateur=self.bob, contenu='Note publiée', type='NOTE')
+            Message.objects.create(expediteur=self.alice, destinataire=self.bob, contenu='Bonjour')
+
+    async def test_flux(self):
+        response = await self.async_client.get(
+            '/communication/flux/', {'jeton': str(AccessToken.for_user(self.bob))}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        contenu = aiter(response.streaming_content)
+        self.assertTrue((await anext(contenu)).startswith(b'retry:'))
+
+        await sync_to_async(self.ecrire)()
+        recus = []
+        for _ in range(2):
+            evenement, donnees = (await asyncio.wait_for(anext(contenu), 1)).decode().strip().split('\n')
+            recus.append((evenement, json.loads(donnees.removeprefix('data: '))['contenu']))
+        self.assertEqual(recus, [('event: notification', 'Note publiée'), ('event: message', 'Bonjour')])
+
+        # À la déconnexion, le serveur ASGI annule la lecture en cours :
+        # l'abonnement est libéré
+        lecture = asyncio.ensure_future(anext(contenu))
+        await asyncio.sleep(0)
+        self.assertEqual(backend().nombre_abonnes(self.bob.pk), 1)
+        lecture.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await lecture
+        self.assertEqual(backend().nombre_abonnes(self.bob.pk), 0)
+
+    async def test_flux_sans_jeton(self):
+        response = await self.async_client.get('/communication/flux/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/communication/flux/', {'jeton': 'invalide'})
+        self.assertEqual(response.status_code, 401)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Plans d'exécution propres à SQLite")
+class IndexTests(TestCase):
+    """Les requêtes des listes utilisent les index composites prévus"""
+
+    def assertIndex(self, queryset, *index):
+        plan = queryset.explain()
+        for nom in index:
+            self.assertIn(f'USING INDEX {nom}', plan)
+
+    def test_notifications(self):
+        self.assertIndex(
+            Notification.objects.filter(utilisateur_id=1).order_by('-date_creation'),
+            'notif_util_date_idx'
+        )
+        self.assertIndex(
+            Notification.objects.filter(utilisateur_id=1, est_lue=False).order_by('-date_creation'),
+            'notif_non_lues_idx'
+        )
+
+    def test_messages(self):
+        self.assertIndex(
+            Message.objects.filter(Q(expediteur_id=1) | Q(destinataire_id=1)).order_by('-date_envoi'),
+            'message_exp_date_idx', 'message_dest_date_idx'
+        )
 
-# Create your tests here.
+    def test_conversations(self):
+        self.assertIndex(boite_de_reception(1), 'conv_a_activite_idx', 'conv_b_activite_idx')
+        self.assertIndex(
+            Message.objects.filter(conversation_id=1).order_by('-date_envoi'),
+            'message_conv_date_idx'
+        )
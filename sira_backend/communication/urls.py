@@ -6,9 +6,12 @@ from . import views
 router = DefaultRouter()
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
 router.register(r'messages', views.MessageViewSet, basename='message')
+router.register(r'conversations', views.ConversationViewSet, basename='conversation')
 router.register(r'groupes', views.GroupeMessageViewSet, basename='groupe')
 router.register(r'membres-groupes', views.MembreGroupeViewSet, basename='membre-groupe')
 
 urlpatterns = [
+    path('compteurs/', views.compteurs_non_lus, name='compteurs-non-lus'),
+    path('flux/', views.flux, name='flux'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
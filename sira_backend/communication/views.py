@@ -1,17 +1,25 @@
-from django.db import models
-from django.db.models import Q
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import filters  # Ajoutez cette ligne
+from .compteurs import compteurs, notifications_lues
+from .conversations import boite_de_reception, marquer_lue
+from .temps_reel import evenements, utilisateur_du_flux
 from .models import Notification, Message, GroupeMessage, MembreGroupe
 from .serializers import (
     NotificationSerializer, 
     MessageSerializer,
+    ConversationSerializer,
     GroupeMessageSerializer, 
     GroupeMessageDetailSerializer,
     AjoutMembreSerializer,
-    MembreGroupeSerializer
+    MembreGroupeSerializer,
+    LectureNotificationsSerializer,
+    SelectionSerializer,
+    ArchivageMessagesSerializer
 )
 
 class NotificationViewSet(viewsets.ModelViewSet):
@@ -36,21 +44,51 @@ class NotificationViewSet(viewsets.ModelViewSet):
         Marque une notification comme lue
         """
         notification = self.get_object()
-        notification.est_lue = True
-        notification.save()
+        notifications_lues(request.user.pk, Notification.objects.filter(pk=notification.pk))
         return Response(
             {'status': 'notification marquée comme lue'},
             status=status.HTTP_200_OK
         )
 
+    @action(detail=False, methods=['post'])
+    def marquer_tout_comme_lu(self, request):
+        """
+        Marque comme lues toutes les notifications de l'utilisateur, ou
+        seulement celles d'un `type` et/ou créées jusqu'à `avant`
+        """
+        serializer = LectureNotificationsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        filtres = {}
+        if 'type' in serializer.validated_data:
+            filtres['type'] = serializer.validated_data['type']
+        if 'avant' in serializer.validated_data:
+            filtres['date_creation__lte'] = serializer.validated_data['avant']
+        nombre = notifications_lues(request.user.pk, Notification.objects.filter(**filtres))
+        return Response({'status': 'notifications marquées comme lues', 'nombre': nombre})
+
+    @action(detail=False, methods=['post'])
+    def marquer_comme_lues(self, request):
+        """
+        Marque comme lues les notifications `ids` de l'utilisateur (les
+        identifiants d'autres utilisateurs sont ignorés)
+        """
+        serializer = SelectionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        nombre = notifications_lues(
+            request.user.pk,
+            Notification.objects.filter(pk__in=serializer.validated_data['ids'])
+        )
+        return Response({'status': 'notifications marquées comme lues', 'nombre': nombre})
+
     @action(detail=False, methods=['get'])
     def non_lues(self, request):
         """
         Liste toutes les notifications non lues
         """
         notifications = self.get_queryset().filter(est_lue=False)
-        serializer = self.get_serializer(notifications, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(notifications)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 class MessageViewSet(viewsets.ModelViewSet):
     """
@@ -77,30 +115,54 @@ class MessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def conversations(self, request):
         """
-        Liste les conversations (dernier message avec chaque contact)
+        Boîte de réception : une ligne par contact, la plus récente d'abord,
+        avec le dernier message et le nombre de messages non lus
         """
-        user = request.user
-        # Sous-requête pour obtenir les derniers messages
-        last_messages = Message.objects.filter(
-            Q(expediteur=user) | Q(destinataire=user)
-        ).values(
+        page = self.paginate_queryset(boite_de_reception(request.user))
+        serializer = ConversationSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def archiver(self, request):
+        """
+        Archive (ou désarchive avec `est_archive: false`) les messages `ids`
+        envoyés ou reçus par l'utilisateur, en une seule mise à jour
+        """
+        serializer = ArchivageMessagesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        est_archive = serializer.validated_data['est_archive']
+        # L'archivage ne touche pas à l'état de lecture : les compteurs ne bougent pas
+        nombre = self.get_queryset().filter(
+            pk__in=serializer.validated_data['ids']
+        ).exclude(est_archive=est_archive).order_by().update(est_archive=est_archive)
+        return Response({'status': 'messages archivés' if est_archive else 'messages désarchivés', 'nombre': nombre})
+
+class ConversationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Conversations de l'utilisateur (boîte de réception), leurs messages et
+    leur lecture
+    """
+    serializer_class = ConversationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return boite_de_reception(self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def messages(self, request, pk=None):
+        """Messages de la conversation, du plus récent au plus ancien"""
+        messages = self.get_object().messages.select_related(
             'expediteur', 'destinataire'
-        ).annotate(
-            max_date=models.Max('date_envoi')
-        )
+        ).order_by('-date_envoi')
+        page = self.paginate_queryset(messages)
+        serializer = MessageSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
-        conversations = []
-        for msg in last_messages:
-            conversation = Message.objects.filter(
-                Q(expediteur=msg['expediteur'], destinaire=msg['destinataire']) |
-                Q(expediteur=msg['destinataire'], destinaire=msg['expediteur']),
-                date_envoi=msg['max_date']
-            ).first()
-            if conversation:
-                conversations.append(conversation)
-
-        serializer = self.get_serializer(conversations, many=True)
-        return Response(serializer.data)
+    @action(detail=True, methods=['post'])
+    def lire(self, request, pk=None):
+        """Marque tous les messages reçus dans la conversation comme lus"""
+        marquer_lue(self.get_object(), request.user.pk)
+        return Response({'status': 'conversation marquée comme lue'}, status=status.HTTP_200_OK)
 
 class GroupeMessageViewSet(viewsets.ModelViewSet):
     """
@@ -122,10 +184,12 @@ class GroupeMessageViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         return GroupeMessage.objects.filter(
-            membres__utilisateur=user
+            membregroupe__utilisateur=user
         ).prefetch_related(
-            'membres',
-            'membres__utilisateur'
+            Prefetch(
+                'membregroupe_set',
+                queryset=MembreGroupe.objects.select_related('utilisateur')
+            )
         ).distinct()
 
     @action(detail=True, methods=['get'])
@@ -134,7 +198,7 @@ class GroupeMessageViewSet(viewsets.ModelViewSet):
         Liste tous les membres d'un groupe
         """
         groupe = self.get_object()
-        membres = groupe.membregroupe_set.all()
+        membres = groupe.membregroupe_set.select_related('groupe', 'utilisateur')
         serializer = MembreGroupeSerializer(membres, many=True)
         return Response(serializer.data)
 
@@ -224,4 +288,28 @@ class MembreGroupeViewSet(viewsets.ModelViewSet):
         return Response(
             {'status': f'Rôle changé à {nouveau_role}'},
             status=status.HTTP_200_OK
-        ) 
\ No newline at end of file
+        ) 
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def compteurs_non_lus(request):
+    """
+    Nombre de notifications et de messages non lus de l'utilisateur
+    connecté, pour les badges du tableau de bord (servi depuis le cache)
+    """
+    return Response(compteurs(request.user.pk))
+
+async def flux(request):
+    """
+    Flux Server-Sent Events des nouvelles notifications et des nouveaux
+    messages de l'utilisateur (voir temps_reel.py)
+    """
+    utilisateur = await sync_to_async(utilisateur_du_flux)(request)
+    if utilisateur is None:
+        return JsonResponse({'detail': "Jeton d'authentification absent ou invalide"}, status=401)
+    return StreamingHttpResponse(
+        evenements(utilisateur.pk),
+        content_type='text/event-stream',
+        # Pas de mise en tampon par un proxy (nginx) ni par le navigateur
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Etudiant, Enseignant
+from .models import (
+    Etudiant, Enseignant, Bulletin, Deliberation, CumulAnnuel, ImpressionDocuments
+)
 
 @admin.register(Etudiant)
 class EtudiantAdmin(admin.ModelAdmin):
@@ -7,4 +9,27 @@ class EtudiantAdmin(admin.ModelAdmin):
 
 @admin.register(Enseignant)
 class EnseignantAdmin(admin.ModelAdmin):
-    list_display = ('specialite', 'utilisateur', 'est_responsable')
\ No newline at end of file
+    list_display = ('specialite', 'utilisateur', 'est_responsable')
+
+@admin.register(Bulletin)
+class BulletinAdmin(admin.ModelAdmin):
+    list_display = ('etudiant', 'annee', 'credits_obtenus', 'moyenne_ponderee', 'date_maj')
+    list_filter = ('annee',)
+
+
+@admin.register(CumulAnnuel)
+class CumulAnnuelAdmin(admin.ModelAdmin):
+    list_display = ('etudiant', 'annee', 'credits_obtenus_cumules', 'moyenne_cumulee', 'date_maj')
+    list_filter = ('annee',)
+
+
+@admin.register(Deliberation)
+class DeliberationAdmin(admin.ModelAdmin):
+    list_display = ('etudiant', 'promotion_annuelle', 'moyenne_ponderee', 'rang', 'decision')
+    list_filter = ('decision', 'promotion_annuelle')
+
+
+@admin.register(ImpressionDocuments)
+class ImpressionDocumentsAdmin(admin.ModelAdmin):
+    list_display = ('type_document', 'promotion_annuelle', 'statut', 'generes', 'inchanges', 'date_maj')
+    list_filter = ('statut', 'type_document')
@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+from sira_backend.routeurs import lecture_principale
+from .models import AnneeAcademique, Bulletin, Etudiant, Resultat
+from .serializers import ResultatSerializer
+from .services import calculer_totaux
+
+
+def resultats_du_bulletin(annee_id, etudiant_ids):
+    """
+    Résultats d'une année, toutes sessions, avec la note retenue et toutes
+    les relations utilisées par le serializer
+    """
+    return Resultat.objects.filter(
+        cours_annuel__annee_id=annee_id,
+        etudiant_id__in=etudiant_ids
+    ).avec_retenue().select_related(
+        'etudiant__utilisateur',
+        'cours_annuel__cours',
+        'cours_annuel__annee',
+        'cours_annuel__enseignant__utilisateur'
+    ).order_by('cours_annuel__semestre', 'cours_annuel__cours__code', 'session')
+
+
+def reconstruire_bulletins(annee_id, etudiant_ids):
+    """
+    Reconstruit les bulletins d'un lot d'étudiants pour une année en une
+    seule lecture des résultats et une seule écriture des bulletins.
+    Les bulletins devenus vides sont supprimés.
+    """
+    if not AnneeAcademique.objects.filter(pk=annee_id).exists():
+        return []
+    etudiant_ids = set(
+        Etudiant.objects.filter(pk__in=etudiant_ids).values_list('pk', flat=True)
+    )
+    if not etudiant_ids:
+        return []
+
+    par_etudiant = defaultdict(list)
+    for resultat in resultats_du_bulletin(annee_id, etudiant_ids):
+        par_etudiant[resultat.etudiant_id].append(resultat)
+
+    bulletins = [
+        Bulletin(
+            etudiant_id=etudiant_id,
+            annee_id=annee_id,
+            resultats=ResultatSerializer(resultats, many=True).data,
+            **calculer_totaux(
+                (r.moyenne, r.cours_annuel.cours.credits)
+                for r in resultats if r.est_retenu
+            )
+        )
+        for etudiant_id, resultats in par_etudiant.items()
+    ]
+    Bulletin.objects.filter(
+        annee_id=annee_id,
+        etudiant_id__in=etudiant_ids - set(par_etudiant)
+    ).delete()
+    if not bulletins:
+        return []
+    return Bulletin.objects.bulk_create(
+        bulletins,
+        update_conflicts=True,
+        unique_fields=['etudiant', 'annee'],
+        update_fields=[
+            'resultats', 'credits_inscrits', 'credits_obtenus',
+            'moyenne_ponderee', 'date_maj'
+        ],
+    )
+
+
+def obtenir_bulletin(etudiant_id, annee_id):
+    """
+    Retourne le bulletin stocké, en le construisant au besoin.
+    Retourne None si l'étudiant n'a aucun résultat pour l'année.
+    """
+    bulletin = Bulletin.objects.filter(
+        etudiant_id=etudiant_id,
+        annee_id=annee_id
+    ).first()
+    if bulletin is None:
+        # Le bulletin enregistré sert à tous : jamais construit d'après une réplique en retard
+        with lecture_principale():
+            construits = reconstruire_bulletins(annee_id, [etudiant_id])
+        bulletin = construits[0] if construits else None
+    return bulletin
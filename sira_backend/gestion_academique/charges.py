@@ -0,0 +1,95 @@
+"""
+Charge horaire des enseignants pour une année académique.
+
+Heures de CM et de TP, crédits et nombre de cours sont agrégés par la base
+en une seule requête groupée (enseignant, semestre) sur les cours annuels
+joints aux cours. Le rapport est mis en cache par année ; la clé reprend
+les tampons de version des cours, cours annuels et enseignants, si bien
+que toute modification de ceux-ci le recalcule au prochain accès.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from sira_backend.conditionnel import nom_tampon, tampons
+from sira_backend.routeurs import lecture_principale
+from .models import Cours, CoursAnnuel, Enseignant
+
+CHAMPS_ENSEIGNANT = [
+    'enseignant_id', 'enseignant__utilisateur__last_name',
+    'enseignant__utilisateur__first_name', 'enseignant__specialite'
+]
+TOTAUX = ['nombre_cours', 'heures_CM', 'heures_TP', 'credits']
+# Une version périmée n'est plus jamais relue : on la laisse expirer
+DUREE_CACHE = 24 * 60 * 60
+
+ENTETE_EXPORT = [
+    'Nom', 'Prénom', 'Spécialité', 'Semestre', 'Nombre de cours',
+    'Heures CM', 'Heures TP', 'Crédits'
+]
+
+
+def charges_par_semestre(annee_id):
+    """Une ligne par enseignant et par semestre (enseignant vide : cours non attribués)"""
+    return CoursAnnuel.objects.filter(
+        annee_id=annee_id
+    ).values(*CHAMPS_ENSEIGNANT, 'semestre').annotate(
+        nombre_cours=Count('pk'),
+        heures_CM=Sum('cours__heures_CM'),
+        heures_TP=Sum('cours__heures_TP'),
+        credits=Sum('cours__credits'),
+    ).order_by(
+        'enseignant__utilisateur__last_name', 'enseignant__utilisateur__first_name',
+        'enseignant_id', 'semestre'
+    )
+
+
+def calculer_charges(annee_id):
+    enseignants = []
+    for ligne in charges_par_semestre(annee_id):
+        if not enseignants or enseignants[-1]['enseignant'] != ligne['enseignant_id']:
+            enseignants.append({
+                'enseignant': ligne['enseignant_id'],
+                'nom': ligne['enseignant__utilisateur__last_name'] or '',
+                'prenom': ligne['enseignant__utilisateur__first_name'] or '',
+                'specialite': ligne['enseignant__specialite'] or '',
+                **{total: 0 for total in TOTAUX},
+                'semestres': [],
+            })
+        enseignant = enseignants[-1]
+        enseignant['semestres'].append({
+            'semestre': ligne['semestre'],
+            **{total: ligne[total] for total in TOTAUX},
+        })
+        for total in TOTAUX:
+            enseignant[total] += ligne[total]
+    return {'annee': int(annee_id), 'enseignants': enseignants}
+
+
+def _cle(annee_id):
+    version = tampons([nom_tampon(modele) for modele in (Cours, CoursAnnuel, Enseignant)])
+    empreinte = hashlib.sha1(repr(version).encode()).hexdigest()
+    return f'gestion_academique:charges:{annee_id}:{empreinte}'
+
+
+def obtenir_charges(annee_id):
+    cle = _cle(annee_id)
+    rapport = cache.get(cle)
+    if rapport is None:
+        with lecture_principale():
+            rapport = calculer_charges(annee_id)
+        cache.set(cle, rapport, timeout=DUREE_CACHE)
+    return rapport
+
+
+def lignes_export(annee_id):
+    """Lignes du rapport par semestre, pour un export en flux"""
+    for ligne in charges_par_semestre(annee_id).iterator():
+        yield [
+            ligne['enseignant__utilisateur__last_name'] or 'Non attribué',
+            ligne['enseignant__utilisateur__first_name'],
+            ligne['enseignant__specialite'],
+            ligne['semestre'],
+            *(ligne[total] for total in TOTAUX),
+        ]
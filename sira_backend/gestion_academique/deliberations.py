@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Deliberation, Inscription, Resultat
+from .services import SEUIL_REUSSITE, calculer_totaux
+
+# Part minimale des crédits inscrits à valider pour être admis
+TAUX_CREDITS_ADMISSION = 0.75
+
+
+def decider(moyenne_ponderee, credits_inscrits, credits_obtenus):
+    """Décision du jury à partir des totaux annuels d'un étudiant"""
+    if moyenne_ponderee is None:
+        return 'DEFAILLANT'
+    if (moyenne_ponderee >= SEUIL_REUSSITE
+            and credits_obtenus >= TAUX_CREDITS_ADMISSION * credits_inscrits):
+        return 'ADMIS'
+    return 'AJOURNE'
+
+
+def classer(moyennes):
+    """
+    Rangs (1 = meilleur) à partir d'un dictionnaire {etudiant_id: moyenne}.
+    Les ex æquo partagent le même rang ; les moyennes absentes ne sont pas classées.
+    """
+    ordre = sorted(
+        ((moyenne, etudiant_id) for etudiant_id, moyenne in moyennes.items()
+         if moyenne is not None),
+        key=lambda item: item[0],
+        reverse=True
+    )
+    rangs = {}
+    precedente = None
+    for position, (moyenne, etudiant_id) in enumerate(ordre, start=1):
+        if moyenne != precedente:
+            rang = position
+            precedente = moyenne
+        rangs[etudiant_id] = rang
+    return rangs
+
+
+def deliberer(promotion_annuelle):
+    """
+    Délibère une promotion annuelle et enregistre le résultat.
+
+    Les notes retenues des étudiants actifs pour l'année sont lues en une
+    seule requête (fonction de fenêtre sur les sessions), puis les totaux,
+    rangs et décisions sont calculés en une passe et écrits en un seul
+    `bulk_create`.
+    """
+    etudiant_ids = list(
+        Inscription.objects.filter(
+            promotion_annuelle=promotion_annuelle,
+            statut='ACTIF'
+        ).values_list('etudiant_id', flat=True)
+    )
+
+    lignes = defaultdict(list)
+    notes = Resultat.objects.filter(
+        etudiant_id__in=etudiant_ids,
+        cours_annuel__annee_id=promotion_annuelle.annee_id
+    ).retenus().values_list('etudiant_id', 'moyenne', 'cours_annuel__cours__credits')
+    for etudiant_id, moyenne, credits in notes:
+        lignes[etudiant_id].append((moyenne, credits))
+
+    totaux = {
+        etudiant_id: calculer_totaux(lignes[etudiant_id])
+        for etudiant_id in etudiant_ids
+    }
+    rangs = classer({
+        etudiant_id: total['moyenne_ponderee']
+        for etudiant_id, total in totaux.items()
+    })
+    deliberations = [
+        Deliberation(
+            promotion_annuelle=promotion_annuelle,
+            etudiant_id=etudiant_id,
+            rang=rangs.get(etudiant_id),
+            decision=decider(**total),
+            **total
+        )
+        for etudiant_id, total in totaux.items()
+    ]
+
+    with transaction.atomic():
+        Deliberation.objects.filter(
+            promotion_annuelle=promotion_annuelle
+        ).exclude(etudiant_id__in=etudiant_ids).delete()
+        if deliberations:
+            Deliberation.objects.bulk_create(
+                deliberations,
+                update_conflicts=True,
+                unique_fields=['promotion_annuelle', 'etudiant'],
+                update_fields=[
+                    'moyenne_ponderee', 'credits_inscrits', 'credits_obtenus',
+                    'rang', 'decision', 'date_deliberation'
+                ],
+            )
+    return deliberations
@@ -0,0 +1,170 @@
+"""
+Exports en flux (CSV et XLSX) à mémoire constante.
+
+Les lignes sont produites par un itérateur (typiquement
+`values_list(...).iterator(chunk_size=...)`) et envoyées au client au fur
+et à mesure par une `StreamingHttpResponse`.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+TAILLE_LOT = 2000
+# Interdits dans un nom de feuille Excel ; `/` et `\` cassent aussi un nom de fichier
+CARACTERES_INTERDITS = re.compile(r'[/\\?*\[\]:]')
+LONGUEUR_FEUILLE = 31
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class _Tampon:
+    """Objet fichier en écriture seule dont on récupère le contenu par morceaux"""
+
+    def __init__(self):
+        self.morceaux = []
+        self.position = 0
+
+    def write(self, donnees):
+        if isinstance(donnees, str):
+            donnees = donnees.encode('utf-8')
+        self.morceaux.append(donnees)
+        self.position += len(donnees)
+        return len(donnees)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        contenu = b''.join(self.morceaux)
+        self.morceaux = []
+        return contenu
+
+
+def _texte(valeur):
+    if valeur is None:
+        return ''
+    if isinstance(valeur, bool):
+        return 'Oui' if valeur else 'Non'
+    if isinstance(valeur, (date, datetime)):
+        return valeur.isoformat()
+    return str(valeur)
+
+
+def flux_csv(entete, lignes):
+    """Génère le CSV ligne par ligne (avec BOM pour l'ouverture dans Excel)"""
+    tampon = _Tampon()
+    writer = csv.writer(tampon, delimiter=';')
+    yield '\ufeff'.encode('utf-8')
+    writer.writerow(entete)
+    yield tampon.vider()
+    for numero, ligne in enumerate(lignes, start=1):
+        writer.writerow([_texte(valeur) for valeur in ligne])
+        if numero % TAILLE_LOT == 0:
+            yield tampon.vider()
+    yield tampon.vider()
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nom}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _cellule(valeur):
+    if isinstance(valeur, bool) or valeur is None:
+        return f'<c t="inlineStr"><is><t>{escape(_texte(valeur))}</t></is></c>'
+    if isinstance(valeur, (int, float, Decimal)):
+        return f'<c><v>{valeur}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_texte(valeur))}</t></is></c>'
+
+
+def _ligne_xml(ligne):
+    return '<row>' + ''.join(_cellule(valeur) for valeur in ligne) + '</row>'
+
+
+def flux_xlsx(entete, lignes, nom_feuille='Export'):
+    """
+    Génère un classeur XLSX d'une feuille sans jamais le garder en mémoire.
+    Les chaînes sont écrites en ligne (`inlineStr`), ce qui évite la table
+    de chaînes partagées qu'il faudrait sinon construire en entier.
+    """
+    tampon = _Tampon()
+    with zipfile.ZipFile(tampon, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(nom=escape(nom_sur(nom_feuille)[:LONGUEUR_FEUILLE] or 'Export')))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield tampon.vider()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as feuille:
+            feuille.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>' + _ligne_xml(entete)
+            ).encode('utf-8'))
+            for numero, ligne in enumerate(lignes, start=1):
+                feuille.write(_ligne_xml(ligne).encode('utf-8'))
+                if numero % TAILLE_LOT == 0:
+                    yield tampon.vider()
+            feuille.write(b'</sheetData></worksheet>')
+    yield tampon.vider()
+
+
+def nom_sur(nom):
+    """`nom` (libellé d'année, etc.) utilisable comme nom de fichier et de feuille"""
+    return CARACTERES_INTERDITS.sub('-', nom)
+
+
+def reponse_export(nom_fichier, entete, lignes, format_fichier='csv'):
+    """Réponse HTTP en flux pour un export au format `csv` ou `xlsx`"""
+    nom_fichier = nom_sur(nom_fichier)
+    if format_fichier == 'xlsx':
+        contenu = flux_xlsx(entete, lignes, nom_feuille=nom_fichier)
+    else:
+        format_fichier = 'csv'
+        contenu = flux_csv(entete, lignes)
+    response = StreamingHttpResponse(contenu, content_type=FORMATS[format_fichier])
+    response['Content-Disposition'] = content_disposition_header(True, f'{nom_fichier}.{format_fichier}')
+    return response
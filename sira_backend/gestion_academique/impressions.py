@@ -0,0 +1,335 @@
+"""
+Impression en PDF des bulletins et relevés d'une promotion annuelle.
+
+Les demandes (`ImpressionDocuments`) sont enregistrées en base, qui sert de
+file d'attente : un ou plusieurs processus `manage.py traiter_impressions`
+prennent les demandes en attente (une mise à jour conditionnelle garantit
+qu'une demande n'est prise qu'une fois), lisent les données par lots et
+font produire les PDF par un pool de processus.
+
+Chaque document est rangé dans le stockage de fichiers avec l'empreinte
+des données qui l'ont produit : une nouvelle impression de la même
+promotion ne régénère que les documents dont les résultats ont changé.
+Une archive ZIP de la promotion est produite en fin de traitement.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+
+from .bulletins import resultats_du_bulletin
+from .models import CumulAnnuel, DocumentImprime, Etudiant, ImpressionDocuments, Inscription
+from .pdf import rendre
+from .releves import mettre_a_jour_cumuls
+from .services import calculer_totaux
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 100
+# Une demande en cours dont la progression n'a pas bougé depuis ce délai
+# est considérée comme abandonnée (processus arrêté) et remise en attente
+DELAI_ABANDON = timedelta(minutes=10)
+# Demandes en attente examinées à chaque tentative de prise
+CANDIDATS = 10
+
+
+def _etudiant(etudiant):
+    return {
+        'matricule': etudiant.matricule,
+        'nom': etudiant.utilisateur.last_name,
+        'prenom': etudiant.utilisateur.first_name,
+    }
+
+
+def _contenus_bulletins(promotion_annuelle, etudiants):
+    """Données des bulletins d'un lot, en une lecture des résultats"""
+    par_etudiant = defaultdict(list)
+    for resultat in resultats_du_bulletin(promotion_annuelle.annee_id, [e.pk for e in etudiants]):
+        par_etudiant[resultat.etudiant_id].append(resultat)
+
+    contenus = {}
+    for etudiant in etudiants:
+        resultats = par_etudiant[etudiant.pk]
+        contenus[etudiant.pk] = {
+            'etudiant': _etudiant(etudiant),
+            'promotion': promotion_annuelle.promotion.nom,
+            'annee': promotion_annuelle.annee.libelle,
+            'resultats': [
+                {
+                    'code': r.cours_annuel.cours.code,
+                    'intitule': r.cours_annuel.cours.intitule,
+                    'semestre': r.cours_annuel.semestre,
+                    'credits': r.cours_annuel.cours.credits,
+                    'session': r.session,
+                    'moyenne': r.moyenne,
+                    'mention': r.mention,
+                    'est_retenu': r.est_retenu,
+                }
+                for r in resultats
+            ],
+            **calculer_totaux(
+                (r.moyenne, r.cours_annuel.cours.credits) for r in resultats if r.est_retenu
+            ),
+        }
+    return contenus
+
+
+def _contenus_releves(promotion_annuelle, etudiants):
+    """Données des relevés d'un lot, arrêtés à l'année de la promotion"""
+    ids = [etudiant.pk for etudiant in etudiants]
+
+    def lire():
+        par_etudiant = defaultdict(list)
+        cumuls = CumulAnnuel.objects.filter(
+            etudiant_id__in=ids,
+            annee__date_debut__lte=promotion_annuelle.annee.date_debut
+        ).select_related('annee').order_by('annee__date_debut', 'annee_id')
+        for cumul in cumuls:
+            par_etudiant[cumul.etudiant_id].append(cumul)
+        return par_etudiant
+
+    par_etudiant = lire()
+    manquants = [pk for pk in ids if pk not in par_etudiant]
+    if manquants and mettre_a_jour_cumuls(manquants):
+        par_etudiant = lire()
+
+    return {
+        etudiant.pk: {
+            'etudiant': _etudiant(etudiant),
+            'promotion': promotion_annuelle.promotion.nom,
+            'annee': promotion_annuelle.annee.libelle,
+            'annees': [
+                {
+                    'annee': cumul.annee.libelle,
+                    'credits_inscrits': cumul.credits_inscrits,
+                    'credits_obtenus': cumul.credits_obtenus,
+                    'moyenne_ponderee': cumul.moyenne_ponderee,
+                    'credits_inscrits_cumules': cumul.credits_inscrits_cumules,
+                    'credits_obtenus_cumules': cumul.credits_obtenus_cumules,
+                    'moyenne_cumulee': cumul.moyenne_cumulee,
+                }
+                for cumul in par_etudiant[etudiant.pk]
+            ],
+        }
+        for etudiant in etudiants
+    }
+
+
+CONTENUS = {
+    'BULLETIN': _contenus_bulletins,
+    'RELEVE': _contenus_releves,
+}
+
+
+def empreinte(contenu):
+    return hashlib.sha256(
+        json.dumps(contenu, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    ).hexdigest()
+
+
+def nom_document(type_document, annee_id, matricule):
+    return f'documents/{type_document.lower()}/{annee_id}/{matricule}.pdf'
+
+
+def creer_impression(type_document, promotion_annuelle, utilisateur=None):
+    """
+    Met une impression en file. Une demande identique encore en attente ou
+    en cours est retournée plutôt que dupliquée. Retourne (impression, creee).
+    """
+    existante = ImpressionDocuments.objects.filter(
+        type_document=type_document,
+        promotion_annuelle=promotion_annuelle,
+        statut__in=['EN_ATTENTE', 'EN_COURS']
+    ).order_by('date_creation').first()
+    if existante is not None:
+        return existante, False
+    return ImpressionDocuments.objects.create(
+        type_document=type_document,
+        promotion_annuelle=promotion_annuelle,
+        cree_par=utilisateur
+    ), True
+
+
+def identifiant_travailleur():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def remettre_en_attente_abandonnees():
+    """Remet en file les demandes dont le processus a disparu en cours de route"""
+    return ImpressionDocuments.objects.filter(
+        statut='EN_COURS',
+        date_maj__lt=timezone.now() - DELAI_ABANDON
+    ).update(statut='EN_ATTENTE', traite_par='', date_maj=timezone.now())
+
+
+def prendre_impression(travailleur):
+    """
+    Réserve la plus ancienne demande en attente pour `travailleur` et
+    retourne son identifiant, ou None si la file est vide. La réservation
+    est une mise à jour conditionnelle sur le statut : deux processus ne
+    peuvent pas prendre la même demande, sans verrou ni courtier externe.
+    """
+    candidates = ImpressionDocuments.objects.filter(
+        statut='EN_ATTENTE'
+    ).order_by('date_creation', 'pk').values_list('pk', flat=True)[:CANDIDATS]
+    for impression_id in candidates:
+        prise = ImpressionDocuments.objects.filter(
+            pk=impression_id, statut='EN_ATTENTE'
+        ).update(statut='EN_COURS', traite_par=travailleur, date_maj=timezone.now())
+        if prise:
+            return impression_id
+    return None
+
+
+def creer_pool(processus=None):
+    """
+    Pool de rendu (un processus par cœur par défaut) ; avec un seul
+    processus, les documents sont rendus dans le processus courant
+    """
+    processus = processus or os.cpu_count() or 1
+    if processus < 2:
+        return nullcontext(None)
+    return ProcessPoolExecutor(max_workers=processus)
+
+
+def _rendre(pool, type_document, contenus):
+    if pool is None or len(contenus) < 2:
+        return [rendre(type_document, contenu) for contenu in contenus]
+    return list(pool.map(rendre, [type_document] * len(contenus), contenus))
+
+
+def executer_impression(impression_id, pool=None, progression=None):
+    """
+    Produit les documents d'une impression (déjà réservée ou non).
+    `pool` est un exécuteur de `creer_pool()` ; `progression`, si fourni,
+    est appelé après chaque lot avec l'impression à jour.
+    """
+    impression = ImpressionDocuments.objects.select_related(
+        'promotion_annuelle__promotion', 'promotion_annuelle__annee'
+    ).get(pk=impression_id)
+    promotion_annuelle = impression.promotion_annuelle
+    type_document = impression.type_document
+    _mettre_a_jour(impression_id, statut='EN_COURS', message='', generes=0, inchanges=0)
+
+    try:
+        etudiants = list(
+            Etudiant.objects.filter(
+                pk__in=Inscription.objects.filter(
+                    promotion_annuelle=promotion_annuelle,
+                    statut='ACTIF'
+                ).values('etudiant_id')
+            ).select_related('utilisateur').order_by('matricule')
+        )
+        _mettre_a_jour(impression_id, total=len(etudiants))
+
+        for debut in range(0, len(etudiants), TAILLE_LOT):
+            _traiter_lot(impression_id, type_document, promotion_annuelle,
+                         etudiants[debut:debut + TAILLE_LOT], pool)
+            if progression is not None:
+                impression.refresh_from_db()
+                progression(impression)
+
+        _archiver(impression, etudiants)
+        _mettre_a_jour(impression_id, statut='TERMINE')
+    except Exception as exc:
+        logger.exception("Échec de l'impression %s", impression_id)
+        _mettre_a_jour(impression_id, statut='ECHEC', message=str(exc))
+    impression.refresh_from_db()
+    return impression
+
+
+def _mettre_a_jour(impression_id, **champs):
+    ImpressionDocuments.objects.filter(pk=impression_id).update(date_maj=timezone.now(), **champs)
+
+
+def _traiter_lot(impression_id, type_document, promotion_annuelle, etudiants, pool):
+    contenus = CONTENUS[type_document](promotion_annuelle, etudiants)
+    existants = {
+        document.etudiant_id: document
+        for document in DocumentImprime.objects.filter(
+            type_document=type_document,
+            annee_id=promotion_annuelle.annee_id,
+            etudiant_id__in=contenus
+        )
+    }
+
+    a_produire = []
+    for etudiant in etudiants:
+        signature = empreinte(contenus[etudiant.pk])
+        existant = existants.get(etudiant.pk)
+        if existant is None or existant.empreinte != signature:
+            a_produire.append((etudiant, signature))
+
+    pdfs = _rendre(pool, type_document, [contenus[etudiant.pk] for etudiant, _ in a_produire])
+    documents = []
+    for (etudiant, signature), pdf in zip(a_produire, pdfs):
+        nom = nom_document(type_document, promotion_annuelle.annee_id, etudiant.matricule)
+        # Même nom d'une version à l'autre : l'ancienne version est remplacée
+        default_storage.delete(nom)
+        documents.append(DocumentImprime(
+            type_document=type_document,
+            etudiant=etudiant,
+            annee_id=promotion_annuelle.annee_id,
+            fichier=default_storage.save(nom, ContentFile(pdf)),
+            empreinte=signature
+        ))
+    if documents:
+        DocumentImprime.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['type_document', 'etudiant', 'annee'],
+            update_fields=['fichier', 'empreinte', 'date_maj'],
+        )
+    _mettre_a_jour(
+        impression_id,
+        generes=F('generes') + len(documents),
+        inchanges=F('inchanges') + len(etudiants) - len(documents)
+    )
+
+
+def _archiver(impression, etudiants):
+    """Archive ZIP de tous les documents de la promotion, construite sur disque"""
+    fichiers = DocumentImprime.objects.filter(
+        type_document=impression.type_document,
+        annee_id=impression.promotion_annuelle.annee_id,
+        etudiant__in=etudiants
+    ).order_by('etudiant__matricule').values_list('etudiant__matricule', 'fichier')
+
+    with tempfile.TemporaryFile() as tampon:
+        # Les PDF sont déjà compressés : stockés tels quels dans l'archive
+        with zipfile.ZipFile(tampon, 'w', zipfile.ZIP_STORED) as archive:
+            for matricule, nom in fichiers.iterator():
+                with default_storage.open(nom, 'rb') as document:
+                    archive.writestr(f'{matricule}.pdf', document.read())
+        tampon.seek(0)
+        if impression.archive:
+            impression.archive.delete(save=False)
+        impression.archive.save(f'{impression.pk}.zip', File(tampon), save=False)
+    ImpressionDocuments.objects.filter(pk=impression.pk).update(archive=impression.archive.name)
+
+
+def traiter_file(pool=None, travailleur=None, progression=None):
+    """
+    Traite les demandes en attente jusqu'à épuisement de la file.
+    Retourne les impressions traitées.
+    """
+    travailleur = travailleur or identifiant_travailleur()
+    traitees = []
+    remettre_en_attente_abandonnees()
+    while (impression_id := prendre_impression(travailleur)) is not None:
+        traitees.append(executer_impression(impression_id, pool, progression))
+    return traitees
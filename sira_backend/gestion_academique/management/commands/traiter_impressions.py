@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion_academique.impressions import creer_pool, identifiant_travailleur, traiter_file
+
+
+class Command(BaseCommand):
+    help = "Traite la file des impressions de bulletins et relevés (PDF)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processus', type=int,
+            help="Nombre de processus de rendu (par défaut, un par cœur)"
+        )
+        parser.add_argument(
+            '--attente', type=float, default=5,
+            help="Secondes entre deux consultations de la file vide"
+        )
+        parser.add_argument(
+            '--une-fois', action='store_true',
+            help="S'arrête dès que la file est vide"
+        )
+
+    def handle(self, *args, **options):
+        travailleur = identifiant_travailleur()
+        self.stdout.write(f"Traitement des impressions ({travailleur})")
+        with creer_pool(options['processus']) as pool:
+            while True:
+                for impression in traiter_file(pool, travailleur, self.afficher_progression):
+                    self.afficher_fin(impression)
+                if options['une_fois']:
+                    break
+                time.sleep(options['attente'])
+
+    def afficher_progression(self, impression):
+        self.stdout.write(
+            f"  #{impression.pk} {impression.generes + impression.inchanges}/{impression.total}"
+        )
+
+    def afficher_fin(self, impression):
+        if impression.statut != 'TERMINE':
+            self.stderr.write(f"Impression {impression.pk} en échec : {impression.message}")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Impression {impression.pk} terminée : {impression.generes} généré(s), "
+            f"{impression.inchanges} inchangé(s)"
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:56
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academique', '0002_anneeacademique_cours_faculte_coursannuel_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bulletin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resultats', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('credits_inscrits', models.IntegerField(default=0)),
+                ('credits_obtenus', models.IntegerField(default=0)),
+                ('moyenne_ponderee', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('date_maj', models.DateTimeField(auto_now=True)),
+                ('annee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='gestion_academique.anneeacademique')),
+                ('etudiant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bulletins', to='gestion_academique.etudiant')),
+            ],
+            options={
+                'unique_together': {('etudiant', 'annee')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academique', '0003_bulletin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Deliberation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moyenne_ponderee', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('credits_inscrits', models.IntegerField(default=0)),
+                ('credits_obtenus', models.IntegerField(default=0)),
+                ('rang', models.IntegerField(blank=True, null=True)),
+                ('decision', models.CharField(choices=[('ADMIS', 'Admis'), ('AJOURNE', 'Ajourné'), ('DEFAILLANT', 'Défaillant')], max_length=20)),
+                ('date_deliberation', models.DateTimeField(auto_now=True)),
+                ('etudiant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliberations', to='gestion_academique.etudiant')),
+                ('promotion_annuelle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliberations', to='gestion_academique.promotionannuelle')),
+            ],
+            options={
+                'unique_together': {('promotion_annuelle', 'etudiant')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academique', '0004_deliberation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coursannuel',
+            name='annee',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='gestion_academique.anneeacademique'),
+        ),
+        migrations.AlterField(
+            model_name='inscription',
+            name='etudiant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='gestion_academique.etudiant'),
+        ),
+        migrations.AlterField(
+            model_name='inscription',
+            name='promotion_annuelle',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='gestion_academique.promotionannuelle'),
+        ),
+        migrations.AlterField(
+            model_name='resultat',
+            name='cours_annuel',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='gestion_academique.coursannuel'),
+        ),
+        migrations.AlterField(
+            model_name='resultat',
+            name='etudiant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='gestion_academique.etudiant'),
+        ),
+        migrations.AddIndex(
+            model_name='coursannuel',
+            index=models.Index(fields=['annee', 'semestre'], name='coursannuel_annee_sem_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inscription',
+            index=models.Index(fields=['promotion_annuelle', 'statut'], name='inscription_promo_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resultat',
+            index=models.Index(fields=['cours_annuel', 'session'], name='resultat_cours_session_idx'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:21
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+TABLE = 'gestion_academique_entreerecherche'
+FTS = 'gestion_academique_entreerecherche_fts'
+
+
+def creer_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        # Table FTS5 à contenu externe, synchronisée par triggers
+        instructions = [
+            f"""CREATE VIRTUAL TABLE {FTS} USING fts5(
+                type, texte, content='{TABLE}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )""",
+            f"""CREATE TRIGGER {FTS}_ai AFTER INSERT ON {TABLE} BEGIN
+                INSERT INTO {FTS}(rowid, type, texte) VALUES (new.id, new.type, new.texte);
+            END""",
+            f"""CREATE TRIGGER {FTS}_ad AFTER DELETE ON {TABLE} BEGIN
+                INSERT INTO {FTS}({FTS}, rowid, type, texte)
+                VALUES ('delete', old.id, old.type, old.texte);
+            END""",
+            f"""CREATE TRIGGER {FTS}_au AFTER UPDATE ON {TABLE} BEGIN
+                INSERT INTO {FTS}({FTS}, rowid, type, texte)
+                VALUES ('delete', old.id, old.type, old.texte);
+                INSERT INTO {FTS}(rowid, type, texte) VALUES (new.id, new.type, new.texte);
+            END""",
+        ]
+    elif connection.vendor == 'postgresql':
+        instructions = [
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            f'CREATE INDEX {TABLE}_trgm ON {TABLE} USING gin (texte gin_trgm_ops)',
+        ]
+    else:
+        instructions = []
+    for instruction in instructions:
+        schema_editor.execute(instruction)
+
+
+def supprimer_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS}')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TABLE}_trgm')
+
+
+def normaliser(*morceaux):
+    # Copie figée de recherche.normaliser
+    texte = unicodedata.normalize('NFKD', ' '.join(m for m in morceaux if m))
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return ' ' + ' '.join(re.findall(r'[0-9a-z]+', texte))
+
+
+def remplir_index(apps, schema_editor):
+    EntreeRecherche = apps.get_model('gestion_academique', 'EntreeRecherche')
+    Etudiant = apps.get_model('gestion_academique', 'Etudiant')
+    Enseignant = apps.get_model('gestion_academique', 'Enseignant')
+    Cours = apps.get_model('gestion_academique', 'Cours')
+
+    entrees = []
+    for etudiant in Etudiant.objects.select_related('utilisateur').iterator(chunk_size=2000):
+        u = etudiant.utilisateur
+        entrees.append(EntreeRecherche(
+            type='ETUDIANT', objet_id=etudiant.pk,
+            libelle=f'{u.last_name} {u.first_name}'.strip() or u.email,
+            detail=etudiant.matricule,
+            texte=normaliser(etudiant.matricule, u.first_name, u.last_name, u.email)
+        ))
+    for enseignant in Enseignant.objects.select_related('utilisateur').iterator(chunk_size=2000):
+        u = enseignant.utilisateur
+        entrees.append(EntreeRecherche(
+            type='ENSEIGNANT', objet_id=enseignant.pk,
+            libelle=f'{u.last_name} {u.first_name}'.strip() or u.email,
+            detail=enseignant.specialite,
+            texte=normaliser(u.first_name, u.last_name, u.email, enseignant.specialite)
+        ))
+    for cours in Cours.objects.iterator(chunk_size=2000):
+        entrees.append(EntreeRecherche(
+            type='COURS', objet_id=cours.pk, libelle=cours.intitule,
+            detail=cours.code, texte=normaliser(cours.code, cours.intitule)
+        ))
+    EntreeRecherche.objects.bulk_create(entrees, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academique', '0006_cumulannuel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntreeRecherche',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('ETUDIANT', 'Étudiant'), ('ENSEIGNANT', 'Enseignant'), ('COURS', 'Cours')], max_length=20)),
+                ('objet_id', models.BigIntegerField()),
+                ('libelle', models.CharField(max_length=255)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('texte', models.TextField()),
+            ],
+            options={
+                'unique_together': {('type', 'objet_id')},
+            },
+        ),
+        migrations.RunPython(creer_index, supprimer_index),
+        migrations.RunPython(remplir_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_academique', '0007_entreerecherche'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentImprime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('BULLETIN', 'Bulletins'), ('RELEVE', 'Relevés de notes')], max_length=20)),
+                ('fichier', models.FileField(upload_to='documents/')),
+                ('empreinte', models.CharField(max_length=64)),
+                ('date_maj', models.DateTimeField(auto_now=True)),
+                ('annee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='gestion_academique.anneeacademique')),
+                ('etudiant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='gestion_academique.etudiant')),
+            ],
+            options={
+                'unique_together': {('type_document', 'etudiant', 'annee')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ImpressionDocuments',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('BULLETIN', 'Bulletins'), ('RELEVE', 'Relevés de notes')], max_length=20)),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINE', 'Terminé'), ('ECHEC', 'Échec')], default='EN_ATTENTE', max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('generes', models.IntegerField(default=0)),
+                ('inchanges', models.IntegerField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('archive', models.FileField(blank=True, upload_to='impressions/')),
+                ('traite_par', models.CharField(blank=True, max_length=100)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_maj', models.DateTimeField(auto_now=True)),
+                ('cree_par', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='impressions', to=settings.AUTH_USER_MODEL)),
+                ('promotion_annuelle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='impressions', to='gestion_academique.promotionannuelle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'date_creation'], name='impression_statut_date_idx')],
+            },
+        ),
+    ]
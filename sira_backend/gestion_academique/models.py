@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+from django.db.models.lookups import Exact
+from django.core.serializers.json import DjangoJSONEncoder
 from authentification.models import Utilisateur
 
 class Etudiant(models.Model):
@@ -83,7 +87,7 @@ class Cours(models.Model):
 
 class CoursAnnuel(models.Model):
     cours = models.ForeignKey(Cours, on_delete=models.CASCADE)
-    annee = models.ForeignKey(AnneeAcademique, on_delete=models.CASCADE)
+    annee = models.ForeignKey(AnneeAcademique, on_delete=models.CASCADE, db_index=False)
     enseignant = models.ForeignKey(
         'Enseignant',
         on_delete=models.SET_NULL,
@@ -94,6 +98,10 @@ class CoursAnnuel(models.Model):
     
     class Meta:
         unique_together = ('cours', 'annee', 'semestre')
+        indexes = [
+            # Résolution des cours d'une année (bulletins, délibérations)
+            models.Index(fields=['annee', 'semestre'], name='coursannuel_annee_sem_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cours.code} ({self.annee.libelle}) - S{self.semestre}"
@@ -105,34 +113,98 @@ class Inscription(models.Model):
         ('DIPLOME', 'Diplômé'),
     ]
     
-    etudiant = models.ForeignKey(Etudiant, on_delete=models.CASCADE)
-    promotion_annuelle = models.ForeignKey(PromotionAnnuelle, on_delete=models.CASCADE)
+    # Clés étrangères sans index simple : les index composites de Meta
+    # commencent par ces colonnes et les couvrent
+    etudiant = models.ForeignKey(Etudiant, on_delete=models.CASCADE, db_index=False)
+    promotion_annuelle = models.ForeignKey(PromotionAnnuelle, on_delete=models.CASCADE, db_index=False)
     date_inscription = models.DateField(auto_now_add=True)
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='ACTIF')
     
     class Meta:
         unique_together = ('etudiant', 'promotion_annuelle')
+        indexes = [
+            # Listes d'une promotion filtrées par statut (inscrits actifs)
+            models.Index(fields=['promotion_annuelle', 'statut'], name='inscription_promo_statut_idx'),
+        ]
     
     def __str__(self):
         return f"{self.etudiant} - {self.promotion_annuelle}"
 
+class ResultatQuerySet(models.QuerySet):
+    """
+    Résolution de la note retenue : pour chaque couple (étudiant, cours
+    annuel), la session de meilleure moyenne compte, la session normale
+    l'emportant en cas d'égalité.
+    """
+
+    @staticmethod
+    def ordre_retenu():
+        return [F('moyenne').desc(nulls_last=True), F('session').asc()]
+
+    def avec_retenue(self):
+        """
+        Annote `est_retenu` par une fonction de fenêtre, en une seule requête.
+
+        La fenêtre ne voit que les lignes du queryset : les filtres doivent
+        garder toutes les sessions d'un couple (étudiant, cours annuel ou
+        année, mais pas session ni pagination). Sinon, utiliser
+        `avec_retenue_par_ligne`.
+        """
+        rang = Window(
+            RowNumber(),
+            partition_by=[F('etudiant_id'), F('cours_annuel_id')],
+            order_by=self.ordre_retenu()
+        )
+        return self.annotate(
+            est_retenu=ExpressionWrapper(Exact(rang, 1), output_field=models.BooleanField())
+        )
+
+    def retenus(self):
+        """Uniquement les notes retenues, une par couple (étudiant, cours annuel)"""
+        return self.avec_retenue().filter(est_retenu=True)
+
+    def avec_retenue_par_ligne(self):
+        """
+        Même annotation par une sous-requête corrélée (index unique
+        étudiant, cours annuel, session) : exacte quels que soient les
+        filtres, pour les listes paginées de l'API.
+        """
+        retenue = Resultat.objects.filter(
+            etudiant_id=OuterRef('etudiant_id'),
+            cours_annuel_id=OuterRef('cours_annuel_id')
+        ).order_by(*self.ordre_retenu()).values('pk')[:1]
+        return self.annotate(
+            est_retenu=ExpressionWrapper(
+                Exact(Subquery(retenue), F('pk')), output_field=models.BooleanField()
+            )
+        )
+
+
 class Resultat(models.Model):
     SESSION_CHOICES = [
         ('NORMALE', 'Session normale'),
         ('RATTRAPAGE', 'Session de rattrapage'),
     ]
     
-    etudiant = models.ForeignKey(Etudiant, on_delete=models.CASCADE)
-    cours_annuel = models.ForeignKey(CoursAnnuel, on_delete=models.CASCADE)
+    etudiant = models.ForeignKey(Etudiant, on_delete=models.CASCADE, db_index=False)
+    cours_annuel = models.ForeignKey(CoursAnnuel, on_delete=models.CASCADE, db_index=False)
     note_tp = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     note_interro = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     note_examen = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     moyenne = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     mention = models.CharField(max_length=10, blank=True)
     session = models.CharField(max_length=20, choices=SESSION_CHOICES)
+
+    objects = ResultatQuerySet.as_manager()
     
     class Meta:
+        # L'index unique (etudiant, cours_annuel, session) sert aussi les
+        # lectures par étudiant (bulletins, relevés)
         unique_together = ('etudiant', 'cours_annuel', 'session')
+        indexes = [
+            # Fiches de cotes et statistiques d'un cours par session
+            models.Index(fields=['cours_annuel', 'session'], name='resultat_cours_session_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         # Calcul automatique de la moyenne si nécessaire
@@ -140,3 +212,174 @@ class Resultat(models.Model):
     
     def __str__(self):
         return f"{self.etudiant} - {self.cours_annuel} : {self.moyenne}"
+
+
+class Bulletin(models.Model):
+    """
+    Bulletin précalculé d'un étudiant pour une année académique.
+    Reconstruit à chaque modification d'un de ses résultats.
+    """
+    etudiant = models.ForeignKey(Etudiant, on_delete=models.CASCADE, related_name='bulletins')
+    annee = models.ForeignKey(AnneeAcademique, on_delete=models.CASCADE)
+    resultats = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    credits_inscrits = models.IntegerField(default=0)
+    credits_obtenus = models.IntegerField(default=0)
+    moyenne_ponderee = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('etudiant', 'annee')
+
+    def __str__(self):
+        return f"Bulletin {self.etudiant} - {self.annee}"
+
+
+class Deliberation(models.Model):
+    """Résultat annuel délibéré d'un étudiant dans une promotion annuelle"""
+    DECISION_CHOICES = [
+        ('ADMIS', 'Admis'),
+        ('AJOURNE', 'Ajourné'),
+        ('DEFAILLANT', 'Défaillant'),
+    ]
+
+    promotion_annuelle = models.ForeignKey(
+        PromotionAnnuelle,
+        on_delete=models.CASCADE,
+        related_name='deliberations'
+    )
+    etudiant = models.ForeignKey(Etudiant, on_delete=models.CASCADE, related_name='deliberations')
+    moyenne_ponderee = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    credits_inscrits = models.IntegerField(default=0)
+    credits_obtenus = models.IntegerField(default=0)
+    rang = models.IntegerField(null=True, blank=True)
+    decision = models.CharField(max_length=20, choices=DECISION_CHOICES)
+    date_deliberation = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('promotion_annuelle', 'etudiant')
+
+    def __str__(self):
+        return f"{self.etudiant} - {self.promotion_annuelle} : {self.decision}"
+
+
+class CumulAnnuel(models.Model):
+    """
+    Ligne du relevé de notes d'un étudiant : totaux d'une année et cumuls
+    depuis sa première année. Tenu à jour à chaque modification de ses
+    résultats, le relevé complet se lit en une seule requête.
+    """
+    etudiant = models.ForeignKey(Etudiant, on_delete=models.CASCADE, related_name='cumuls')
+    annee = models.ForeignKey(AnneeAcademique, on_delete=models.CASCADE)
+    credits_inscrits = models.IntegerField(default=0)
+    credits_obtenus = models.IntegerField(default=0)
+    moyenne_ponderee = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    # Un cours repris d'une année sur l'autre n'est compté qu'une fois,
+    # avec sa meilleure moyenne
+    credits_inscrits_cumules = models.IntegerField(default=0)
+    credits_obtenus_cumules = models.IntegerField(default=0)
+    moyenne_cumulee = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('etudiant', 'annee')
+
+    def __str__(self):
+        return f"Cumul {self.etudiant} - {self.annee}"
+
+
+class EntreeRecherche(models.Model):
+    """
+    Entrée de l'index de recherche (étudiants, enseignants, cours).
+
+    `texte` est déjà normalisé (minuscules, sans accents) ; il est indexé
+    en plein texte par FTS5 sous SQLite et par trigrammes (pg_trgm) sous
+    PostgreSQL. Tenu à jour par les signaux (voir `recherche.py`).
+    """
+    TYPE_CHOICES = [
+        ('ETUDIANT', 'Étudiant'),
+        ('ENSEIGNANT', 'Enseignant'),
+        ('COURS', 'Cours'),
+    ]
+
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    objet_id = models.BigIntegerField()
+    libelle = models.CharField(max_length=255)
+    detail = models.CharField(max_length=255, blank=True)
+    texte = models.TextField()
+
+    class Meta:
+        unique_together = ('type', 'objet_id')
+
+    def __str__(self):
+        return f"{self.get_type_display()} : {self.libelle}"
+
+
+class ImpressionDocuments(models.Model):
+    """
+    Demande d'impression en PDF des bulletins ou relevés d'une promotion
+    annuelle. Les demandes en attente forment la file traitée par
+    `manage.py traiter_impressions`.
+    """
+    TYPE_CHOICES = [
+        ('BULLETIN', 'Bulletins'),
+        ('RELEVE', 'Relevés de notes'),
+    ]
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('TERMINE', 'Terminé'),
+        ('ECHEC', 'Échec'),
+    ]
+
+    type_document = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    promotion_annuelle = models.ForeignKey(
+        PromotionAnnuelle,
+        on_delete=models.CASCADE,
+        related_name='impressions'
+    )
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='EN_ATTENTE')
+    total = models.IntegerField(default=0)
+    generes = models.IntegerField(default=0)
+    inchanges = models.IntegerField(default=0)
+    message = models.TextField(blank=True)
+    # Archive ZIP de tous les documents, produite en fin de traitement
+    archive = models.FileField(upload_to='impressions/', blank=True)
+    # Processus qui traite la demande (hôte:pid)
+    traite_par = models.CharField(max_length=100, blank=True)
+    cree_par = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='impressions'
+    )
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Prise de la plus ancienne demande en attente
+            models.Index(fields=['statut', 'date_creation'], name='impression_statut_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Impression {self.get_type_document_display()} #{self.pk} ({self.statut})"
+
+
+class DocumentImprime(models.Model):
+    """
+    Dernier PDF produit pour un étudiant, une année et un type de document.
+    `empreinte` identifie les données qui l'ont produit : le document n'est
+    régénéré que si elles ont changé.
+    """
+    type_document = models.CharField(max_length=20, choices=ImpressionDocuments.TYPE_CHOICES)
+    etudiant = models.ForeignKey(Etudiant, on_delete=models.CASCADE, related_name='documents')
+    annee = models.ForeignKey(AnneeAcademique, on_delete=models.CASCADE)
+    fichier = models.FileField(upload_to='documents/')
+    empreinte = models.CharField(max_length=64)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('type_document', 'etudiant', 'annee')
+
+    def __str__(self):
+        return f"{self.get_type_document_display()} {self.etudiant} - {self.annee}"
@@ -0,0 +1,176 @@
+"""
+Passage des étudiants d'une année académique à la suivante.
+
+D'après la délibération de l'année source, chaque étudiant actif est :
+
+- admis : inscrit dans la promotion du niveau suivant du même département,
+  ou diplômé s'il était au dernier niveau ; s'il existe plusieurs
+  promotions possibles (options), il reste à orienter à la main ;
+- ajourné ou défaillant : réinscrit dans la même promotion ;
+- non délibéré : laissé de côté, la promotion devant d'abord être délibérée.
+
+Les promotions annuelles manquantes de l'année cible sont créées (avec le
+responsable de l'année source). Tout est lu en quelques requêtes et écrit
+par `bulk_create` dans une seule transaction, qui verrouille l'année
+cible ; la simulation produit le même bilan sans rien écrire. Un étudiant
+déjà inscrit dans l'année cible n'est pas touché : relancer le passage ne
+crée pas de doublon.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import AnneeAcademique, Deliberation, Inscription, Promotion, PromotionAnnuelle
+
+TAILLE_LOT = 1000
+CATEGORIES = ['admis', 'redoublants', 'diplomes', 'a_orienter', 'non_delibere', 'deja_inscrits']
+
+# Marque une promotion dont le niveau suivant compte plusieurs promotions
+A_ORIENTER = object()
+
+
+def promotions_suivantes():
+    """{promotion_id: promotion du niveau suivant du même département, None ou A_ORIENTER}"""
+    promotions = list(Promotion.objects.values_list('pk', 'departement_id', 'niveau'))
+    par_niveau = defaultdict(list)
+    for pk, departement_id, niveau in promotions:
+        par_niveau[departement_id, niveau].append(pk)
+
+    suivantes = {}
+    for pk, departement_id, niveau in promotions:
+        candidates = par_niveau.get((departement_id, niveau + 1), [])
+        if len(candidates) > 1:
+            suivantes[pk] = A_ORIENTER
+        else:
+            suivantes[pk] = candidates[0] if candidates else None
+    return suivantes
+
+
+def preparer_passage(source, cible):
+    """
+    Calcule le passage de `source` à `cible` sans rien écrire.
+    Retourne un plan : promotions annuelles à créer, inscriptions à créer
+    (etudiant_id, promotion_id, catégorie), inscriptions source à marquer
+    diplômées et totaux par catégorie.
+    """
+    if cible.date_debut <= source.date_debut:
+        raise ValueError("L'année cible doit commencer après l'année source")
+
+    decision = Deliberation.objects.filter(
+        promotion_annuelle=OuterRef('promotion_annuelle'),
+        etudiant=OuterRef('etudiant')
+    ).values('decision')[:1]
+    inscriptions = Inscription.objects.filter(
+        promotion_annuelle__annee=source,
+        statut='ACTIF'
+    ).annotate(
+        decision=Subquery(decision)
+    ).order_by().values_list('pk', 'etudiant_id', 'promotion_annuelle__promotion_id', 'decision')
+
+    responsables = dict(
+        PromotionAnnuelle.objects.filter(annee=source).values_list('promotion_id', 'responsable_id')
+    )
+    existantes = set(
+        PromotionAnnuelle.objects.filter(annee=cible).values_list('promotion_id', flat=True)
+    )
+    deja_inscrits = set(
+        Inscription.objects.filter(promotion_annuelle__annee=cible).values_list('etudiant_id', flat=True)
+    )
+    suivantes = promotions_suivantes()
+
+    totaux = Counter({categorie: 0 for categorie in CATEGORIES})
+    affectations = []
+    diplomes = []
+    for inscription_id, etudiant_id, promotion_id, decision in inscriptions.iterator(chunk_size=TAILLE_LOT):
+        if decision is None:
+            totaux['non_delibere'] += 1
+            continue
+        if decision == 'ADMIS':
+            suivante = suivantes.get(promotion_id)
+            if suivante is None:
+                totaux['diplomes'] += 1
+                diplomes.append(inscription_id)
+                continue
+            if suivante is A_ORIENTER:
+                totaux['a_orienter'] += 1
+                continue
+            categorie = 'admis'
+        else:
+            suivante, categorie = promotion_id, 'redoublants'
+        if etudiant_id in deja_inscrits:
+            totaux['deja_inscrits'] += 1
+            continue
+        totaux[categorie] += 1
+        affectations.append((etudiant_id, suivante, categorie))
+
+    # Toutes les promotions de l'année source sont reconduites, plus
+    # celles du niveau suivant qui accueillent des admis
+    a_creer = (set(responsables) | {promotion_id for _, promotion_id, _ in affectations}) - existantes
+    return {
+        'source': source,
+        'cible': cible,
+        'promotions_a_creer': {promotion_id: responsables.get(promotion_id) for promotion_id in a_creer},
+        'promotions_existantes': existantes,
+        'affectations': affectations,
+        'diplomes': diplomes,
+        'totaux': dict(totaux),
+    }
+
+
+def bilan(plan, simulation):
+    """Résumé d'un plan, global et par promotion de l'année cible"""
+    par_promotion = defaultdict(Counter)
+    for _, promotion_id, categorie in plan['affectations']:
+        par_promotion[promotion_id][categorie] += 1
+    concernees = set(par_promotion) | set(plan['promotions_a_creer'])
+    promotions = Promotion.objects.filter(pk__in=concernees).order_by('niveau', 'nom')
+    return {
+        'source': plan['source'].pk,
+        'cible': plan['cible'].pk,
+        'simulation': simulation,
+        'promotions_creees': len(plan['promotions_a_creer']),
+        **plan['totaux'],
+        'promotions': [
+            {
+                'promotion': promotion.pk,
+                'nom': promotion.nom,
+                'niveau': promotion.niveau,
+                'creee': promotion.pk in plan['promotions_a_creer'],
+                'admis': par_promotion[promotion.pk]['admis'],
+                'redoublants': par_promotion[promotion.pk]['redoublants'],
+            }
+            for promotion in promotions
+        ],
+    }
+
+
+def passer(source, cible, simulation=False):
+    """
+    Effectue (ou simule) le passage de `source` à `cible` et retourne son bilan.
+    Lève ValueError si l'année cible ne suit pas l'année source.
+    """
+    if simulation:
+        return bilan(preparer_passage(source, cible), simulation)
+
+    with transaction.atomic():
+        # Le plan est lu sous le verrou de l'année cible : un passage
+        # concurrent vers la même année attend, puis voit ces inscriptions
+        AnneeAcademique.objects.select_for_update().get(pk=cible.pk)
+        plan = preparer_passage(source, cible)
+        PromotionAnnuelle.objects.bulk_create([
+            PromotionAnnuelle(promotion_id=promotion_id, annee=cible, responsable_id=responsable_id)
+            for promotion_id, responsable_id in plan['promotions_a_creer'].items()
+        ])
+        promotions_annuelles = dict(
+            PromotionAnnuelle.objects.filter(annee=cible).values_list('promotion_id', 'pk')
+        )
+        Inscription.objects.bulk_create([
+            Inscription(etudiant_id=etudiant_id, promotion_annuelle_id=promotions_annuelles[promotion_id])
+            for etudiant_id, promotion_id, _ in plan['affectations']
+        ], batch_size=TAILLE_LOT)
+        for debut in range(0, len(plan['diplomes']), TAILLE_LOT):
+            Inscription.objects.filter(
+                pk__in=plan['diplomes'][debut:debut + TAILLE_LOT]
+            ).update(statut='DIPLOME')
+    return bilan(plan, simulation)
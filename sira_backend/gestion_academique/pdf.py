@@ -0,0 +1,185 @@
+"""
+Écriture de documents PDF simples, sans dépendance externe.
+
+Suffisant pour les bulletins et relevés : du texte en Helvetica (police
+standard, rien à embarquer) encodé en WinAnsi pour les accents, des filets
+horizontaux, et des pages A4 remplies de haut en bas avec saut de page
+automatique.
+
+Ce module n'utilise pas Django : les processus du pool d'impression
+l'importent et produisent les PDF sans initialiser l'application.
+"""
+import zlib
+
+LARGEUR, HAUTEUR = 595, 842  # A4, en points
+MARGE = 50
+INTERLIGNE = 1.5
+
+POLICES = {False: 'F1', True: 'F2'}
+
+
+def _chaine(texte):
+    """Chaîne littérale PDF en WinAnsi (les caractères hors jeu deviennent '?')"""
+    octets = str(texte).encode('cp1252', errors='replace')
+    return b'(' + octets.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class DocumentPDF:
+    """
+    Document construit ligne par ligne.
+
+    `ligne()` écrit des cellules (abscisse, texte) sur une même ligne,
+    `filet()` trace un trait sur la largeur utile ; une nouvelle page
+    commence dès que la marge basse est atteinte.
+    """
+
+    def __init__(self, pied=''):
+        self.pied = pied
+        self.pages = []
+        self.nouvelle_page()
+
+    def nouvelle_page(self):
+        self.flux = []
+        self.pages.append(self.flux)
+        self.y = HAUTEUR - MARGE
+
+    def _place(self, hauteur):
+        if self.y - hauteur < MARGE:
+            self.nouvelle_page()
+        self.y -= hauteur
+
+    def ligne(self, cellules, taille=10, gras=False):
+        self._place(taille * INTERLIGNE)
+        for x, texte in cellules:
+            if texte in (None, ''):
+                continue
+            self.flux.append(
+                b'BT /%s %d Tf %d %.1f Td %s Tj ET' % (
+                    POLICES[gras].encode(), taille, MARGE + x, self.y, _chaine(texte)
+                )
+            )
+
+    def filet(self, epaisseur=0.5):
+        self._place(4)
+        self.flux.append(
+            b'%.1f w %d %.1f m %d %.1f l S' % (epaisseur, MARGE, self.y, LARGEUR - MARGE, self.y)
+        )
+        self._place(4)
+
+    def espace(self, hauteur=10):
+        self._place(hauteur)
+
+    def contenu(self):
+        """Le document complet, en octets"""
+        objets = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            None,  # arbre des pages, connu une fois les pages numérotées
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        ]
+        references = []
+        for numero, flux in enumerate(self.pages, start=1):
+            if self.pied:
+                flux = flux + [b'BT /F1 8 Tf %d %d Td %s Tj ET' % (
+                    MARGE, MARGE // 2, _chaine(f'{self.pied} - page {numero}/{len(self.pages)}')
+                )]
+            donnees = zlib.compress(b'\n'.join(flux))
+            objets.append(
+                b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(donnees), donnees)
+            )
+            objets.append(
+                b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+                % (LARGEUR, HAUTEUR, len(objets))
+            )
+            references.append(b'%d 0 R' % len(objets))
+        objets[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(references), len(references))
+
+        sortie = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        positions = []
+        for numero, objet in enumerate(objets, start=1):
+            positions.append(len(sortie))
+            sortie += b'%d 0 obj\n%s\nendobj\n' % (numero, objet)
+        debut_xref = len(sortie)
+        sortie += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objets) + 1)
+        sortie += b''.join(b'%010d 00000 n \n' % position for position in positions)
+        sortie += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            len(objets) + 1, debut_xref
+        )
+        return bytes(sortie)
+
+
+def _valeur(valeur):
+    return '-' if valeur is None else str(valeur)
+
+
+def _entete(document, titre, contenu):
+    etudiant = contenu['etudiant']
+    document.ligne([(0, titre)], taille=16, gras=True)
+    document.ligne([(0, contenu['promotion']), (350, f"Année {contenu['annee']}")], taille=11)
+    document.espace()
+    document.ligne([(0, f"{etudiant['nom']} {etudiant['prenom']}")], taille=12, gras=True)
+    document.ligne([(0, f"Matricule : {etudiant['matricule']}")])
+    document.espace()
+
+
+COLONNES_BULLETIN = [
+    (0, 'Code'), (60, 'Intitulé'), (250, 'Sem.'), (285, 'Crédits'),
+    (330, 'Session'), (405, 'Moyenne'), (455, 'Mention'),
+]
+
+
+def bulletin_pdf(contenu):
+    """Bulletin annuel : une ligne par cours et par session, la note retenue en gras"""
+    document = DocumentPDF(pied=f"Bulletin {contenu['etudiant']['matricule']} - {contenu['annee']}")
+    _entete(document, 'Bulletin de notes', contenu)
+    document.ligne(COLONNES_BULLETIN, gras=True)
+    document.filet()
+    for ligne in contenu['resultats']:
+        document.ligne(
+            zip([x for x, _ in COLONNES_BULLETIN], [
+                ligne['code'], ligne['intitule'][:36], ligne['semestre'], ligne['credits'],
+                ligne['session'].capitalize(), _valeur(ligne['moyenne']), ligne['mention'],
+            ]),
+            gras=ligne['est_retenu']
+        )
+    document.filet()
+    document.ligne([
+        (0, 'Crédits obtenus'), (285, f"{contenu['credits_obtenus']}/{contenu['credits_inscrits']}"),
+        (330, 'Moyenne pondérée'), (455, _valeur(contenu['moyenne_ponderee'])),
+    ], gras=True)
+    return document.contenu()
+
+
+COLONNES_RELEVE = [
+    (0, 'Année'), (80, 'Crédits'), (160, 'Moyenne'),
+    (240, 'Crédits cumulés'), (360, 'Moyenne cumulée'),
+]
+
+
+def releve_pdf(contenu):
+    """Relevé de notes : totaux et cumuls année après année"""
+    document = DocumentPDF(pied=f"Relevé {contenu['etudiant']['matricule']} - {contenu['annee']}")
+    _entete(document, 'Relevé de notes', contenu)
+    document.ligne(COLONNES_RELEVE, gras=True)
+    document.filet()
+    for ligne in contenu['annees']:
+        document.ligne(zip([x for x, _ in COLONNES_RELEVE], [
+            ligne['annee'],
+            f"{ligne['credits_obtenus']}/{ligne['credits_inscrits']}",
+            _valeur(ligne['moyenne_ponderee']),
+            f"{ligne['credits_obtenus_cumules']}/{ligne['credits_inscrits_cumules']}",
+            _valeur(ligne['moyenne_cumulee']),
+        ]))
+    document.filet()
+    return document.contenu()
+
+
+RENDUS = {
+    'BULLETIN': bulletin_pdf,
+    'RELEVE': releve_pdf,
+}
+
+
+def rendre(type_document, contenu):
+    return RENDUS[type_document](contenu)
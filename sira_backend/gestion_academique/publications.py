@@ -0,0 +1,44 @@
+"""
+Publication des résultats d'un cours : chaque étudiant inscrit dans
+l'année du cours et noté pour la session reçoit une notification `NOTE`.
+
+Les destinataires sont lus en une requête (résultats joints aux
+inscriptions actives ; l'identifiant d'un étudiant est celui de son
+utilisateur), puis notifiés par `communication.diffusion`, hors de la
+requête. Un étudiant qui n'a pas encore lu une publication précédente voit
+sa notification rafraîchie plutôt qu'une de plus.
+"""
+from communication.diffusion import diffuser, lancer_diffusion
+
+from .models import CoursAnnuel, Resultat
+
+LIEN_RESULTATS = '/resultats/'
+CONTENU_REGROUPE = "De nouveaux résultats ont été publiés"
+
+
+def destinataires(cours_annuel, session):
+    """Identifiants des utilisateurs à notifier (une requête)"""
+    return Resultat.objects.filter(
+        cours_annuel=cours_annuel,
+        session=session,
+        etudiant__inscription__statut='ACTIF',
+        etudiant__inscription__promotion_annuelle__annee_id=cours_annuel.annee_id
+    ).order_by().values_list('etudiant_id', flat=True).distinct()
+
+
+def publier_resultats(cours_annuel_id, session):
+    """Notifie les étudiants concernés ; retourne le bilan de la diffusion"""
+    cours_annuel = CoursAnnuel.objects.select_related('cours').get(pk=cours_annuel_id)
+    libelle_session = dict(Resultat.SESSION_CHOICES)[session].lower()
+    return diffuser(
+        list(destinataires(cours_annuel, session)),
+        f"Vos résultats de {cours_annuel.cours.intitule} ({libelle_session}) ont été publiés",
+        'NOTE',
+        LIEN_RESULTATS,
+        contenu_regroupe=CONTENU_REGROUPE
+    )
+
+
+def lancer_publication(cours_annuel, session):
+    """Publie les résultats hors de la requête"""
+    lancer_diffusion(publier_resultats, cours_annuel.pk, session)
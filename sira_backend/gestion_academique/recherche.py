@@ -0,0 +1,142 @@
+"""
+Index de recherche des étudiants, enseignants et cours.
+
+Chaque objet a une entrée `EntreeRecherche` dont le texte est normalisé
+(minuscules, sans accents, mots séparés par une espace). La recherche se
+fait par préfixe de mot, chaque mot saisi devant correspondre :
+
+- sous SQLite, par la table FTS5 créée par la migration (index de
+  préfixes, synchronisée par triggers) ;
+- sous PostgreSQL, par `LIKE '% mot%'`, servi par l'index GIN trigrammes ;
+- ailleurs, par le même `LIKE`, sans index.
+
+Les entrées sont tenues à jour par les signaux des modèles ; les écritures
+en masse appellent `indexer()` elles-mêmes.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Cours, Enseignant, EntreeRecherche, Etudiant
+
+TABLE_FTS = 'gestion_academique_entreerecherche_fts'
+LIMITE_SUGGESTIONS = 10
+
+
+def normaliser(*morceaux):
+    """Minuscules, sans accents, mots alphanumériques précédés d'une espace"""
+    texte = unicodedata.normalize('NFKD', ' '.join(m for m in morceaux if m))
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return ' ' + ' '.join(re.findall(r'[0-9a-z]+', texte))
+
+
+def _nom(utilisateur):
+    return f'{utilisateur.last_name} {utilisateur.first_name}'.strip() or utilisateur.email
+
+
+def _entree_etudiant(etudiant):
+    utilisateur = etudiant.utilisateur
+    return EntreeRecherche(
+        type='ETUDIANT',
+        objet_id=etudiant.pk,
+        libelle=_nom(utilisateur),
+        detail=etudiant.matricule,
+        texte=normaliser(
+            etudiant.matricule, utilisateur.first_name, utilisateur.last_name, utilisateur.email
+        )
+    )
+
+
+def _entree_enseignant(enseignant):
+    utilisateur = enseignant.utilisateur
+    return EntreeRecherche(
+        type='ENSEIGNANT',
+        objet_id=enseignant.pk,
+        libelle=_nom(utilisateur),
+        detail=enseignant.specialite,
+        texte=normaliser(
+            utilisateur.first_name, utilisateur.last_name, utilisateur.email, enseignant.specialite
+        )
+    )
+
+
+def _entree_cours(cours):
+    return EntreeRecherche(
+        type='COURS',
+        objet_id=cours.pk,
+        libelle=cours.intitule,
+        detail=cours.code,
+        texte=normaliser(cours.code, cours.intitule)
+    )
+
+
+SOURCES = {
+    'ETUDIANT': (Etudiant.objects.select_related('utilisateur'), _entree_etudiant),
+    'ENSEIGNANT': (Enseignant.objects.select_related('utilisateur'), _entree_enseignant),
+    'COURS': (Cours.objects.all(), _entree_cours),
+}
+
+
+def indexer(type_entree, ids):
+    """(Ré)indexe les objets `ids` d'un type en une lecture et une écriture"""
+    queryset, construire = SOURCES[type_entree]
+    entrees = [construire(objet) for objet in queryset.filter(pk__in=list(ids))]
+    if entrees:
+        EntreeRecherche.objects.bulk_create(
+            entrees,
+            update_conflicts=True,
+            unique_fields=['type', 'objet_id'],
+            update_fields=['libelle', 'detail', 'texte'],
+        )
+    return entrees
+
+
+def desindexer(type_entree, ids):
+    EntreeRecherche.objects.filter(type=type_entree, objet_id__in=list(ids)).delete()
+
+
+def mots(texte):
+    return normaliser(texte).split()
+
+
+def entrees_correspondantes(texte, types=None, limite=None):
+    """
+    Entrées dont chaque mot de `texte` préfixe un mot indexé.
+    Avec `limite`, les `limite` premières par ordre de libellé.
+    """
+    recherches = mots(texte)
+    entrees = EntreeRecherche.objects.all()
+    if not recherches:
+        return entrees.none()
+
+    if connection.vendor == 'sqlite':
+        # Mots alphanumériques uniquement : pas d'échappement nécessaire.
+        # Le type est une colonne de la table FTS : tout le filtre reste dans l'index
+        expression = 'texte : (' + ' '.join(f'"{mot}"*' for mot in recherches) + ')'
+        if types:
+            expression += ' AND type : (' + ' OR '.join(f'"{t.lower()}"' for t in types) + ')'
+        # Pas de LIMIT ici : il s'appliquerait avant le tri par libellé
+        sql = f'SELECT rowid FROM {TABLE_FTS} WHERE {TABLE_FTS} MATCH %s'
+        entrees = entrees.filter(pk__in=RawSQL(sql, [expression]))
+    else:
+        if types:
+            entrees = entrees.filter(type__in=types)
+        for mot in recherches:
+            entrees = entrees.filter(texte__contains=' ' + mot)
+    if limite is not None:
+        entrees = entrees.order_by('libelle', 'pk')[:limite]
+    return entrees
+
+
+def suggestions(texte, types=None, limite=LIMITE_SUGGESTIONS):
+    """Suggestions de saisie : une seule requête, sans lecture des modèles indexés"""
+    return list(
+        entrees_correspondantes(texte, types, limite).values('type', 'objet_id', 'libelle', 'detail')
+    )
+
+
+def ids_correspondants(type_entree, texte):
+    """Sous-requête des identifiants d'objets d'un type correspondant à `texte`"""
+    return entrees_correspondantes(texte, [type_entree]).values('objet_id')
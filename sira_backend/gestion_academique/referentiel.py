@@ -0,0 +1,110 @@
+"""
+Cache en mémoire du processus pour les données de référence.
+
+L'année académique active et l'arbre Faculté → Département → Promotion
+changent quelques fois par an mais sont lus par presque tous les écrans.
+Ils sont gardés dans le processus et servis sans requête SQL.
+
+Les signaux des modèles concernés vident le cache local et incrémentent un
+numéro de version partagé par le backend de cache : les autres processus
+constatent le changement à leur prochaine vérification (au plus tous les
+`REFERENTIEL_DELAI_VERIFICATION` secondes). Avec le cache en mémoire par
+défaut, chaque processus a son propre compteur ; en production le backend
+doit être partagé (Redis, Memcached) pour que la version se propage.
+
+Les mises à jour en masse (`queryset.update()`) ne déclenchent pas de
+signal : appeler `invalider()` après coup.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from sira_backend.routeurs import lecture_principale
+from .models import AnneeAcademique, Departement, Faculte, Promotion
+
+CLE_VERSION = 'gestion_academique:referentiel:version'
+
+_verrou = threading.Lock()
+_etat = {
+    'version': None,
+    'verifie_le': 0.0,
+    'valeurs': {},
+}
+
+
+def _version_partagee():
+    version = cache.get(CLE_VERSION)
+    if version is None:
+        cache.add(CLE_VERSION, 1, timeout=None)
+        version = cache.get(CLE_VERSION, 1)
+    return version
+
+
+def _valeurs_a_jour():
+    """Valeurs locales, vidées si la version partagée a changé entre-temps"""
+    maintenant = time.monotonic()
+    delai = getattr(settings, 'REFERENTIEL_DELAI_VERIFICATION', 2)
+    if _etat['version'] is None or maintenant - _etat['verifie_le'] >= delai:
+        version = _version_partagee()
+        if version != _etat['version']:
+            _etat['valeurs'] = {}
+            _etat['version'] = version
+        _etat['verifie_le'] = maintenant
+    return _etat['valeurs']
+
+
+def _lire(cle, charger):
+    with _verrou:
+        valeurs = _valeurs_a_jour()
+        if cle not in valeurs:
+            with lecture_principale():
+                valeurs[cle] = charger()
+        return valeurs[cle]
+
+
+def invalider():
+    """Vide le cache local et signale le changement aux autres processus"""
+    try:
+        cache.incr(CLE_VERSION)
+    except ValueError:
+        cache.add(CLE_VERSION, 1, timeout=None)
+    with _verrou:
+        _etat['version'] = None
+        _etat['valeurs'] = {}
+
+
+def annee_active():
+    """L'année académique active, ou None"""
+    annee = _lire(
+        'annee_active',
+        lambda: AnneeAcademique.objects.filter(est_active=True).order_by('-date_debut').first()
+    )
+    # Copie : l'instance en cache est partagée entre les threads
+    return copy.copy(annee)
+
+
+def _charger_arbre():
+    facultes = {
+        faculte['id']: {**faculte, 'departements': []}
+        for faculte in Faculte.objects.order_by('nom').values('id', 'nom', 'sigle')
+    }
+    departements = {}
+    for departement in Departement.objects.order_by('nom').values('id', 'nom', 'faculte_id'):
+        faculte_id = departement.pop('faculte_id')
+        departement['promotions'] = []
+        departements[departement['id']] = departement
+        facultes[faculte_id]['departements'].append(departement)
+    for promotion in Promotion.objects.order_by('niveau', 'nom').values(
+        'id', 'nom', 'niveau', 'departement_id'
+    ):
+        departement_id = promotion.pop('departement_id')
+        departements[departement_id]['promotions'].append(promotion)
+    return list(facultes.values())
+
+
+def arbre():
+    """Facultés, avec leurs départements et leurs promotions (copie modifiable)"""
+    return copy.deepcopy(_lire('arbre', _charger_arbre))
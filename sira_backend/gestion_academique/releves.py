@@ -0,0 +1,78 @@
+from itertools import groupby
+
+from django.db import transaction
+
+from sira_backend.routeurs import lecture_principale
+from .models import CumulAnnuel, Etudiant, Resultat
+from .services import calculer_totaux
+
+
+def mettre_a_jour_cumuls(etudiant_ids):
+    """
+    Recalcule les lignes de relevé d'un lot d'étudiants, toutes années
+    confondues, en une seule lecture de leurs résultats.
+
+    Seuls les étudiants concernés par une modification sont recalculés ;
+    pour chacun, les cumuls d'une année reprennent tous les cours suivis
+    jusque-là, chaque cours gardant la meilleure de ses notes retenues.
+    """
+    etudiant_ids = set(
+        Etudiant.objects.filter(pk__in=etudiant_ids).values_list('pk', flat=True)
+    )
+    if not etudiant_ids:
+        return []
+
+    lignes = Resultat.objects.filter(
+        etudiant_id__in=etudiant_ids
+    ).retenus().order_by(
+        'etudiant_id', 'cours_annuel__annee__date_debut', 'cours_annuel__annee_id'
+    ).values_list(
+        'etudiant_id', 'cours_annuel__annee_id', 'cours_annuel__cours_id',
+        'moyenne', 'cours_annuel__cours__credits'
+    )
+
+    cumuls = []
+    for etudiant_id, resultats_etudiant in groupby(lignes, key=lambda ligne: ligne[0]):
+        # Par cours (et non par cours annuel) : une reprise remplace la
+        # tentative précédente si elle est meilleure
+        meilleures = {}
+        for annee_id, resultats_annee in groupby(resultats_etudiant, key=lambda ligne: ligne[1]):
+            resultats_annee = list(resultats_annee)
+            annuels = calculer_totaux(
+                (moyenne, credits) for _, _, _, moyenne, credits in resultats_annee
+            )
+            for _, _, cours_id, moyenne, credits in resultats_annee:
+                precedente = meilleures.get(cours_id, (None, credits))[0]
+                if precedente is None or (moyenne is not None and moyenne > precedente):
+                    meilleures[cours_id] = (moyenne, credits)
+            cumules = calculer_totaux(meilleures.values())
+            cumuls.append(CumulAnnuel(
+                etudiant_id=etudiant_id,
+                annee_id=annee_id,
+                credits_inscrits_cumules=cumules['credits_inscrits'],
+                credits_obtenus_cumules=cumules['credits_obtenus'],
+                moyenne_cumulee=cumules['moyenne_ponderee'],
+                **annuels
+            ))
+
+    with transaction.atomic():
+        CumulAnnuel.objects.filter(etudiant_id__in=etudiant_ids).delete()
+        return CumulAnnuel.objects.bulk_create(cumuls)
+
+
+def obtenir_releve(etudiant_id):
+    """
+    Lignes du relevé d'un étudiant, de sa première à sa dernière année.
+    Construites au premier accès si l'étudiant n'en a encore aucune.
+    """
+    cumuls = list(
+        CumulAnnuel.objects.filter(
+            etudiant_id=etudiant_id
+        ).select_related('annee').order_by('annee__date_debut', 'annee_id')
+    )
+    if not cumuls:
+        # Cumuls enregistrés pour tous : jamais construits d'après une réplique en retard
+        with lecture_principale():
+            if mettre_a_jour_cumuls([etudiant_id]):
+                return obtenir_releve(etudiant_id)
+    return cumuls
@@ -1,16 +1,93 @@
-from rest_framework import serializers
+from rest_framework import permissions, serializers
 from .models import (
     Etudiant, Enseignant, Faculte, Departement, AnneeAcademique,
-    Promotion, PromotionAnnuelle, Cours, CoursAnnuel, Inscription, Resultat
+    Promotion, PromotionAnnuelle, Cours, CoursAnnuel, Inscription, Resultat,
+    Bulletin, Deliberation, CumulAnnuel, ImpressionDocuments
 )
 from authentification.models import Utilisateur
+from .services import calculer_moyenne, calculer_mention
 
-class FaculteSerializer(serializers.ModelSerializer):
+
+def options_champs(request):
+    """
+    Lit les paramètres `?fields=` et `?expand=` d'une requête de lecture.
+
+    Retourne None si aucun des deux n'est fourni (représentation complète),
+    sinon un couple (champs, expansions) où `champs` vaut None quand la
+    liste n'est pas restreinte. Les expansions imbriquées s'écrivent avec
+    un point (`cours_annuel.enseignant`) et impliquent leurs parents.
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None
+    params = request.query_params
+    if 'fields' not in params and 'expand' not in params:
+        return None
+
+    champs = None
+    if 'fields' in params:
+        champs = {nom.strip() for nom in params['fields'].split(',') if nom.strip()}
+    expansions = set()
+    for chemin in params.get('expand', '').split(','):
+        morceaux = [morceau.strip() for morceau in chemin.split('.') if morceau.strip()]
+        for i in range(1, len(morceaux) + 1):
+            expansions.add('.'.join(morceaux[:i]))
+    return champs, expansions
+
+
+class ChampsDynamiquesMixin:
+    """
+    Permet au client de choisir la forme de la réponse :
+    - `?fields=id,etudiant,moyenne` ne garde que ces champs ;
+    - `?expand=etudiant,cours_annuel.cours` n'imbrique que ces relations,
+      les autres serializers imbriqués étant réduits à leur clé primaire.
+
+    Sans aucun de ces paramètres, la représentation complète est conservée.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        options = options_champs(self.context.get('request'))
+        if options is None:
+            return fields
+        champs, expansions = options
+
+        chemin = self._chemin_imbrication()
+        if not chemin and champs is not None:
+            for nom in list(fields):
+                if nom not in champs and not fields[nom].write_only:
+                    del fields[nom]
+
+        prefixe = f'{chemin}.' if chemin else ''
+        for nom, field in list(fields.items()):
+            serializer = getattr(field, 'child', field)
+            if not isinstance(serializer, serializers.BaseSerializer):
+                continue
+            if prefixe + nom in expansions:
+                continue
+            kwargs = {'source': field.source} if field.source not in (None, nom) else {}
+            fields[nom] = serializers.PrimaryKeyRelatedField(
+                many=isinstance(field, serializers.ListSerializer),
+                read_only=True,
+                **kwargs
+            )
+        return fields
+
+    def _chemin_imbrication(self):
+        """Chemin pointé de ce serializer depuis la racine (vide pour la racine)"""
+        noms = []
+        noeud = self
+        while noeud.parent is not None:
+            if noeud.field_name:
+                noms.append(noeud.field_name)
+            noeud = noeud.parent
+        return '.'.join(reversed(noms))
+
+class FaculteSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Faculte
         fields = '__all__'
 
-class DepartementSerializer(serializers.ModelSerializer):
+class DepartementSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     faculte = FaculteSerializer(read_only=True)
     faculte_id = serializers.PrimaryKeyRelatedField(
         queryset=Faculte.objects.all(),
@@ -22,7 +99,7 @@ class DepartementSerializer(serializers.ModelSerializer):
         model = Departement
         fields = '__all__'
 
-class AnneeAcademiqueSerializer(serializers.ModelSerializer):
+class AnneeAcademiqueSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = AnneeAcademique
         fields = '__all__'
@@ -35,7 +112,7 @@ class AnneeAcademiqueSerializer(serializers.ModelSerializer):
         if data['date_debut'] > data['date_fin']:
             raise serializers.ValidationError("La date de fin doit être postérieure à la date de début")
         return data
-class EnseignantSerializer(serializers.ModelSerializer):
+class EnseignantSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     # Champs utilisateur intégrés directement
     email = serializers.EmailField(source='utilisateur.email', required=True)
     password = serializers.CharField(source='utilisateur.password', write_only=True, required=False)
@@ -78,7 +155,7 @@ class EnseignantSerializer(serializers.ModelSerializer):
         )
         return enseignant
     
-class EtudiantSerializer(serializers.ModelSerializer):
+class EtudiantSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     # Champs utilisateur intégrés
     email = serializers.EmailField(source='utilisateur.email', required=True)
     password = serializers.CharField(source='utilisateur.password', write_only=True, required=False)
@@ -121,7 +198,7 @@ class EtudiantSerializer(serializers.ModelSerializer):
             **validated_data
         )
         return etudiant  
-class PromotionSerializer(serializers.ModelSerializer):
+class PromotionSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     departement = DepartementSerializer(read_only=True)
     departement_id = serializers.PrimaryKeyRelatedField(
         queryset=Departement.objects.all(),
@@ -133,7 +210,7 @@ class PromotionSerializer(serializers.ModelSerializer):
         model = Promotion
         fields = '__all__'
 
-class PromotionAnnuelleSerializer(serializers.ModelSerializer):
+class PromotionAnnuelleSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     promotion = PromotionSerializer(read_only=True)
     promotion_id = serializers.PrimaryKeyRelatedField(
         queryset=Promotion.objects.all(),
@@ -158,12 +235,12 @@ class PromotionAnnuelleSerializer(serializers.ModelSerializer):
         model = PromotionAnnuelle
         fields = '__all__'
 
-class CoursSerializer(serializers.ModelSerializer):
+class CoursSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Cours
         fields = '__all__'
 
-class CoursAnnuelSerializer(serializers.ModelSerializer):
+class CoursAnnuelSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     cours = CoursSerializer(read_only=True)
     cours_id = serializers.PrimaryKeyRelatedField(
         queryset=Cours.objects.all(),
@@ -188,7 +265,7 @@ class CoursAnnuelSerializer(serializers.ModelSerializer):
         model = CoursAnnuel
         fields = '__all__'
 
-class InscriptionSerializer(serializers.ModelSerializer):
+class InscriptionSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     etudiant = EtudiantSerializer(read_only=True)
     etudiant_id = serializers.PrimaryKeyRelatedField(
         queryset=Etudiant.objects.all(),
@@ -206,7 +283,7 @@ class InscriptionSerializer(serializers.ModelSerializer):
         model = Inscription
         fields = '__all__'
 
-class ResultatSerializer(serializers.ModelSerializer):
+class ResultatSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     etudiant = EtudiantSerializer(read_only=True)
     etudiant_id = serializers.PrimaryKeyRelatedField(
         queryset=Etudiant.objects.all(),
@@ -219,10 +296,15 @@ class ResultatSerializer(serializers.ModelSerializer):
         source='cours_annuel',
         write_only=True
     )
+    # Session qui compte pour ce cours ; None si le queryset ne l'a pas résolue
+    est_retenu = serializers.SerializerMethodField()
     
     class Meta:
         model = Resultat
         fields = '__all__'
+
+    def get_est_retenu(self, obj):
+        return getattr(obj, 'est_retenu', None)
         
     def validate(self, data):
         for field in ['note_tp', 'note_interro', 'note_examen']:
@@ -234,19 +316,106 @@ class ResultatSerializer(serializers.ModelSerializer):
         return data
         
     def calculate_moyenne(self, validated_data):
-        notes = []
-        weights = {'note_tp': 0.3, 'note_interro': 0.2, 'note_examen': 0.5}
-        
-        for field, weight in weights.items():
-            if validated_data.get(field):
-                notes.append(float(validated_data[field]) * weight)
-                
-        return sum(notes) if notes else None
+        return calculer_moyenne(validated_data)
 
     def create(self, validated_data):
         validated_data['moyenne'] = self.calculate_moyenne(validated_data)
+        validated_data['mention'] = calculer_mention(validated_data['moyenne'])
         return super().create(validated_data)
     
     def update(self, instance, validated_data):
         validated_data['moyenne'] = self.calculate_moyenne(validated_data)
-        return super().update(instance, validated_data)
\ No newline at end of file
+        validated_data['mention'] = calculer_mention(validated_data['moyenne'])
+        return super().update(instance, validated_data)
+
+class ResultatLigneSerializer(serializers.Serializer):
+    """
+    Ligne d'une saisie de notes en masse.
+    Aucune requête n'est faite ici : l'existence des étudiants est
+    vérifiée en une seule fois par la vue.
+    """
+    etudiant_id = serializers.IntegerField()
+    session = serializers.ChoiceField(
+        choices=Resultat.SESSION_CHOICES,
+        required=False
+    )
+    note_tp = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0, max_value=20,
+        required=False, allow_null=True
+    )
+    note_interro = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0, max_value=20,
+        required=False, allow_null=True
+    )
+    note_examen = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0, max_value=20,
+        required=False, allow_null=True
+    )
+
+class ResultatBulkSerializer(serializers.Serializer):
+    """
+    Saisie en masse des notes d'un cours annuel.
+    `session` s'applique aux lignes qui ne précisent pas la leur.
+    """
+    session = serializers.ChoiceField(
+        choices=Resultat.SESSION_CHOICES,
+        default='NORMALE'
+    )
+    resultats = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False
+    )
+
+class BulletinSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Bulletin
+        fields = [
+            'etudiant', 'annee', 'resultats', 'credits_inscrits',
+            'credits_obtenus', 'moyenne_ponderee', 'date_maj'
+        ]
+        read_only_fields = fields
+
+class CumulAnnuelSerializer(serializers.ModelSerializer):
+    annee_libelle = serializers.CharField(source='annee.libelle', read_only=True)
+
+    class Meta:
+        model = CumulAnnuel
+        fields = [
+            'annee', 'annee_libelle', 'credits_inscrits', 'credits_obtenus',
+            'moyenne_ponderee', 'credits_inscrits_cumules',
+            'credits_obtenus_cumules', 'moyenne_cumulee'
+        ]
+        read_only_fields = fields
+
+class ImpressionDocumentsSerializer(serializers.ModelSerializer):
+    """Demande d'impression et suivi de sa progression"""
+    est_telechargeable = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImpressionDocuments
+        fields = [
+            'id', 'type_document', 'promotion_annuelle', 'statut', 'total',
+            'generes', 'inchanges', 'message', 'est_telechargeable',
+            'date_creation', 'date_maj'
+        ]
+        read_only_fields = [
+            'statut', 'total', 'generes', 'inchanges', 'message',
+            'date_creation', 'date_maj'
+        ]
+
+    def get_est_telechargeable(self, obj):
+        return obj.statut == 'TERMINE' and bool(obj.archive)
+
+class DeliberationSerializer(serializers.ModelSerializer):
+    matricule = serializers.CharField(source='etudiant.matricule', read_only=True)
+    nom = serializers.CharField(source='etudiant.utilisateur.last_name', read_only=True)
+    prenom = serializers.CharField(source='etudiant.utilisateur.first_name', read_only=True)
+
+    class Meta:
+        model = Deliberation
+        fields = [
+            'etudiant', 'matricule', 'nom', 'prenom', 'moyenne_ponderee',
+            'credits_inscrits', 'credits_obtenus', 'rang', 'decision',
+            'date_deliberation'
+        ]
+        read_only_fields = fields
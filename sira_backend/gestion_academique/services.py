@@ -0,0 +1,148 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import Etudiant, Resultat
+
+# Émis après validation de la transaction, avec `annee_id`, `etudiant_ids`
+# et `cours_annuel_ids`, chaque fois que des résultats sont créés, modifiés
+# ou supprimés (y compris par les écritures en masse).
+resultats_modifies = Signal()
+
+# Pondération des notes dans le calcul de la moyenne
+PONDERATIONS = {'note_tp': 0.3, 'note_interro': 0.2, 'note_examen': 0.5}
+
+# Seuils (sur 20) des mentions, du plus haut au plus bas
+MENTIONS = [
+    (16, 'Très bien'),
+    (14, 'Bien'),
+    (12, 'Assez bien'),
+    (10, 'Passable'),
+]
+MENTION_ECHEC = 'Ajourné'
+SEUIL_REUSSITE = 10
+
+CHAMPS_NOTES = list(PONDERATIONS)
+
+
+def calculer_moyenne(notes):
+    """
+    Calcule la moyenne pondérée à partir d'un dictionnaire de notes.
+    Les notes absentes (None) ne sont pas prises en compte ; un 0 compte.
+    """
+    valeurs = [
+        float(notes[champ]) * poids
+        for champ, poids in PONDERATIONS.items()
+        if notes.get(champ) is not None
+    ]
+    if not valeurs:
+        return None
+    return arrondir(Decimal(sum(valeurs)))
+
+
+def calculer_mention(moyenne):
+    """Retourne la mention correspondant à une moyenne sur 20"""
+    if moyenne is None:
+        return ''
+    for seuil, mention in MENTIONS:
+        if moyenne >= seuil:
+            return mention
+    return MENTION_ECHEC
+
+
+def arrondir(valeur):
+    return valeur.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def calculer_totaux(lignes):
+    """
+    Calcule les crédits et la moyenne pondérée par les crédits.
+
+    `lignes` est un itérable de couples (moyenne, credits), un par cours :
+    la note retenue entre les sessions (voir `ResultatQuerySet.retenus`).
+    Un cours sans moyenne compte dans les crédits inscrits seulement.
+    """
+    credits_inscrits = 0
+    credits_obtenus = 0
+    credits_notes = 0
+    points = Decimal(0)
+    for moyenne, credits in lignes:
+        credits_inscrits += credits
+        if moyenne is None:
+            continue
+        points += moyenne * credits
+        credits_notes += credits
+        if moyenne >= SEUIL_REUSSITE:
+            credits_obtenus += credits
+
+    return {
+        'credits_inscrits': credits_inscrits,
+        'credits_obtenus': credits_obtenus,
+        'moyenne_ponderee': arrondir(points / credits_notes) if credits_notes else None,
+    }
+
+
+def enregistrer_resultats_en_masse(cours_annuel, lignes):
+    """
+    Enregistre (ou met à jour) un lot de résultats pour un cours annuel.
+
+    `lignes` est une liste de dictionnaires déjà validés contenant
+    `etudiant_id`, `session` et les notes. Les moyennes et mentions sont
+    calculées en une seule passe puis l'ensemble est écrit avec un unique
+    `bulk_create` en mode upsert sur la clé (etudiant, cours_annuel, session).
+
+    Retourne la liste des résultats écrits.
+    """
+    resultats = []
+    for ligne in lignes:
+        moyenne = calculer_moyenne(ligne)
+        resultats.append(Resultat(
+            etudiant_id=ligne['etudiant_id'],
+            cours_annuel=cours_annuel,
+            session=ligne['session'],
+            note_tp=ligne.get('note_tp'),
+            note_interro=ligne.get('note_interro'),
+            note_examen=ligne.get('note_examen'),
+            moyenne=moyenne,
+            mention=calculer_mention(moyenne),
+        ))
+
+    if not resultats:
+        return []
+
+    with transaction.atomic():
+        resultats = Resultat.objects.bulk_create(
+            resultats,
+            update_conflicts=True,
+            unique_fields=['etudiant', 'cours_annuel', 'session'],
+            update_fields=CHAMPS_NOTES + ['moyenne', 'mention'],
+        )
+        # bulk_create n'émet pas post_save : on prévient les abonnés en une fois
+        signaler_resultats_modifies(
+            cours_annuel.annee_id,
+            {resultat.etudiant_id for resultat in resultats},
+            [cours_annuel.pk]
+        )
+    return resultats
+
+
+def signaler_resultats_modifies(annee_id, etudiant_ids, cours_annuel_ids=()):
+    """Émet `resultats_modifies` une fois la transaction courante validée"""
+    etudiant_ids = list(etudiant_ids)
+    cours_annuel_ids = list(cours_annuel_ids)
+    transaction.on_commit(
+        lambda: resultats_modifies.send(
+            sender=Resultat,
+            annee_id=annee_id,
+            etudiant_ids=etudiant_ids,
+            cours_annuel_ids=cours_annuel_ids
+        )
+    )
+
+
+def etudiants_existants(ids):
+    """Retourne l'ensemble des identifiants d'étudiants existants parmi `ids`"""
+    return set(
+        Etudiant.objects.filter(pk__in=ids).values_list('pk', flat=True)
+    )
@@ -0,0 +1,164 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from authentification.models import Utilisateur
+from sira_backend.conditionnel import nom_tampon, suivre, toucher
+from . import recherche, referentiel, statistiques
+from .bulletins import reconstruire_bulletins
+from .releves import mettre_a_jour_cumuls
+from .models import (
+    AnneeAcademique, Bulletin, Cours, CoursAnnuel, Departement, Enseignant,
+    Etudiant, Faculte, Promotion, Resultat
+)
+from .services import resultats_modifies, signaler_resultats_modifies
+
+# Champs utilisateur repris dans le contenu des bulletins (et dans l'index de recherche)
+CHAMPS_UTILISATEUR_BULLETIN = {'email', 'first_name', 'last_name', 'telephone'}
+
+
+def signaler_resultat(etudiant_id, cours_annuel_id):
+    annee_id = CoursAnnuel.objects.filter(
+        pk=cours_annuel_id
+    ).values_list('annee_id', flat=True).first()
+    signaler_resultats_modifies(annee_id, [etudiant_id], [cours_annuel_id])
+
+
+@receiver(pre_save, sender=Resultat)
+def lire_etat_resultat(sender, instance, **kwargs):
+    # Étudiant et cours annuel enregistrés : un résultat déplacé met aussi
+    # à jour les bulletins, relevés et statistiques de sa place d'avant
+    instance._place_avant = None
+    if not instance._state.adding:
+        instance._place_avant = Resultat.objects.filter(
+            pk=instance.pk
+        ).values_list('etudiant_id', 'cours_annuel_id').first()
+
+
+@receiver(post_save, sender=Resultat)
+def resultat_enregistre(sender, instance, **kwargs):
+    signaler_resultat(instance.etudiant_id, instance.cours_annuel_id)
+    avant = getattr(instance, '_place_avant', None)
+    if avant is not None and avant != (instance.etudiant_id, instance.cours_annuel_id):
+        signaler_resultat(*avant)
+
+
+@receiver(post_delete, sender=Resultat)
+def resultat_supprime(sender, instance, **kwargs):
+    signaler_resultat(instance.etudiant_id, instance.cours_annuel_id)
+
+
+@receiver(resultats_modifies)
+def mettre_a_jour_bulletins(sender, annee_id, etudiant_ids, **kwargs):
+    if annee_id is not None:
+        reconstruire_bulletins(annee_id, etudiant_ids)
+
+
+@receiver(resultats_modifies)
+def mettre_a_jour_releves(sender, etudiant_ids, **kwargs):
+    mettre_a_jour_cumuls(etudiant_ids)
+
+
+@receiver(resultats_modifies)
+def invalider_statistiques(sender, cours_annuel_ids=(), **kwargs):
+    statistiques.invalider(cours_annuel_ids)
+
+
+def invalider_bulletins(resultats):
+    """
+    Supprime, en une requête, les bulletins touchés par un ensemble de
+    résultats ; ils seront reconstruits à la prochaine lecture.
+    """
+    Bulletin.objects.filter(
+        Exists(resultats.filter(
+            etudiant_id=OuterRef('etudiant_id'),
+            cours_annuel__annee_id=OuterRef('annee_id')
+        )),
+        # Borne le parcours aux bulletins des étudiants concernés
+        etudiant_id__in=resultats.values('etudiant_id')
+    ).delete()
+
+
+def mettre_a_jour_releves_de(resultats):
+    """Recalcule les relevés des étudiants ayant un résultat dans `resultats`"""
+    mettre_a_jour_cumuls(resultats.values_list('etudiant_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Cours)
+def cours_modifie(sender, instance, created, **kwargs):
+    if not created:
+        resultats = Resultat.objects.filter(cours_annuel__cours=instance)
+        invalider_bulletins(resultats)
+        # Les crédits du cours entrent dans les cumuls
+        mettre_a_jour_releves_de(resultats)
+
+
+@receiver(post_save, sender=CoursAnnuel)
+def cours_annuel_modifie(sender, instance, created, **kwargs):
+    if not created:
+        invalider_bulletins(instance.resultat_set.all())
+        mettre_a_jour_releves_de(instance.resultat_set.all())
+
+
+@receiver(post_save, sender=Etudiant)
+def etudiant_modifie(sender, instance, created, **kwargs):
+    if not created:
+        Bulletin.objects.filter(etudiant=instance).delete()
+
+
+@receiver(post_save, sender=Enseignant)
+def enseignant_modifie(sender, instance, created, **kwargs):
+    if not created:
+        invalider_bulletins(Resultat.objects.filter(cours_annuel__enseignant=instance))
+
+
+@receiver(post_save, sender=Utilisateur)
+def utilisateur_modifie(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not CHAMPS_UTILISATEUR_BULLETIN & set(update_fields):
+        return
+    Bulletin.objects.filter(etudiant__utilisateur=instance).delete()
+    invalider_bulletins(
+        Resultat.objects.filter(cours_annuel__enseignant__utilisateur=instance)
+    )
+    # Profils étudiant et enseignant partagent la clé primaire de l'utilisateur
+    recherche.indexer('ETUDIANT', [instance.pk])
+    recherche.indexer('ENSEIGNANT', [instance.pk])
+    # Noms repris dans le rapport de charge horaire
+    toucher(nom_tampon(Enseignant))
+
+
+@receiver([post_save, post_delete], sender=AnneeAcademique)
+@receiver([post_save, post_delete], sender=Faculte)
+@receiver([post_save, post_delete], sender=Departement)
+@receiver([post_save, post_delete], sender=Promotion)
+def referentiel_modifie(sender, **kwargs):
+    # Tout de suite pour ce processus, puis à nouveau après le commit pour
+    # écarter une relecture concurrente des anciennes valeurs
+    referentiel.invalider()
+    transaction.on_commit(referentiel.invalider)
+
+
+# Tampons de version des réponses conditionnelles (ETag)
+for modele in (AnneeAcademique, Faculte, Departement, Promotion, Cours, CoursAnnuel, Enseignant):
+    suivre(modele)
+
+
+# Index de recherche
+TYPES_RECHERCHE = {Etudiant: 'ETUDIANT', Enseignant: 'ENSEIGNANT', Cours: 'COURS'}
+
+
+@receiver(post_save, sender=Etudiant)
+@receiver(post_save, sender=Enseignant)
+@receiver(post_save, sender=Cours)
+def indexer_pour_recherche(sender, instance, **kwargs):
+    recherche.indexer(TYPES_RECHERCHE[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Etudiant)
+@receiver(post_delete, sender=Enseignant)
+@receiver(post_delete, sender=Cours)
+def desindexer_pour_recherche(sender, instance, **kwargs):
+    recherche.desindexer(TYPES_RECHERCHE[sender], [instance.pk])
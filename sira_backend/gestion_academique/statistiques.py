@@ -0,0 +1,102 @@
+"""
+Statistiques des moyennes d'un cours annuel pour une session, ou pour la
+note retenue de chaque étudiant.
+
+Effectif, moyenne, écart-type, taux de réussite et histogramme sont
+calculés par la base en une seule agrégation ; la médiane est lue ensuite
+en ne récupérant que la ou les deux valeurs centrales. Le résultat reste en
+cache jusqu'à la prochaine modification d'un résultat du cours
+(signal `resultats_modifies`).
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, StdDev
+
+from sira_backend.routeurs import lecture_principale
+from .models import Resultat
+from .services import SEUIL_REUSSITE
+
+# Bornes des classes de l'histogramme (sur 20), la dernière incluant 20
+CLASSES = [(borne, borne + 2) for borne in range(0, 20, 2)]
+
+# En plus des sessions, `RETENUE` porte sur la note retenue de chaque étudiant
+SESSION_RETENUE = 'RETENUE'
+SESSIONS = [session for session, _ in Resultat.SESSION_CHOICES] + [SESSION_RETENUE]
+
+
+def _cle(cours_annuel_id, session):
+    return f'gestion_academique:statistiques:{cours_annuel_id}:{session}'
+
+
+def _arrondi(valeur):
+    return None if valeur is None else round(float(valeur), 2)
+
+
+def calculer_statistiques(cours_annuel_id, session):
+    resultats = Resultat.objects.filter(cours_annuel_id=cours_annuel_id, moyenne__isnull=False)
+    if session == SESSION_RETENUE:
+        # Écarter les moyennes vides avant la fenêtre ne change pas la note
+        # retenue : elles sont classées en dernier
+        resultats = resultats.retenus()
+    else:
+        resultats = resultats.filter(session=session)
+    classes = {
+        f'classe_{index}': Count('pk', filter=Q(moyenne__gte=de) & (
+            Q(moyenne__lte=a) if a == 20 else Q(moyenne__lt=a)
+        ))
+        for index, (de, a) in enumerate(CLASSES)
+    }
+    agregats = resultats.aggregate(
+        effectif=Count('pk'),
+        # Alias distincts du champ `moyenne`, que les agrégats suivants lisent
+        moyenne_cours=Avg('moyenne'),
+        ecart_type=StdDev('moyenne'),
+        reussites=Count('pk', filter=Q(moyenne__gte=SEUIL_REUSSITE)),
+        **classes
+    )
+
+    effectif = agregats['effectif']
+    mediane = None
+    if effectif:
+        milieu = (effectif - 1) // 2
+        centrales = list(
+            resultats.order_by('moyenne').values_list('moyenne', flat=True)[
+                milieu:milieu + 2 - effectif % 2
+            ]
+        )
+        mediane = sum(centrales) / len(centrales)
+
+    return {
+        'cours_annuel': int(cours_annuel_id),
+        'session': session,
+        'effectif': effectif,
+        'moyenne': _arrondi(agregats['moyenne_cours']),
+        'mediane': _arrondi(mediane),
+        'ecart_type': _arrondi(agregats['ecart_type']),
+        'taux_reussite': round(agregats['reussites'] / effectif, 4) if effectif else None,
+        'histogramme': [
+            {'de': de, 'a': a, 'effectif': agregats[f'classe_{index}']}
+            for index, (de, a) in enumerate(CLASSES)
+        ],
+    }
+
+
+def statistiques_en_cache(cours_annuel_id, session):
+    """Statistiques déjà calculées, ou None"""
+    return cache.get(_cle(cours_annuel_id, session))
+
+
+def obtenir_statistiques(cours_annuel_id, session):
+    statistiques = statistiques_en_cache(cours_annuel_id, session)
+    if statistiques is None:
+        with lecture_principale():
+            statistiques = calculer_statistiques(cours_annuel_id, session)
+        cache.set(_cle(cours_annuel_id, session), statistiques, timeout=None)
+    return statistiques
+
+
+def invalider(cours_annuel_ids):
+    cache.delete_many([
+        _cle(cours_annuel_id, session)
+        for cours_annuel_id in cours_annuel_ids
+        for session in SESSIONS
+    ])
@@ -1,3 +1,1118 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, router
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentification.models import Utilisateur
+from communication.models import Notification
+from sira_backend import routeurs
+from sira_backend.bases import configuration_bases
+from . import passages, referentiel
+from .bulletins import reconstruire_bulletins
+from .releves import mettre_a_jour_cumuls
+from .deliberations import deliberer
+from .impressions import prendre_impression, traiter_file
+from .publications import CONTENU_REGROUPE
+from .recherche import LIMITE_SUGGESTIONS
+from .models import (
+    Faculte, Departement, AnneeAcademique, Promotion, PromotionAnnuelle,
+    Cours, CoursAnnuel, Etudiant, Enseignant, Inscription, Resultat, Deliberation,
+    Bulletin, CumulAnnuel
+)
+
+NB_ETUDIANTS = 6
+NB_COURS = 3
+
+
+class DonneesAcademiquesMixin:
+    """Jeu de données commun : une promotion, ses cours et leurs résultats"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user(
+            email='admin@sira.com', password='admin123', is_staff=True
+        )
+        cls.faculte = Faculte.objects.create(nom='Faculté des Sciences', sigle='FS')
+        cls.departement = Departement.objects.create(nom='Informatique', faculte=cls.faculte)
+        cls.annee = AnneeAcademique.objects.create(
+            libelle='2023-2024',
+            date_debut=date(2023, 9, 1),
+            date_fin=date(2024, 8, 31),
+            est_active=True
+        )
+        cls.promotions = [
+            Promotion.objects.create(
+                nom=f'Licence {niveau} Informatique',
+                niveau=niveau,
+                departement=cls.departement
+            )
+            for niveau in (1, 2)
+        ]
+
+        cls.enseignants = []
+        for i in range(NB_COURS):
+            utilisateur = Utilisateur.objects.create_user(
+                email=f'enseignant{i}@sira.com', password='x',
+                first_name=f'Enseignant{i}', last_name='Professeur'
+            )
+            cls.enseignants.append(Enseignant.objects.create(
+                utilisateur=utilisateur, specialite='Informatique', bureau=f'B{i}'
+            ))
+
+        cls.promotion_annuelle = PromotionAnnuelle.objects.create(
+            promotion=cls.promotions[0],
+            annee=cls.annee,
+            responsable=cls.enseignants[0]
+        )
+        cls.cours_annuels = [
+            CoursAnnuel.objects.create(
+                cours=Cours.objects.create(
+                    code=f'INF10{i}', intitule=f'Cours {i}',
+                    credits=4 + i, heures_CM=30, heures_TP=15
+                ),
+                annee=cls.annee,
+                enseignant=cls.enseignants[i],
+                semestre=1 + i % 2
+            )
+            for i in range(NB_COURS)
+        ]
+
+        cls.etudiants = []
+        for i in range(NB_ETUDIANTS):
+            utilisateur = Utilisateur.objects.create_user(
+                email=f'etudiant{i}@sira.com', password='x',
+                first_name=f'Étudiant{i}', last_name=f'Test{i}'
+            )
+            etudiant = Etudiant.objects.create(
+                utilisateur=utilisateur,
+                matricule=f'MAT{i:03d}',
+                date_naissance=date(2000, 1, 1),
+                lieu_naissance='Bukavu',
+                genre='F' if i % 2 else 'M'
+            )
+            cls.etudiants.append(etudiant)
+            Inscription.objects.create(etudiant=etudiant, promotion_annuelle=cls.promotion_annuelle)
+            for j, cours_annuel in enumerate(cls.cours_annuels):
+                Resultat.objects.create(
+                    etudiant=etudiant,
+                    cours_annuel=cours_annuel,
+                    moyenne=8 + (i + j) % 10,
+                    session='NORMALE'
+                )
+        # Une session de rattrapage pour le premier étudiant
+        Resultat.objects.create(
+            etudiant=cls.etudiants[0],
+            cours_annuel=cls.cours_annuels[0],
+            moyenne=15,
+            session='RATTRAPAGE'
+        )
+
+    def setUp(self):
+        # Le cache du processus survit au rollback des tests précédents
+        referentiel.invalider()
+        self.client.force_authenticate(self.admin)
+
+
+class BudgetRequetesTests(DonneesAcademiquesMixin, APITestCase):
+    """
+    Chaque endpoint de lecture doit s'exécuter en un nombre de requêtes
+    fixe, indépendant du nombre de lignes renvoyées.
+    """
+
+    def assertBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_listes(self):
+        for url in [
+            '/gestion/facultes/',
+            '/gestion/departements/',
+            '/gestion/annees-academiques/',
+            '/gestion/promotions/',
+            '/gestion/promotions-annuelles/',
+            '/gestion/cours/',
+            '/gestion/cours-annuels/',
+            '/gestion/inscriptions/',
+            '/gestion/resultats/',
+            '/gestion/enseignants/',
+            '/gestion/etudiants/',
+        ]:
+            with self.subTest(url=url):
+                self.assertBudget(url, 1)
+
+    def test_listes_compactes(self):
+        response = self.assertBudget('/gestion/resultats/?expand=&page_size=100', 1)
+        resultat = response.data['results'][0]
+        self.assertIsInstance(resultat['etudiant'], int)
+        self.assertIsInstance(resultat['cours_annuel'], int)
+
+        response = self.assertBudget(
+            '/gestion/resultats/?fields=id,etudiant,moyenne&expand=etudiant', 1
+        )
+        self.assertEqual(set(response.data['results'][0]), {'id', 'etudiant', 'moyenne'})
+        self.assertEqual(response.data['results'][0]['etudiant']['nom'][:4], 'Test')
+
+    def test_details(self):
+        self.assertBudget(f'/gestion/resultats/{Resultat.objects.first().pk}/', 1)
+        self.assertBudget(f'/gestion/inscriptions/{Inscription.objects.first().pk}/', 1)
+        self.assertBudget(f'/gestion/cours-annuels/{self.cours_annuels[0].pk}/', 1)
+
+    def test_actions(self):
+        self.assertBudget(f'/gestion/facultes/{self.faculte.pk}/departements/', 2)
+        self.assertBudget(f'/gestion/departements/{self.departement.pk}/promotions/', 2)
+        self.assertBudget(
+            f'/gestion/promotions-annuelles/{self.promotion_annuelle.pk}/inscriptions/', 2
+        )
+        self.assertBudget(f'/gestion/cours-annuels/{self.cours_annuels[0].pk}/resultats/', 2)
+        self.assertBudget(
+            f'/gestion/enseignants/{self.enseignants[0].utilisateur_id}/cours/', 2
+        )
+        self.assertBudget('/gestion/annees-academiques/active/', 1)
+        # Ensuite servie par le cache du processus
+        self.assertBudget('/gestion/annees-academiques/active/', 0)
+
+    def test_bulletin(self):
+        reconstruire_bulletins(self.annee.pk, [self.etudiants[0].pk])
+        response = self.assertBudget(
+            f'/gestion/resultats/bulletin/?etudiant={self.etudiants[0].pk}&annee={self.annee.pk}',
+            1
+        )
+        self.assertEqual(len(response.data['resultats']), NB_COURS + 1)
+
+    def test_deliberation(self):
+        self.client.post(f'/gestion/promotions-annuelles/{self.promotion_annuelle.pk}/deliberation/')
+        response = self.assertBudget(
+            f'/gestion/promotions-annuelles/{self.promotion_annuelle.pk}/deliberation/', 2
+        )
+        self.assertEqual(len(response.data), NB_ETUDIANTS)
+
+
+class ReferentielTests(DonneesAcademiquesMixin, APITestCase):
+
+    def test_arbre_en_cache(self):
+        with self.assertNumQueries(3):
+            self.client.get('/gestion/facultes/arbre/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/gestion/facultes/arbre/')
+
+        departement = response.data[0]['departements'][0]
+        self.assertEqual(departement['nom'], 'Informatique')
+        self.assertEqual([promotion['niveau'] for promotion in departement['promotions']], [1, 2])
+
+    def test_invalidation_par_les_signaux(self):
+        self.client.get('/gestion/facultes/arbre/')
+        self.assertEqual(referentiel.annee_active(), self.annee)
+
+        Promotion.objects.create(nom='Licence 3 Informatique', niveau=3, departement=self.departement)
+        self.annee.est_active = False
+        self.annee.save()
+
+        response = self.client.get('/gestion/facultes/arbre/')
+        self.assertEqual(len(response.data[0]['departements'][0]['promotions']), 3)
+        self.assertIsNone(referentiel.annee_active())
+
+    def test_version_partagee(self):
+        referentiel.annee_active()
+        # Un autre processus a modifié les données : seule la version partagée change
+        AnneeAcademique.objects.filter(pk=self.annee.pk).update(libelle='2024-2025')
+        cache.incr(referentiel.CLE_VERSION)
+
+        with self.settings(REFERENTIEL_DELAI_VERIFICATION=0):
+            self.assertEqual(referentiel.annee_active().libelle, '2024-2025')
+
+
+class ReponsesConditionnellesTests(DonneesAcademiquesMixin, APITestCase):
+
+    def test_etag_et_304(self):
+        response = self.client.get('/gestion/facultes/')
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, max-age=60')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/gestion/facultes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Autre URL, autre représentation
+        response = self.client.get('/gestion/facultes/?search=FS', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_modification_change_l_etag(self):
+        etag = self.client.get('/gestion/cours/')['ETag']
+
+        cours = Cours.objects.get(code='INF100')
+        cours.intitule = 'Algorithmique'
+        cours.save()
+
+        response = self.client.get('/gestion/cours/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_if_modified_since(self):
+        response = self.client.get('/gestion/annees-academiques/active/')
+
+        response = self.client.get(
+            '/gestion/annees-academiques/active/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_actions_non_conditionnelles(self):
+        response = self.client.get(f'/gestion/facultes/{self.faculte.pk}/departements/')
+        self.assertIn('ETag', response)
+        response = self.client.get('/gestion/promotions/')
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(BASES_REPLIQUES=['default'])
+class RepliquesTests(APITransactionTestCase):
+    """
+    La réplique est la base de test elle-même : on observe les choix du
+    routeur. Hors transaction de test, sans quoi toute lecture resterait
+    sur la base principale.
+    """
+
+    def setUp(self):
+        cache.clear()
+        referentiel.invalider()
+        self.admin = Utilisateur.objects.create_user(
+            email='admin@sira.com', password='admin123', is_staff=True
+        )
+        self.cours_annuel = CoursAnnuel.objects.create(
+            cours=Cours.objects.create(
+                code='INF101', intitule='Cours 1', credits=4, heures_CM=30, heures_TP=15
+            ),
+            annee=AnneeAcademique.objects.create(
+                libelle='2023-2024', date_debut=date(2023, 9, 1), date_fin=date(2024, 8, 31)
+            ),
+            semestre=1
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        patcher = mock.patch('sira_backend.routeurs.choisir_replique', return_value='default')
+        self.replique = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lectures_sur_la_replique(self):
+        self.assertEqual(self.client.get('/gestion/etudiants/').status_code, 200)
+        self.assertTrue(self.replique.called)
+
+        # Y compris le contenu des réponses en flux, lu après la vue
+        response = self.client.get(f'/gestion/cours-annuels/{self.cours_annuel.pk}/export/')
+        self.replique.reset_mock()
+        b''.join(response.streaming_content)
+        self.assertTrue(self.replique.called)
+
+    def test_lecture_apres_ecriture_sur_la_principale(self):
+        response = self.client.post('/gestion/facultes/', {'nom': 'Droit', 'sigle': 'FD'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(self.replique.called)
+
+        self.client.get('/gestion/facultes/')
+        self.assertFalse(self.replique.called)
+
+        # Passé le délai, la réplique est de nouveau utilisée
+        cache.clear()
+        self.client.get('/gestion/facultes/')
+        self.assertTrue(self.replique.called)
+
+    def test_autres_applications_sur_la_principale(self):
+        self.assertEqual(self.client.get('/api/me/').status_code, 200)
+        self.assertFalse(self.replique.called)
+
+    def test_bulletins_et_releves_construits_sur_la_principale(self):
+        etudiant = Etudiant.objects.create(
+            utilisateur=Utilisateur.objects.create_user(email='etudiant@sira.com', password='x'),
+            matricule='MAT001', date_naissance=date(2000, 1, 1), lieu_naissance='Bukavu', genre='M'
+        )
+        Resultat.objects.create(etudiant=etudiant, cours_annuel=self.cours_annuel, moyenne=12, session='NORMALE')
+        # Construits au premier accès
+        Bulletin.objects.all().delete()
+        CumulAnnuel.objects.all().delete()
+        cache.clear()
+        repliques_actives = []
+
+        def espion(fonction):
+            def construire(*args):
+                repliques_actives.append(routeurs._etat.get().repliques)
+                return fonction(*args)
+            return construire
+
+        with mock.patch('gestion_academique.bulletins.reconstruire_bulletins',
+                        espion(reconstruire_bulletins)), \
+                mock.patch('gestion_academique.releves.mettre_a_jour_cumuls',
+                           espion(mettre_a_jour_cumuls)):
+            self.client.get(
+                f'/gestion/resultats/bulletin/?etudiant={etudiant.pk}&annee={self.cours_annuel.annee_id}'
+            )
+            # Sans la marque d'écriture laissée par la requête précédente
+            cache.clear()
+            self.client.get(f'/gestion/resultats/releve/?etudiant={etudiant.pk}')
+        # La réplique sert la lecture du bulletin stocké, pas sa construction
+        self.assertTrue(self.replique.called)
+        self.assertEqual(repliques_actives, [False, False])
+
+
+@override_settings(BASES_REPLIQUES=['replique'])
+class RouteurEcrituresTests(SimpleTestCase):
+    """Un objet lu sur une réplique est toujours écrit sur la base principale"""
+
+    def setUp(self):
+        jeton = routeurs._etat.set(routeurs._Etat(repliques=True))
+        self.addCleanup(routeurs._etat.reset, jeton)
+
+    def lu_sur(self, base):
+        faculte = Faculte(pk=1, nom='Faculté des Sciences', sigle='FS')
+        faculte._state.adding = False
+        faculte._state.db = base
+        return faculte
+
+    def test_ecritures_sur_la_principale(self):
+        faculte = self.lu_sur('replique')
+        self.assertEqual(router.db_for_write(Faculte, instance=faculte), 'default')
+        # Un nouvel objet qui s'y rattache aussi
+        departement = Departement(nom='Informatique', faculte=faculte)
+        self.assertEqual(departement._state.db, 'default')
+
+    def test_relations_entre_principale_et_repliques(self):
+        departement = Departement(nom='Informatique')
+        departement._state.db = 'default'
+        self.assertTrue(router.allow_relation(self.lu_sur('replique'), departement))
+        with self.assertRaises(ValueError):
+            departement.faculte = self.lu_sur('autre')
+
+
+class ConfigurationBasesTests(SimpleTestCase):
+
+    def test_sqlite_par_defaut(self):
+        bases = configuration_bases('/srv/sira/db.sqlite3', environ={})
+
+        self.assertEqual(list(bases), ['default'])
+        self.assertEqual(bases['default']['NAME'], '/srv/sira/db.sqlite3')
+        self.assertEqual(bases['default']['CONN_MAX_AGE'], 60)
+        options = bases['default']['OPTIONS']
+        self.assertIn('PRAGMA journal_mode=WAL', options['init_command'])
+        self.assertEqual(options['transaction_mode'], 'IMMEDIATE')
+
+    def test_postgresql_avec_pool_et_repliques(self):
+        bases = configuration_bases('db.sqlite3', environ={
+            'SIRA_DB_URL': 'postgres://sira:mot%40passe@db:5433/sira?sslmode=require',
+            'SIRA_DB_REPLIQUES': 'postgres://sira@replique:5432/sira, sqlite:///copie.sqlite3',
+            'SIRA_DB_POOL': '2:10',
+        })
+
+        principale = bases['default']
+        self.assertEqual(
+            (principale['ENGINE'], principale['HOST'], principale['PORT'], principale['PASSWORD']),
+            ('django.db.backends.postgresql', 'db', '5433', 'mot@passe')
+        )
+        self.assertEqual(principale['OPTIONS'], {
+            'sslmode': 'require', 'pool': {'min_size': 2, 'max_size': 10}
+        })
+        self.assertEqual(principale['CONN_MAX_AGE'], 0)
+        self.assertEqual(list(bases), ['default', 'replique_1', 'replique_2'])
+        self.assertEqual(bases['replique_2']['NAME'], 'copie.sqlite3')
+        self.assertEqual(bases['replique_1']['TEST'], {'MIRROR': 'default'})
+
+
+class NoteRetenueTests(DonneesAcademiquesMixin, APITestCase):
+
+    def test_meilleure_session_retenue(self):
+        retenus = Resultat.objects.filter(cours_annuel__annee=self.annee).retenus()
+
+        self.assertEqual(retenus.count(), NB_ETUDIANTS * NB_COURS)
+        self.assertEqual(
+            retenus.get(etudiant=self.etudiants[0], cours_annuel=self.cours_annuels[0]).session,
+            'RATTRAPAGE'
+        )
+
+    def test_session_normale_en_cas_d_egalite(self):
+        Resultat.objects.create(
+            etudiant=self.etudiants[1], cours_annuel=self.cours_annuels[0],
+            moyenne=9, session='RATTRAPAGE'
+        )
+        retenu = Resultat.objects.filter(etudiant=self.etudiants[1]).retenus().get(
+            cours_annuel=self.cours_annuels[0]
+        )
+        self.assertEqual(retenu.session, 'NORMALE')
+
+    def test_champ_api_exact_malgre_les_filtres(self):
+        response = self.client.get(
+            f'/gestion/resultats/?etudiant={self.etudiants[0].pk}'
+            f'&cours_annuel={self.cours_annuels[0].pk}&session=NORMALE'
+        )
+        self.assertEqual([r['est_retenu'] for r in response.data['results']], [False])
+
+    def test_statistiques_sur_la_note_retenue(self):
+        cache.clear()
+        response = self.client.get(
+            f'/gestion/cours-annuels/{self.cours_annuels[0].pk}/statistiques/?session=RETENUE'
+        )
+        # Le rattrapage (15) remplace le 8 du premier étudiant
+        self.assertEqual(response.data['effectif'], NB_ETUDIANTS)
+        self.assertEqual(response.data['mediane'], 11.5)
+
+
+class StatistiquesTests(DonneesAcademiquesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def url(self, session='NORMALE'):
+        return f'/gestion/cours-annuels/{self.cours_annuels[0].pk}/statistiques/?session={session}'
+
+    def test_statistiques(self):
+        # Moyennes 8 à 13 pour le premier cours
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url())
+
+        self.assertEqual(response.data['effectif'], NB_ETUDIANTS)
+        self.assertEqual(response.data['moyenne'], 10.5)
+        self.assertEqual(response.data['mediane'], 10.5)
+        self.assertEqual(response.data['ecart_type'], 1.71)
+        self.assertEqual(response.data['taux_reussite'], round(4 / 6, 4))
+        self.assertEqual(
+            [classe['effectif'] for classe in response.data['histogramme']],
+            [0, 0, 0, 0, 2, 2, 2, 0, 0, 0]
+        )
+        self.assertEqual(self.client.get(self.url('RATTRAPAGE')).data['mediane'], 15)
+
+    def test_cache_invalide_par_les_resultats(self):
+        self.client.get(self.url())
+        with self.assertNumQueries(0):
+            self.client.get(self.url())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/gestion/cours-annuels/{self.cours_annuels[0].pk}/resultats/bulk/', {
+                'resultats': [{
+                    'etudiant_id': self.etudiants[0].pk,
+                    'note_tp': 20, 'note_interro': 20, 'note_examen': 20
+                }],
+            }, format='json')
+
+        self.assertEqual(self.client.get(self.url()).data['histogramme'][-1]['effectif'], 1)
+
+    def test_cache_invalide_par_un_resultat_deplace(self):
+        self.assertEqual(self.client.get(self.url()).data['effectif'], NB_ETUDIANTS)
+
+        resultat = Resultat.objects.get(
+            etudiant=self.etudiants[1], cours_annuel=self.cours_annuels[0], session='NORMALE'
+        )
+        resultat.cours_annuel = CoursAnnuel.objects.create(
+            cours=Cours.objects.create(
+                code='INF200', intitule='Autre cours', credits=3, heures_CM=30, heures_TP=15
+            ),
+            annee=self.annee, enseignant=self.enseignants[0], semestre=2
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            resultat.save()
+
+        # L'ancien cours ne compte plus ce résultat
+        self.assertEqual(self.client.get(self.url()).data['effectif'], NB_ETUDIANTS - 1)
+
+    def test_session_invalide(self):
+        self.assertEqual(self.client.get(self.url('AUTRE')).status_code, 400)
+
+
+class ChargesTests(DonneesAcademiquesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # Un deuxième cours au second semestre pour le premier enseignant
+        CoursAnnuel.objects.create(
+            cours=Cours.objects.create(
+                code='INF200', intitule='Cours 200', credits=3, heures_CM=20, heures_TP=10
+            ),
+            annee=self.annee,
+            enseignant=self.enseignants[0],
+            semestre=2
+        )
+
+    def test_totaux_par_enseignant_et_semestre(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/gestion/enseignants/charges/')
+
+        self.assertEqual(response.data['annee'], self.annee.pk)
+        enseignants = {ligne['enseignant']: ligne for ligne in response.data['enseignants']}
+        self.assertEqual(len(enseignants), NB_COURS)
+        premier = enseignants[self.enseignants[0].pk]
+        self.assertEqual(
+            [premier[total] for total in ('nombre_cours', 'heures_CM', 'heures_TP', 'credits')],
+            [2, 50, 25, 7]
+        )
+        self.assertEqual(
+            [(semestre['semestre'], semestre['credits']) for semestre in premier['semestres']],
+            [(1, 4), (2, 3)]
+        )
+        self.assertEqual(enseignants[self.enseignants[2].pk]['credits'], 6)
+
+    def test_cache_invalide_par_les_cours(self):
+        self.client.get('/gestion/enseignants/charges/')
+        with self.assertNumQueries(0):
+            self.client.get('/gestion/enseignants/charges/')
+
+        cours = Cours.objects.get(code='INF100')
+        cours.heures_CM = 45
+        cours.save()
+
+        response = self.client.get('/gestion/enseignants/charges/')
+        premier = next(
+            ligne for ligne in response.data['enseignants']
+            if ligne['enseignant'] == self.enseignants[0].pk
+        )
+        self.assertEqual(premier['heures_CM'], 65)
+
+    def test_export_csv(self):
+        response = self.client.get(f'/gestion/enseignants/charges/export/?annee={self.annee.pk}')
+
+        lignes = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lignes[0].split(';')[0], 'Nom')
+        # Une ligne par enseignant et par semestre enseigné
+        self.assertEqual(len(lignes), 1 + NB_COURS + 1)
+
+    def test_export_xlsx_libelle_a_caracteres_interdits(self):
+        AnneeAcademique.objects.filter(pk=self.annee.pk).update(libelle='2023/2024 [session:principale]')
+
+        response = self.client.get(f'/gestion/enseignants/charges/export/?annee={self.annee.pk}&fichier=xlsx')
+
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="charges_2023-2024 -session-principale-.xlsx"'
+        )
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn(
+            '<sheet name="charges_2023-2024 -session-prin"',
+            archive.read('xl/workbook.xml').decode('utf-8')
+        )
+
+    def test_sans_annee_active(self):
+        AnneeAcademique.objects.update(est_active=False)
+        referentiel.invalider()
+        self.assertEqual(self.client.get('/gestion/enseignants/charges/').status_code, 404)
+
+    def test_annee_invalide(self):
+        self.assertEqual(self.client.get('/gestion/enseignants/charges/?annee=abc').status_code, 400)
+        self.assertEqual(self.client.get('/gestion/enseignants/charges/export/?annee=-1').status_code, 400)
+        self.assertEqual(self.client.get('/gestion/enseignants/charges/?annee=999999').status_code, 404)
+
+
+class ReleveTests(DonneesAcademiquesMixin, APITestCase):
+
+    def reprendre_en_deuxieme_annee(self, moyenne):
+        """Le premier étudiant reprend le deuxième cours l'année suivante"""
+        annee = AnneeAcademique.objects.create(
+            libelle='2024-2025', date_debut=date(2024, 9, 1), date_fin=date(2025, 8, 31)
+        )
+        cours_annuel = CoursAnnuel.objects.create(
+            cours=self.cours_annuels[1].cours, annee=annee,
+            enseignant=self.enseignants[1], semestre=1
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Resultat.objects.create(
+                etudiant=self.etudiants[0], cours_annuel=cours_annuel,
+                moyenne=moyenne, session='NORMALE'
+            )
+
+    def test_cumuls_sur_plusieurs_annees(self):
+        self.reprendre_en_deuxieme_annee(14)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/gestion/resultats/releve/?etudiant={self.etudiants[0].pk}')
+
+        premiere, seconde = response.data['annees']
+        # Rattrapage retenu (15), puis 9 et 10 : seuls 4 + 6 crédits acquis
+        self.assertEqual(
+            (premiere['credits_inscrits'], premiere['credits_obtenus'], premiere['moyenne_ponderee']),
+            (15, 10, '11.00')
+        )
+        self.assertEqual((seconde['credits_inscrits'], seconde['credits_obtenus']), (5, 5))
+        # Le cours repris n'est compté qu'une fois, avec sa meilleure moyenne
+        self.assertEqual(
+            (seconde['credits_inscrits_cumules'], seconde['credits_obtenus_cumules']), (15, 15)
+        )
+        self.assertEqual(response.data['moyenne_cumulee'], '12.67')
+
+    def test_mise_a_jour_incrementale(self):
+        self.reprendre_en_deuxieme_annee(14)
+        resultat = Resultat.objects.get(
+            etudiant=self.etudiants[0], cours_annuel__annee__libelle='2024-2025'
+        )
+        resultat.moyenne = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            resultat.save()
+
+        response = self.client.get(f'/gestion/resultats/releve/?etudiant={self.etudiants[0].pk}')
+        self.assertEqual(response.data['credits_obtenus'], 10)
+        self.assertEqual(response.data['moyenne_cumulee'], '11.00')
+
+    def test_etudiant_invalide(self):
+        self.assertEqual(self.client.get('/gestion/resultats/releve/').status_code, 400)
+        self.assertEqual(self.client.get('/gestion/resultats/releve/?etudiant=abc').status_code, 400)
+        self.assertEqual(self.client.get('/gestion/resultats/releve/?etudiant=0').status_code, 400)
+
+
+class RechercheTests(DonneesAcademiquesMixin, APITestCase):
+
+    def test_prefixe_sans_accents(self):
+        response = self.client.get('/gestion/etudiants/?search=etud tes')
+        self.assertEqual(len(response.data['results']), NB_ETUDIANTS)
+
+        response = self.client.get('/gestion/etudiants/?search=Étudiant3')
+        self.assertEqual([e['matricule'] for e in response.data['results']], ['MAT003'])
+
+        response = self.client.get('/gestion/cours/?search=inf10')
+        self.assertEqual(len(response.data['results']), NB_COURS)
+
+    def test_suggestions(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/gestion/recherche/?q=ense&type=enseignant&limite=2')
+
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual({suggestion['type'] for suggestion in response.data}, {'ENSEIGNANT'})
+        self.assertEqual(
+            self.client.get('/gestion/recherche/?q=inconnu').data, []
+        )
+        self.assertEqual(self.client.get('/gestion/recherche/?q=x&type=salle').status_code, 400)
+
+    def test_suggestions_premieres_par_libelle(self):
+        # Créés dans l'ordre inverse de leur libellé, plus nombreux que la limite
+        intitules = [f'Module {lettre}' for lettre in reversed('ABCDEFGHIJKLMNOP')]
+        for numero, intitule in enumerate(intitules):
+            Cours.objects.create(code=f'MOD{numero:02d}', intitule=intitule, credits=3, heures_CM=20, heures_TP=10)
+
+        response = self.client.get('/gestion/recherche/?q=module&type=cours')
+        self.assertEqual(
+            [suggestion['libelle'] for suggestion in response.data],
+            sorted(intitules)[:LIMITE_SUGGESTIONS]
+        )
+
+    def test_synchronisation_par_les_signaux(self):
+        utilisateur = self.etudiants[2].utilisateur
+        utilisateur.last_name = 'Kabila'
+        utilisateur.save()
+        self.assertEqual(
+            [s['id'] for s in self.client.get('/gestion/recherche/?q=kab').data],
+            [self.etudiants[2].pk]
+        )
+
+        self.etudiants[2].delete()
+        self.assertEqual(self.client.get('/gestion/recherche/?q=kab').data, [])
+
+
+class ImpressionTests(DonneesAcademiquesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+
+    def demander(self, type_document='BULLETIN'):
+        return self.client.post('/gestion/impressions/', {
+            'type_document': type_document,
+            'promotion_annuelle': self.promotion_annuelle.pk,
+        }, format='json')
+
+    def test_demande_non_dupliquee(self):
+        premiere = self.demander()
+        self.assertEqual(premiere.status_code, 201)
+        self.assertEqual(premiere.data['statut'], 'EN_ATTENTE')
+
+        seconde = self.demander()
+        self.assertEqual(seconde.status_code, 200)
+        self.assertEqual(seconde.data['id'], premiere.data['id'])
+
+    def test_une_seule_prise_par_demande(self):
+        impression_id = self.demander().data['id']
+        self.assertEqual(prendre_impression('hote:1'), impression_id)
+        self.assertIsNone(prendre_impression('hote:2'))
+
+    def test_impression_et_telechargements(self):
+        impression_id = self.demander().data['id']
+        self.assertEqual(
+            self.client.get(f'/gestion/impressions/{impression_id}/telecharger/').status_code, 409
+        )
+
+        impression, = traiter_file()
+        self.assertEqual(impression.statut, 'TERMINE', impression.message)
+        self.assertEqual((impression.total, impression.generes), (NB_ETUDIANTS, NB_ETUDIANTS))
+
+        response = self.client.get(f'/gestion/impressions/{impression_id}/telecharger/')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), NB_ETUDIANTS)
+        self.assertTrue(archive.read('MAT000.pdf').startswith(b'%PDF-1.4'))
+
+        response = self.client.get(
+            f'/gestion/impressions/{impression_id}/document/?etudiant={self.etudiants[0].pk}'
+        )
+        self.assertTrue(b''.join(response.streaming_content).endswith(b'%%EOF\n'))
+
+        url = f'/gestion/impressions/{impression_id}/document/'
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(f'{url}?etudiant=abc').status_code, 400)
+        self.assertEqual(self.client.get(f'{url}?etudiant=999999').status_code, 404)
+
+    def test_seuls_les_documents_modifies_sont_regeneres(self):
+        self.demander()
+        traiter_file()
+
+        resultat = Resultat.objects.get(
+            etudiant=self.etudiants[1], cours_annuel=self.cours_annuels[0]
+        )
+        resultat.moyenne = 18
+        resultat.save()
+        self.demander()
+        impression, = traiter_file()
+
+        self.assertEqual((impression.generes, impression.inchanges), (1, NB_ETUDIANTS - 1))
+
+    def test_releves(self):
+        self.demander('RELEVE')
+        impression, = traiter_file()
+        self.assertEqual(impression.statut, 'TERMINE', impression.message)
+        self.assertEqual(impression.generes, NB_ETUDIANTS)
+
+
+class PassageTests(DonneesAcademiquesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cible = AnneeAcademique.objects.create(
+            libelle='2024-2025', date_debut=date(2024, 9, 1), date_fin=date(2025, 8, 31)
+        )
+        self.url = f'/gestion/annees-academiques/{self.annee.pk}/passage/'
+
+    def decisions(self):
+        deliberer(self.promotion_annuelle)
+        return {
+            decision: set(
+                Deliberation.objects.filter(decision=decision).values_list('etudiant_id', flat=True)
+            )
+            for decision in ('ADMIS', 'AJOURNE', 'DEFAILLANT')
+        }
+
+    def inscrits(self, promotion):
+        return set(Inscription.objects.filter(
+            promotion_annuelle__annee=self.cible, promotion_annuelle__promotion=promotion
+        ).values_list('etudiant_id', flat=True))
+
+    def test_simulation_sans_ecriture(self):
+        decisions = self.decisions()
+        response = self.client.get(f'{self.url}?cible={self.cible.pk}')
+
+        self.assertTrue(response.data['simulation'])
+        self.assertEqual(response.data['admis'], len(decisions['ADMIS']))
+        self.assertEqual(
+            response.data['redoublants'], len(decisions['AJOURNE'] | decisions['DEFAILLANT'])
+        )
+        self.assertEqual(response.data['promotions_creees'], 2)
+        self.assertFalse(PromotionAnnuelle.objects.filter(annee=self.cible).exists())
+
+    def test_passage(self):
+        decisions = self.decisions()
+        self.assertTrue(decisions['ADMIS'] and decisions['AJOURNE'])
+        # Nombre de requêtes indépendant du nombre d'étudiants
+        with self.assertNumQueries(14):
+            response = self.client.post(self.url, {'cible': self.cible.pk}, format='json')
+
+        self.assertFalse(response.data['simulation'])
+        self.assertEqual(self.inscrits(self.promotions[1]), decisions['ADMIS'])
+        self.assertEqual(
+            self.inscrits(self.promotions[0]), decisions['AJOURNE'] | decisions['DEFAILLANT']
+        )
+        # Le responsable est reconduit
+        self.assertEqual(
+            PromotionAnnuelle.objects.get(annee=self.cible, promotion=self.promotions[0]).responsable,
+            self.enseignants[0]
+        )
+
+        # Relancer le passage ne crée rien de plus
+        response = self.client.post(self.url, {'cible': self.cible.pk}, format='json')
+        self.assertEqual(response.data['deja_inscrits'], NB_ETUDIANTS)
+        self.assertEqual(
+            Inscription.objects.filter(promotion_annuelle__annee=self.cible).count(), NB_ETUDIANTS
+        )
+
+    def test_diplomes_au_dernier_niveau(self):
+        self.promotion_annuelle.promotion = self.promotions[1]
+        self.promotion_annuelle.save()
+        admis = self.decisions()['ADMIS']
+
+        response = self.client.post(self.url, {'cible': self.cible.pk}, format='json')
+
+        self.assertEqual(response.data['diplomes'], len(admis))
+        self.assertEqual(
+            set(Inscription.objects.filter(statut='DIPLOME').values_list('etudiant_id', flat=True)),
+            admis
+        )
+
+    def test_promotion_non_deliberee(self):
+        response = self.client.get(f'{self.url}?cible={self.cible.pk}')
+        self.assertEqual(response.data['non_delibere'], NB_ETUDIANTS)
+        self.assertEqual(response.data['admis'] + response.data['redoublants'], 0)
+
+    def test_annee_cible_anterieure(self):
+        response = self.client.post(
+            f'/gestion/annees-academiques/{self.cible.pk}/passage/', {'cible': self.annee.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_cible_invalide(self):
+        self.assertEqual(self.client.get(f'{self.url}?cible=abc').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'cible': [1]}, format='json').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}?cible=999999').status_code, 404)
+
+    def test_inscription_concurrente(self):
+        self.decisions()
+        preparer = passages.preparer_passage
+
+        def preparer_puis_inscrire(source, cible):
+            plan = preparer(source, cible)
+            # Un autre écrivain inscrit un étudiant du plan dans l'année cible
+            etudiant_id, promotion_id, _ = plan['affectations'][0]
+            Inscription.objects.create(
+                etudiant_id=etudiant_id,
+                promotion_annuelle=PromotionAnnuelle.objects.create(promotion_id=promotion_id, annee=cible)
+            )
+            return plan
+
+        with mock.patch.object(passages, 'preparer_passage', preparer_puis_inscrire):
+            response = self.client.post(self.url, {'cible': self.cible.pk}, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        # Transaction annulée (l'écriture simulée y compris, faite sur la même connexion)
+        self.assertFalse(Inscription.objects.filter(promotion_annuelle__annee=self.cible).exists())
+
+
+class SaisieEnMasseTests(DonneesAcademiquesMixin, APITestCase):
+
+    def url(self):
+        return f'/gestion/cours-annuels/{self.cours_annuels[0].pk}/resultats/bulk/'
+
+    def test_erreurs_par_ligne(self):
+        response = self.client.post(self.url(), {
+            'resultats': [
+                {'etudiant_id': self.etudiants[1].pk, 'note_tp': 12, 'note_interro': 14, 'note_examen': 15},
+                {'etudiant_id': self.etudiants[2].pk, 'note_tp': 25},
+                {'etudiant_id': 999999, 'note_examen': 10},
+            ]
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['enregistres'], 1)
+        self.assertEqual([erreur['ligne'] for erreur in response.data['erreurs']], [1, 2])
+        resultat = Resultat.objects.get(
+            etudiant=self.etudiants[1], cours_annuel=self.cours_annuels[0], session='NORMALE'
+        )
+        self.assertEqual(str(resultat.moyenne), '13.90')
+        self.assertEqual(resultat.mention, 'Assez bien')
+
+    def test_notes_nulles_comptees(self):
+        response = self.client.post(self.url(), {
+            'resultats': [
+                {'etudiant_id': self.etudiants[1].pk, 'note_tp': 0, 'note_interro': 0, 'note_examen': 0},
+            ]
+        }, format='json')
+
+        self.assertEqual(response.data['enregistres'], 1)
+        resultat = Resultat.objects.get(
+            etudiant=self.etudiants[1], cours_annuel=self.cours_annuels[0], session='NORMALE'
+        )
+        # Des zéros sont des notes, pas des notes absentes
+        self.assertEqual(str(resultat.moyenne), '0.00')
+        self.assertEqual(resultat.mention, 'Ajourné')
+
+    def test_met_a_jour_les_bulletins(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url(), {
+                'session': 'RATTRAPAGE',
+                'resultats': [{'etudiant_id': self.etudiants[3].pk, 'note_examen': 20}],
+            }, format='json')
+
+        response = self.client.get(
+            f'/gestion/resultats/bulletin/?etudiant={self.etudiants[3].pk}&annee={self.annee.pk}'
+        )
+        sessions = [resultat['session'] for resultat in response.data['resultats']]
+        self.assertIn('RATTRAPAGE', sessions)
+
+    def test_bulletin_parametres_invalides(self):
+        url = '/gestion/resultats/bulletin/'
+        self.assertEqual(self.client.get(f'{url}?etudiant={self.etudiants[0].pk}').status_code, 400)
+        self.assertEqual(
+            self.client.get(f'{url}?etudiant={self.etudiants[0].pk}&annee=abc').status_code, 400
+        )
+        self.assertEqual(self.client.get(f'{url}?etudiant=abc&annee={self.annee.pk}').status_code, 400)
+
+    def test_invalidation_des_bulletins_en_une_requete(self):
+        reconstruire_bulletins(self.annee.pk, [etudiant.pk for etudiant in self.etudiants])
+        self.assertEqual(Bulletin.objects.count(), NB_ETUDIANTS)
+
+        enseignant = self.enseignants[0]
+        enseignant.bureau = 'C1'
+        with CaptureQueriesContext(connection) as requetes:
+            enseignant.save()
+
+        suppressions = [
+            requete['sql'] for requete in requetes.captured_queries
+            if requete['sql'].startswith('DELETE') and Bulletin._meta.db_table in requete['sql']
+        ]
+        self.assertEqual(len(suppressions), 1)
+        self.assertFalse(Bulletin.objects.exists())
+
+
+@override_settings(NOTIFICATIONS_EN_ARRIERE_PLAN=False)
+class PublicationTests(DonneesAcademiquesMixin, APITestCase):
+
+    def publier(self, session=None):
+        donnees = {'session': session} if session else {}
+        return self.client.post(f'/gestion/cours-annuels/{self.cours_annuels[0].pk}/publier/', donnees)
+
+    def notifications(self):
+        return Notification.objects.filter(type='NOTE').order_by('utilisateur_id')
+
+    def test_notifie_les_etudiants_notes(self):
+        Inscription.objects.filter(etudiant=self.etudiants[5]).update(statut='DESINSCRIT')
+        response = self.publier()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            list(self.notifications().values_list('utilisateur_id', flat=True)),
+            [etudiant.pk for etudiant in self.etudiants[:5]]
+        )
+        self.assertIn('Cours 0', self.notifications().first().contenu)
+
+    def test_regroupe_les_notifications_en_attente(self):
+        self.publier()
+        # Seul le premier étudiant a une note de rattrapage
+        self.publier('RATTRAPAGE')
+        self.assertEqual(self.notifications().count(), NB_ETUDIANTS)
+        self.assertEqual(self.notifications().get(utilisateur_id=self.etudiants[0].pk).contenu, CONTENU_REGROUPE)
+
+        Notification.objects.filter(utilisateur_id=self.etudiants[0].pk).update(est_lue=True)
+        self.publier('RATTRAPAGE')
+        self.assertEqual(self.notifications().filter(utilisateur_id=self.etudiants[0].pk).count(), 2)
+
+    def test_acces_et_session(self):
+        self.assertEqual(self.publier('ETE').status_code, 400)
+        self.client.force_authenticate(self.etudiants[0].utilisateur)
+        self.assertEqual(self.publier().status_code, 403)
+        self.assertFalse(self.notifications().exists())
+
+
+class DeliberationTests(DonneesAcademiquesMixin, APITestCase):
+
+    def test_rangs_et_decisions(self):
+        response = self.client.post(
+            f'/gestion/promotions-annuelles/{self.promotion_annuelle.pk}/deliberation/'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        rangs = [ligne['rang'] for ligne in response.data]
+        self.assertEqual(rangs, sorted(rangs))
+        moyennes = [float(ligne['moyenne_ponderee']) for ligne in response.data]
+        self.assertEqual(moyennes, sorted(moyennes, reverse=True))
+        for ligne in response.data:
+            attendu = 'ADMIS' if float(ligne['moyenne_ponderee']) >= 10 and \
+                ligne['credits_obtenus'] >= 0.75 * ligne['credits_inscrits'] else 'AJOURNE'
+            self.assertEqual(ligne['decision'], attendu)
+
+
+class PaginationTests(DonneesAcademiquesMixin, APITestCase):
+
+    def test_parcours_complet_sans_doublon(self):
+        vus = []
+        url = '/gestion/resultats/?page_size=4'
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 4)
+            vus += [resultat['id'] for resultat in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(len(vus), Resultat.objects.count())
+        self.assertEqual(len(set(vus)), len(vus))
+
+    def test_page_precedente(self):
+        premiere = self.client.get('/gestion/resultats/?page_size=4').data
+        seconde = self.client.get(premiere['next']).data
+        retour = self.client.get(seconde['previous']).data
+
+        self.assertEqual(
+            [resultat['id'] for resultat in retour['results']],
+            [resultat['id'] for resultat in premiere['results']]
+        )
+
+
+class ExportTests(DonneesAcademiquesMixin, APITestCase):
+
+    def test_fiche_de_cotes_csv(self):
+        response = self.client.get(f'/gestion/cours-annuels/{self.cours_annuels[0].pk}/export/')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lignes = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lignes[0].split(';')[0], 'Matricule')
+        self.assertEqual(lignes[0].split(';')[-1], 'Retenue')
+        # Premier étudiant : la session normale (8) cède la place au rattrapage (15)
+        self.assertEqual(
+            sorted(ligne.split(';')[-1] for ligne in lignes[1:] if 'MAT000' in ligne),
+            ['Non', 'Oui']
+        )
+        # Une ligne par étudiant, plus le rattrapage du premier
+        self.assertEqual(len(lignes), 1 + NB_ETUDIANTS + 1)
+
+    def test_liste_des_inscrits_xlsx(self):
+        response = self.client.get(
+            f'/gestion/promotions-annuelles/{self.promotion_annuelle.pk}/export/?fichier=xlsx'
+        )
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        feuille = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(feuille.count('<row>'), 1 + NB_ETUDIANTS)
+        self.assertIn('MAT000', feuille)
+
+    def test_resultats_annee_invalide(self):
+        self.assertEqual(self.client.get('/gestion/resultats/export/?annee=abc').status_code, 400)
+        response = self.client.get(f'/gestion/resultats/export/?annee={self.annee.pk}')
+        self.assertEqual(response.status_code, 200)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Plans d'exécution propres à SQLite")
+class IndexTests(TestCase):
+    """Les lectures fréquentes utilisent les index composites prévus"""
+
+    def assertIndex(self, queryset, nom):
+        self.assertIn(f'USING INDEX {nom}', queryset.explain())
+
+    def test_resultats(self):
+        self.assertIndex(
+            Resultat.objects.filter(cours_annuel_id=1, session='NORMALE'),
+            'resultat_cours_session_idx'
+        )
+        # Bulletin : résultats d'un étudiant pour une année
+        self.assertIndex(
+            Resultat.objects.filter(etudiant_id=1, cours_annuel__annee_id=1),
+            'gestion_academique_resultat_etudiant_id_cours_annuel_id_session'
+        )
+
+    def test_inscriptions(self):
+        self.assertIndex(
+            Inscription.objects.filter(promotion_annuelle_id=1, statut='ACTIF'),
+            'inscription_promo_statut_idx'
+        )
+
+    def test_cours_annuels(self):
+        self.assertIndex(CoursAnnuel.objects.filter(annee_id=1), 'coursannuel_annee_sem_idx')
@@ -14,6 +14,8 @@ router.register(r'inscriptions', views.InscriptionViewSet)
 router.register(r'resultats', views.ResultatViewSet)
 router.register(r'enseignants', views.EnseignantViewSet)
 router.register(r'etudiants', views.EtudiantViewSet)
+router.register(r'impressions', views.ImpressionViewSet)
+router.register(r'recherche', views.RechercheViewSet, basename='recherche')
 
 urlpatterns = [
     path('', include(router.urls)),
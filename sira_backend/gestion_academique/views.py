@@ -1,37 +1,179 @@
-from rest_framework import viewsets, permissions, filters
+from rest_framework import mixins, viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db import IntegrityError
+from django.db.models import F, Q
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
 
+from sira_backend.conditionnel import ReponseConditionnelleMixin
 from .models import (
     Faculte, Departement, AnneeAcademique, Promotion,
     PromotionAnnuelle, Cours, CoursAnnuel, Inscription, 
-    Resultat, Etudiant, Enseignant
+    Resultat, Etudiant, Enseignant, EntreeRecherche, ImpressionDocuments,
+    DocumentImprime
 )
 from .serializers import (
     FaculteSerializer, DepartementSerializer, AnneeAcademiqueSerializer,
     PromotionSerializer, PromotionAnnuelleSerializer, CoursSerializer,
     CoursAnnuelSerializer, InscriptionSerializer, ResultatSerializer,
-    EnseignantSerializer, EtudiantSerializer
+    EnseignantSerializer, EtudiantSerializer, ResultatBulkSerializer,
+    ResultatLigneSerializer, BulletinSerializer, DeliberationSerializer,
+    CumulAnnuelSerializer, ImpressionDocumentsSerializer, options_champs
 )
+from . import referentiel
+from .bulletins import obtenir_bulletin
+from .charges import ENTETE_EXPORT as ENTETE_CHARGES, lignes_export, obtenir_charges
+from .deliberations import deliberer
+from .impressions import creer_impression
+from .passages import passer
+from .publications import lancer_publication
+from .recherche import LIMITE_SUGGESTIONS, ids_correspondants, suggestions
+from .releves import obtenir_releve
+from .exports import TAILLE_LOT, reponse_export
+from .services import enregistrer_resultats_en_masse, etudiants_existants
+from .statistiques import SESSIONS, obtenir_statistiques, statistiques_en_cache
 
-class FaculteViewSet(viewsets.ModelViewSet):
+# Relations chargées par expansion pour chaque serializer imbriquant d'autres objets
+RELATIONS_DEPARTEMENT = {
+    'faculte': ['faculte'],
+}
+RELATIONS_PROMOTION = {
+    'departement': ['departement'],
+    'departement.faculte': ['departement__faculte'],
+}
+RELATIONS_PROMOTION_ANNUELLE = {
+    'promotion': ['promotion'],
+    'promotion.departement': ['promotion__departement'],
+    'promotion.departement.faculte': ['promotion__departement__faculte'],
+    'annee': ['annee'],
+    'responsable': ['responsable__utilisateur'],
+}
+RELATIONS_COURS_ANNUEL = {
+    'cours': ['cours'],
+    'annee': ['annee'],
+    'enseignant': ['enseignant__utilisateur'],
+}
+RELATIONS_INSCRIPTION = {
+    'etudiant': ['etudiant__utilisateur'],
+    'promotion_annuelle': ['promotion_annuelle'],
+    **{
+        f'promotion_annuelle.{chemin}': [f'promotion_annuelle__{relation}' for relation in relations]
+        for chemin, relations in RELATIONS_PROMOTION_ANNUELLE.items()
+    },
+}
+RELATIONS_RESULTAT = {
+    'etudiant': ['etudiant__utilisateur'],
+    'cours_annuel': ['cours_annuel'],
+    **{
+        f'cours_annuel.{chemin}': [f'cours_annuel__{relation}' for relation in relations]
+        for chemin, relations in RELATIONS_COURS_ANNUEL.items()
+    },
+}
+
+ENTETE_RESULTATS = [
+    'Matricule', 'Nom', 'Prénom', 'Session', 'Note TP',
+    'Note interrogation', 'Note examen', 'Moyenne', 'Mention', 'Retenue'
+]
+CHAMPS_RESULTATS = [
+    'etudiant__matricule', 'etudiant__utilisateur__last_name',
+    'etudiant__utilisateur__first_name', 'session', 'note_tp',
+    'note_interro', 'note_examen', 'moyenne', 'mention', 'est_retenu'
+]
+TRI_ETUDIANTS = ['etudiant__utilisateur__last_name', 'etudiant__utilisateur__first_name']
+
+def identifiant(valeur, nom):
+    """Paramètre `nom` converti en identifiant ; ValidationError (400) s'il n'en est pas un"""
+    try:
+        resultat = int(valeur)
+    except (TypeError, ValueError):
+        resultat = 0
+    if resultat < 1:
+        raise ValidationError({nom: ["Identifiant entier attendu"]})
+    return resultat
+
+class RechercheIndexeeFilter(filters.SearchFilter):
+    """
+    Même paramètre `?search=` que `SearchFilter`, servi par l'index de
+    recherche (préfixes de mots, sans accents) selon `type_recherche` de la vue
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        texte = request.query_params.get(self.search_param, '')
+        if not texte.strip():
+            return queryset
+        return queryset.filter(pk__in=ids_correspondants(view.type_recherche, texte))
+
+class ExpansionQuerysetMixin:
+    """
+    Adapte les jointures du queryset aux paramètres `?fields=` / `?expand=`.
+
+    `relations_par_expansion` associe chaque expansion (chemin pointé du
+    serializer) aux relations à charger avec `select_related`. Sans
+    paramètre, toutes les relations de la représentation complète sont
+    chargées.
+    """
+    relations_par_expansion = {}
+
+    def get_queryset(self):
+        return self.charger_relations(super().get_queryset(), self.relations_par_expansion)
+
+    def charger_relations(self, queryset, relations_par_expansion):
+        """Applique à `queryset` les jointures nécessaires à la réponse demandée"""
+        options = options_champs(self.request)
+        if options is None:
+            relations = [
+                relation
+                for relations in relations_par_expansion.values()
+                for relation in relations
+            ]
+        else:
+            champs, expansions = options
+            relations = [
+                relation
+                for chemin, relations in relations_par_expansion.items()
+                if chemin in expansions
+                and (champs is None or chemin.split('.')[0] in champs)
+                for relation in relations
+            ]
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset
+
+class FaculteViewSet(ReponseConditionnelleMixin, viewsets.ModelViewSet):
     queryset = Faculte.objects.all().order_by('nom')
     serializer_class = FaculteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    tampons_par_action = {
+        'list': [Faculte],
+        'retrieve': [Faculte],
+        'departements': [Faculte, Departement],
+        'arbre': [Faculte, Departement, Promotion],
+    }
+    cache_control = {'private': True, 'max_age': 60}
     filter_backends = [filters.SearchFilter]
     search_fields = ['nom', 'sigle']
 
+    @action(detail=False, methods=['get'])
+    def arbre(self, request):
+        """Facultés, départements et promotions, servis depuis le cache du processus"""
+        return Response(referentiel.arbre())
+
     @action(detail=True, methods=['get'])
     def departements(self, request, pk=None):
-        departements = self.get_object().departement_set.all()
-        serializer = DepartementSerializer(departements, many=True)
+        departements = self.get_object().departement_set.select_related('faculte')
+        serializer = DepartementSerializer(
+            departements, many=True, context=self.get_serializer_context()
+        )
         return Response(serializer.data)
 
-class DepartementViewSet(viewsets.ModelViewSet):
+class DepartementViewSet(ExpansionQuerysetMixin, viewsets.ModelViewSet):
     queryset = Departement.objects.all().order_by('nom')
     serializer_class = DepartementSerializer
+    relations_par_expansion = RELATIONS_DEPARTEMENT
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['faculte']
@@ -39,75 +181,279 @@ class DepartementViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def promotions(self, request, pk=None):
-        promotions = self.get_object().promotion_set.all()
-        serializer = PromotionSerializer(promotions, many=True)
+        promotions = self.charger_relations(
+            self.get_object().promotion_set.all(), RELATIONS_PROMOTION
+        )
+        serializer = PromotionSerializer(
+            promotions, many=True, context=self.get_serializer_context()
+        )
         return Response(serializer.data)
 
-class AnneeAcademiqueViewSet(viewsets.ModelViewSet):
+class AnneeAcademiqueViewSet(ReponseConditionnelleMixin, viewsets.ModelViewSet):
     queryset = AnneeAcademique.objects.all().order_by('-date_debut')
     serializer_class = AnneeAcademiqueSerializer
     permission_classes = [permissions.IsAuthenticated]
+    tampons_par_action = {
+        'list': [AnneeAcademique],
+        'retrieve': [AnneeAcademique],
+        'active': [AnneeAcademique],
+    }
+    cache_control = {'private': True, 'max_age': 60}
     filter_backends = [filters.SearchFilter]
     search_fields = ['libelle']
 
     @action(detail=False, methods=['get'])
     def active(self, request):
-        annee = self.queryset.filter(est_active=True).first()
+        annee = referentiel.annee_active()
         if not annee:
             return Response({'detail': 'Aucune année active'}, status=404)
         serializer = self.get_serializer(annee)
         return Response(serializer.data)
 
-class PromotionViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get', 'post'],
+            permission_classes=[permissions.IsAdminUser])
+    def passage(self, request, pk=None):
+        """
+        Passage des étudiants de cette année vers l'année `cible`, d'après
+        les délibérations. GET (?cible=) : simulation, rien n'est écrit.
+        POST ({"cible": id}) : crée les promotions annuelles et les
+        inscriptions. Les deux retournent le même bilan.
+        """
+        source = self.get_object()
+        donnees = request.query_params if request.method == 'GET' else request.data
+        if not donnees.get('cible'):
+            return Response({'error': 'Paramètre cible requis'}, status=400)
+        cible = get_object_or_404(AnneeAcademique, pk=identifiant(donnees['cible'], 'cible'))
+        try:
+            return Response(passer(source, cible, simulation=request.method == 'GET'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+        except IntegrityError:
+            # Inscription ajoutée à l'année cible par ailleurs pendant le passage
+            return Response(
+                {'error': "Inscriptions modifiées pendant le passage, le relancer"},
+                status=status.HTTP_409_CONFLICT
+            )
+
+class PromotionViewSet(ExpansionQuerysetMixin, viewsets.ModelViewSet):
     queryset = Promotion.objects.all().order_by('niveau', 'nom')
     serializer_class = PromotionSerializer
+    relations_par_expansion = RELATIONS_PROMOTION
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['departement', 'niveau']
     search_fields = ['nom']
 
-class PromotionAnnuelleViewSet(viewsets.ModelViewSet):
+class PromotionAnnuelleViewSet(ExpansionQuerysetMixin, viewsets.ModelViewSet):
     queryset = PromotionAnnuelle.objects.select_related(
         'promotion', 'annee', 'responsable'
     ).order_by('-annee__date_debut', 'promotion__niveau')
     serializer_class = PromotionAnnuelleSerializer
+    relations_par_expansion = RELATIONS_PROMOTION_ANNUELLE
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['promotion', 'annee', 'responsable']
 
     @action(detail=True, methods=['get'])
     def inscriptions(self, request, pk=None):
-        inscriptions = self.get_object().inscription_set.filter(statut='ACTIF')
-        serializer = InscriptionSerializer(inscriptions, many=True)
+        inscriptions = self.charger_relations(
+            self.get_object().inscription_set.filter(statut='ACTIF'),
+            RELATIONS_INSCRIPTION
+        ).order_by('-date_inscription')
+        page = self.paginate_queryset(inscriptions)
+        serializer = InscriptionSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Liste des inscrits en flux CSV (par défaut) ou XLSX (?fichier=xlsx)
+        """
+        promotion_annuelle = self.get_object()
+        lignes = Inscription.objects.filter(
+            promotion_annuelle=promotion_annuelle
+        ).order_by(*TRI_ETUDIANTS).values_list(
+            'etudiant__matricule', 'etudiant__utilisateur__last_name',
+            'etudiant__utilisateur__first_name', 'etudiant__utilisateur__email',
+            'etudiant__genre', 'etudiant__date_naissance', 'statut',
+            'date_inscription'
+        ).iterator(chunk_size=TAILLE_LOT)
+        return reponse_export(
+            f'inscrits_{promotion_annuelle.pk}',
+            [
+                'Matricule', 'Nom', 'Prénom', 'Email', 'Genre',
+                'Date de naissance', 'Statut', "Date d'inscription"
+            ],
+            lignes,
+            request.query_params.get('fichier')
+        )
+
+    @action(detail=True, methods=['get', 'post'],
+            permission_classes=[permissions.IsAdminUser])
+    def deliberation(self, request, pk=None):
+        """
+        GET : dernière délibération enregistrée de la promotion
+        POST : délibère la promotion (moyennes, crédits, rangs, décisions)
+        """
+        promotion_annuelle = self.get_object()
+        if request.method == 'POST':
+            deliberer(promotion_annuelle)
+        deliberations = promotion_annuelle.deliberations.select_related(
+            'etudiant__utilisateur'
+        ).order_by(F('rang').asc(nulls_last=True), 'etudiant__utilisateur__last_name')
+        serializer = DeliberationSerializer(deliberations, many=True)
         return Response(serializer.data)
 
-class CoursViewSet(viewsets.ModelViewSet):
+class CoursViewSet(ReponseConditionnelleMixin, viewsets.ModelViewSet):
     queryset = Cours.objects.all().order_by('code')
     serializer_class = CoursSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['code', 'intitule']
+    tampons_par_action = {
+        'list': [Cours],
+        'retrieve': [Cours],
+    }
+    # Catalogue modifié en cours d'année : toujours revalider
+    cache_control = {'private': True, 'no_cache': True}
+    filter_backends = [RechercheIndexeeFilter]
+    type_recherche = 'COURS'
 
-class CoursAnnuelViewSet(viewsets.ModelViewSet):
+class CoursAnnuelViewSet(ExpansionQuerysetMixin, viewsets.ModelViewSet):
     queryset = CoursAnnuel.objects.select_related(
         'cours', 'annee', 'enseignant'
     ).order_by('-annee__date_debut', 'semestre', 'cours__code')
     serializer_class = CoursAnnuelSerializer
+    relations_par_expansion = RELATIONS_COURS_ANNUEL
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['cours', 'annee', 'enseignant', 'semestre']
 
     @action(detail=True, methods=['get'])
     def resultats(self, request, pk=None):
-        resultats = self.get_object().resultat_set.all()
-        serializer = ResultatSerializer(resultats, many=True)
-        return Response(serializer.data)
+        resultats = self.charger_relations(
+            self.get_object().resultat_set.avec_retenue_par_ligne(), RELATIONS_RESULTAT
+        ).order_by('etudiant__utilisateur__last_name')
+        page = self.paginate_queryset(resultats)
+        serializer = ResultatSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Fiche de cotes du cours en flux CSV (par défaut) ou XLSX (?fichier=xlsx)
+        """
+        cours_annuel = self.get_object()
+        lignes = Resultat.objects.filter(
+            cours_annuel=cours_annuel
+        ).avec_retenue().order_by(*TRI_ETUDIANTS, 'session').values_list(
+            *CHAMPS_RESULTATS
+        ).iterator(chunk_size=TAILLE_LOT)
+        return reponse_export(
+            f'resultats_{cours_annuel.cours.code}_S{cours_annuel.semestre}',
+            ENTETE_RESULTATS,
+            lignes,
+            request.query_params.get('fichier')
+        )
+
+    @action(detail=True, methods=['get'])
+    def statistiques(self, request, pk=None):
+        """
+        Moyenne, médiane, écart-type, taux de réussite et histogramme des
+        moyennes du cours pour une session (?session=NORMALE par défaut)
+        """
+        session = request.query_params.get('session', 'NORMALE')
+        if session not in SESSIONS:
+            return Response(
+                {'session': [f"Session invalide, valeurs possibles : {', '.join(SESSIONS)}"]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        donnees = statistiques_en_cache(pk, session)
+        if donnees is None:
+            donnees = obtenir_statistiques(self.get_object().pk, session)
+        return Response(donnees)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def publier(self, request, pk=None):
+        """
+        Publie les résultats d'une session (`session`, NORMALE par défaut) :
+        les étudiants notés sont notifiés en arrière-plan, la réponse n'attend pas
+        """
+        session = request.data.get('session', 'NORMALE')
+        if session not in SESSIONS:
+            return Response(
+                {'session': [f"Session invalide, valeurs possibles : {', '.join(SESSIONS)}"]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cours_annuel = self.get_object()
+        lancer_publication(cours_annuel, session)
+        return Response(
+            {'status': 'publication en cours', 'cours_annuel': cours_annuel.pk, 'session': session},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=True, methods=['post'], url_path='resultats/bulk')
+    def resultats_bulk(self, request, pk=None):
+        """
+        Saisie en masse des notes d'un cours annuel.
+        Les lignes valides sont enregistrées en une seule requête,
+        les lignes invalides sont renvoyées avec leurs erreurs.
+        """
+        cours_annuel = self.get_object()
+        lot = ResultatBulkSerializer(data=request.data)
+        lot.is_valid(raise_exception=True)
+        session_defaut = lot.validated_data['session']
+
+        lignes_valides = []
+        erreurs = []
+        for index, donnees in enumerate(lot.validated_data['resultats']):
+            ligne = ResultatLigneSerializer(data=donnees)
+            if not ligne.is_valid():
+                erreurs.append({'ligne': index, 'erreurs': ligne.errors})
+                continue
+            valeurs = dict(ligne.validated_data)
+            valeurs.setdefault('session', session_defaut)
+            lignes_valides.append((index, valeurs))
+
+        existants = etudiants_existants(
+            [valeurs['etudiant_id'] for _, valeurs in lignes_valides]
+        )
+        lignes = []
+        vues = set()
+        for index, valeurs in lignes_valides:
+            cle = (valeurs['etudiant_id'], valeurs['session'])
+            if valeurs['etudiant_id'] not in existants:
+                erreurs.append({
+                    'ligne': index,
+                    'erreurs': {'etudiant_id': ["Étudiant introuvable"]}
+                })
+            elif cle in vues:
+                erreurs.append({
+                    'ligne': index,
+                    'erreurs': {'etudiant_id': ["Doublon dans le lot pour cette session"]}
+                })
+            else:
+                vues.add(cle)
+                lignes.append(valeurs)
 
-class InscriptionViewSet(viewsets.ModelViewSet):
+        resultats = enregistrer_resultats_en_masse(cours_annuel, lignes)
+        erreurs.sort(key=lambda erreur: erreur['ligne'])
+        return Response(
+            {
+                'enregistres': len(resultats),
+                'erreurs': erreurs,
+            },
+            status=status.HTTP_200_OK
+        )
+
+class InscriptionViewSet(ExpansionQuerysetMixin, viewsets.ModelViewSet):
     queryset = Inscription.objects.select_related(
         'etudiant', 'promotion_annuelle'
     ).order_by('-date_inscription')
     serializer_class = InscriptionSerializer
+    relations_par_expansion = RELATIONS_INSCRIPTION
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['etudiant', 'promotion_annuelle', 'statut']
@@ -119,17 +465,45 @@ class InscriptionViewSet(viewsets.ModelViewSet):
         inscription.save()
         return Response({'status': 'Désinscription effectuée'})
 
-class ResultatViewSet(viewsets.ModelViewSet):
-    queryset = Resultat.objects.select_related(
+class ResultatViewSet(ExpansionQuerysetMixin, viewsets.ModelViewSet):
+    queryset = Resultat.objects.avec_retenue_par_ligne().select_related(
         'etudiant', 'cours_annuel'
     ).order_by('-cours_annuel__annee__date_debut', 'etudiant__utilisateur__last_name')
     serializer_class = ResultatSerializer
+    relations_par_expansion = RELATIONS_RESULTAT
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['etudiant', 'cours_annuel', 'session']
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Export en flux des résultats filtrés (etudiant, cours_annuel,
+        session, annee), en CSV par défaut ou XLSX (?fichier=xlsx)
+        """
+        resultats = self.filter_queryset(Resultat.objects.all())
+        annee_id = request.query_params.get('annee')
+        if annee_id:
+            resultats = resultats.filter(cours_annuel__annee_id=identifiant(annee_id, 'annee'))
+        lignes = resultats.avec_retenue_par_ligne().order_by(
+            '-cours_annuel__annee__date_debut', 'cours_annuel__cours__code', *TRI_ETUDIANTS, 'session'
+        ).values_list(
+            'cours_annuel__annee__libelle', 'cours_annuel__cours__code',
+            'cours_annuel__semestre', *CHAMPS_RESULTATS
+        ).iterator(chunk_size=TAILLE_LOT)
+        return reponse_export(
+            'resultats',
+            ['Année', 'Cours', 'Semestre'] + ENTETE_RESULTATS,
+            lignes,
+            request.query_params.get('fichier')
+        )
+
     @action(detail=False, methods=['get'])
     def bulletin(self, request):
+        """
+        Bulletin d'un étudiant pour une année.
+        Lu depuis le bulletin précalculé, construit au premier accès.
+        """
         etudiant_id = request.query_params.get('etudiant')
         annee_id = request.query_params.get('annee')
         
@@ -138,40 +512,192 @@ class ResultatViewSet(viewsets.ModelViewSet):
                 {'error': 'Paramètres etudiant et annee requis'},
                 status=400
             )
-            
-        resultats = self.queryset.filter(
-            etudiant_id=etudiant_id,
-            cours_annuel__annee_id=annee_id
-        )
-        serializer = self.get_serializer(resultats, many=True)
-        return Response(serializer.data)
+        etudiant_id = identifiant(etudiant_id, 'etudiant')
+        annee_id = identifiant(annee_id, 'annee')
+
+        bulletin = obtenir_bulletin(etudiant_id, annee_id)
+        if bulletin is None:
+            return Response({
+                'etudiant': etudiant_id,
+                'annee': annee_id,
+                'resultats': [],
+                'credits_inscrits': 0,
+                'credits_obtenus': 0,
+                'moyenne_ponderee': None,
+            })
+        return Response(BulletinSerializer(bulletin).data)
+
+    @action(detail=False, methods=['get'])
+    def releve(self, request):
+        """
+        Relevé de notes d'un étudiant sur toutes ses années, avec les
+        crédits et la moyenne cumulés année après année
+        """
+        etudiant_id = request.query_params.get('etudiant')
+        if not etudiant_id:
+            return Response({'error': 'Paramètre etudiant requis'}, status=400)
+        etudiant_id = identifiant(etudiant_id, 'etudiant')
+
+        annees = CumulAnnuelSerializer(obtenir_releve(etudiant_id), many=True).data
+        derniere = annees[-1] if annees else {}
+        return Response({
+            'etudiant': etudiant_id,
+            'annees': annees,
+            'credits_inscrits': derniere.get('credits_inscrits_cumules', 0),
+            'credits_obtenus': derniere.get('credits_obtenus_cumules', 0),
+            'moyenne_cumulee': derniere.get('moyenne_cumulee'),
+        })
 
 class EnseignantViewSet(viewsets.ModelViewSet):
     queryset = Enseignant.objects.select_related('utilisateur').order_by('utilisateur__last_name')
     serializer_class = EnseignantSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = [
-        'utilisateur__first_name', 
-        'utilisateur__last_name', 
-        'specialite'
-    ]
+    filter_backends = [RechercheIndexeeFilter, DjangoFilterBackend]
+    type_recherche = 'ENSEIGNANT'
     filterset_fields = ['est_responsable']
 
+    def annee_du_rapport(self, request):
+        """Année demandée (?annee=) ou, à défaut, l'année active"""
+        annee_id = request.query_params.get('annee')
+        if annee_id:
+            return get_object_or_404(AnneeAcademique, pk=identifiant(annee_id, 'annee'))
+        annee = referentiel.annee_active()
+        if annee is None:
+            raise NotFound('Aucune année active')
+        return annee
+
+    @action(detail=False, methods=['get'])
+    def charges(self, request):
+        """
+        Charge horaire de tous les enseignants pour une année (?annee=,
+        l'année active par défaut) : heures CM/TP, crédits et nombre de
+        cours, au total et par semestre
+        """
+        return Response(obtenir_charges(self.annee_du_rapport(request).pk))
+
+    @action(detail=False, methods=['get'], url_path='charges/export')
+    def charges_export(self, request):
+        """Charge horaire par semestre en flux CSV (par défaut) ou XLSX (?fichier=xlsx)"""
+        annee = self.annee_du_rapport(request)
+        return reponse_export(
+            f'charges_{annee.libelle}',
+            ENTETE_CHARGES,
+            lignes_export(annee.pk),
+            request.query_params.get('fichier')
+        )
+
     @action(detail=True, methods=['get'])
     def cours(self, request, pk=None):
-        cours = self.get_object().cours_enseignes.all()
-        serializer = CoursAnnuelSerializer(cours, many=True)
+        cours = self.get_object().cours_enseignes.select_related(
+            *[relation for relations in RELATIONS_COURS_ANNUEL.values() for relation in relations]
+        ).order_by('-annee__date_debut', 'semestre', 'cours__code')
+        serializer = CoursAnnuelSerializer(
+            cours, many=True, context=self.get_serializer_context()
+        )
         return Response(serializer.data)
 
 class EtudiantViewSet(viewsets.ModelViewSet):
     queryset = Etudiant.objects.select_related('utilisateur').order_by('utilisateur__last_name')
     serializer_class = EtudiantSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = [
-        'matricule',
-        'utilisateur__first_name',
-        'utilisateur__last_name'
-    ]
-    filterset_fields = ['genre']
\ No newline at end of file
+    filter_backends = [RechercheIndexeeFilter, DjangoFilterBackend]
+    type_recherche = 'ETUDIANT'
+    filterset_fields = ['genre']
+
+class ImpressionViewSet(mixins.CreateModelMixin,
+                        mixins.ListModelMixin,
+                        mixins.RetrieveModelMixin,
+                        viewsets.GenericViewSet):
+    """
+    Impression en PDF des bulletins ou relevés d'une promotion annuelle.
+
+    POST met la demande en file (une demande identique non terminée est
+    renvoyée telle quelle) ; elle est traitée hors requête par
+    `manage.py traiter_impressions`. Le suivi se fait sur le détail, le
+    téléchargement par `telecharger/` (archive ZIP) ou
+    `document/?etudiant=` (PDF d'un étudiant).
+    """
+    queryset = ImpressionDocuments.objects.order_by('-date_creation')
+    serializer_class = ImpressionDocumentsSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['promotion_annuelle', 'type_document', 'statut']
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        impression, creee = creer_impression(
+            serializer.validated_data['type_document'],
+            serializer.validated_data['promotion_annuelle'],
+            request.user
+        )
+        return Response(
+            self.get_serializer(impression).data,
+            status=status.HTTP_201_CREATED if creee else status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['get'])
+    def telecharger(self, request, pk=None):
+        impression = self.get_object()
+        if impression.statut != 'TERMINE' or not impression.archive:
+            return Response(
+                {'detail': "L'impression n'est pas terminée"},
+                status=status.HTTP_409_CONFLICT
+            )
+        return FileResponse(
+            impression.archive.open('rb'),
+            as_attachment=True,
+            filename=f'{impression.type_document.lower()}s_{impression.promotion_annuelle_id}.zip'
+        )
+
+    @action(detail=True, methods=['get'])
+    def document(self, request, pk=None):
+        """PDF de l'étudiant `?etudiant=` (obligatoire) issu de cette impression"""
+        impression = self.get_object()
+        document = DocumentImprime.objects.filter(
+            type_document=impression.type_document,
+            annee_id=impression.promotion_annuelle.annee_id,
+            etudiant_id=identifiant(request.query_params.get('etudiant'), 'etudiant'),
+            etudiant__inscription__promotion_annuelle_id=impression.promotion_annuelle_id
+        ).select_related('etudiant').first()
+        if document is None:
+            return Response({'detail': 'Document introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            document.fichier.open('rb'),
+            as_attachment=True,
+            filename=f'{document.etudiant.matricule}.pdf'
+        )
+
+class RechercheViewSet(viewsets.ViewSet):
+    """
+    Suggestions de saisie sur les étudiants, enseignants et cours.
+    ?q=texte, ?type=etudiant,enseignant,cours (tous par défaut), ?limite=10
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    types = [type_entree for type_entree, _ in EntreeRecherche.TYPE_CHOICES]
+
+    def list(self, request):
+        types = [
+            type_entree.strip().upper()
+            for type_entree in request.query_params.get('type', '').split(',')
+            if type_entree.strip()
+        ]
+        inconnus = set(types) - set(self.types)
+        if inconnus:
+            return Response(
+                {'type': [f"Type inconnu : {', '.join(sorted(inconnus))}"]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limite = min(int(request.query_params.get('limite', LIMITE_SUGGESTIONS)), 50)
+        except ValueError:
+            limite = LIMITE_SUGGESTIONS
+        return Response([
+            {
+                'type': entree['type'],
+                'id': entree['objet_id'],
+                'libelle': entree['libelle'],
+                'detail': entree['detail'],
+            }
+            for entree in suggestions(request.query_params.get('q', ''), types, max(limite, 1))
+        ])
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Le flux temps réel /communication/flux/ (Server-Sent Events, voir
+communication/temps_reel.py) est une vue asynchrone : il nécessite ce
+point d'entrée (uvicorn, daphne...) plutôt que WSGI.
 """
 
 import os
@@ -0,0 +1,139 @@
+"""
+Requêtes GET conditionnelles (ETag / Last-Modified) pilotées par des
+tampons de version.
+
+Chaque modèle suivi possède un tampon (l'horodatage de sa dernière
+modification) conservé dans le backend de cache et mis à jour par les
+signaux `post_save` / `post_delete`. Une vue calcule son ETag à partir des
+tampons dont sa réponse dépend, de l'URL complète et du format négocié :
+si le client possède déjà cette version, elle répond `304 Not Modified`
+sans interroger la base ni sérialiser quoi que ce soit.
+
+Les mises à jour en masse (`queryset.update()`) ne déclenchent pas de
+signal : appeler `toucher()` après coup.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+PREFIXE = 'versions:'
+
+
+def nom_tampon(modele, pk=None):
+    """Nom du tampon d'un modèle, ou d'un seul objet si `pk` est fourni"""
+    nom = modele._meta.label_lower
+    return nom if pk is None else f'{nom}:{pk}'
+
+
+def toucher(nom):
+    """Marque le tampon `nom` comme modifié maintenant"""
+    precedent = cache.get(PREFIXE + nom) or 0
+    # Strictement croissant, même si l'horloge n'a pas avancé
+    cache.set(PREFIXE + nom, max(time.time(), precedent + 1e-6), timeout=None)
+
+
+def tampons(noms):
+    """Valeurs des tampons ; un tampon absent du cache est créé à l'instant présent"""
+    cles = [PREFIXE + nom for nom in noms]
+    valeurs = cache.get_many(cles)
+    for cle in cles:
+        if cle not in valeurs:
+            cache.add(cle, time.time(), timeout=None)
+            valeurs[cle] = cache.get(cle)
+    return [valeurs[cle] for cle in cles]
+
+
+def suivre(modele, tampon=None, objet=None):
+    """
+    Tient à jour un tampon à chaque modification de `modele`.
+
+    Par défaut il s'agit du tampon du modèle lui-même. `tampon` (un autre
+    modèle) et `objet` (fonction instance -> pk) permettent de répercuter
+    la modification sur le tampon d'un objet lié, par exemple celui de
+    l'utilisateur pour ses rôles.
+    """
+    tampon = tampon or modele
+
+    def modifie(sender, instance, **kwargs):
+        nom = nom_tampon(tampon, objet(instance) if objet else None)
+        toucher(nom)
+        # Encore après le commit : une lecture concurrente a pu remettre en
+        # cache l'ancienne version sous le nouvel ETag
+        transaction.on_commit(lambda: toucher(nom))
+
+    uid = f'conditionnel:{modele._meta.label_lower}:{nom_tampon(tampon)}'
+    post_save.connect(modifie, sender=modele, weak=False, dispatch_uid=uid)
+    post_delete.connect(modifie, sender=modele, weak=False, dispatch_uid=uid)
+
+
+class NonModifie(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ReponseConditionnelleMixin:
+    """
+    Ajoute ETag, Last-Modified et Cache-Control aux lectures d'une vue.
+
+    `tampons_par_action` associe à chaque action (`list`, `retrieve`, ou une
+    action personnalisée) les modèles dont sa réponse dépend ; les autres
+    actions ne sont pas conditionnelles. `cache_control` est passé tel quel
+    à `patch_cache_control` sur les réponses de ces actions.
+    """
+    tampons_par_action = {}
+    cache_control = {'private': True, 'no_cache': True}
+
+    def get_tampons(self):
+        modeles = self.tampons_par_action.get(getattr(self, 'action', None))
+        if modeles is None:
+            return None
+        return [nom_tampon(modele) for modele in modeles]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validateurs = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        noms = self.get_tampons()
+        if not noms:
+            return
+
+        valeurs = tampons(noms)
+        empreinte = hashlib.sha1(repr((
+            request.get_full_path(), request.accepted_media_type, noms, valeurs
+        )).encode()).hexdigest()
+        self.validateurs = (quote_etag(empreinte), int(max(valeurs)))
+
+        etag, derniere_modification = self.validateurs
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # Comparaison faible (RFC 9110) ; prioritaire sur If-Modified-Since
+            attendus = {valeur.removeprefix('W/') for valeur in parse_etags(if_none_match)}
+            if etag in attendus or '*' in attendus:
+                raise NonModifie()
+            return
+        depuis = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if depuis is not None and derniere_modification <= depuis:
+            raise NonModifie()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NonModifie):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validateurs = getattr(self, 'validateurs', None)
+        if validateurs and response.status_code in (200, 304):
+            response['ETag'] = validateurs[0]
+            response['Last-Modified'] = http_date(validateurs[1])
+            patch_cache_control(response, **self.cache_control)
+            patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
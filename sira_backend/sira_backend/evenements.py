@@ -0,0 +1,156 @@
+"""
+Diffusion d'événements en temps réel aux utilisateurs connectés.
+
+Le code synchrone (signaux, services) appelle `publier` ; l'événement part
+à la validation de la transaction. Chaque connexion en flux (voir
+`communication.views.flux`) s'abonne aux événements de son utilisateur
+et les attend dans une file asyncio : un client inactif ne coûte qu'une
+tâche en attente, sans requête ni décodage de jeton.
+
+Le backend est choisi par `EVENEMENTS_BACKEND` (chemin d'une classe, avec
+les arguments de `EVENEMENTS_OPTIONS`) :
+
+- `BackendMemoire` (par défaut) : abonnements du processus. Suffit avec
+  un seul worker ASGI, qui doit alors servir aussi les écritures ;
+- `BackendRedis` : relaie les événements par un canal Redis, pour
+  plusieurs workers ou des écritures faites ailleurs (WSGI, commandes).
+  Nécessite le paquet `redis`.
+
+Un client trop lent perd les événements au-delà de `TAILLE_FILE` ; il se
+resynchronise avec `/communication/compteurs/`.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TAILLE_FILE = 100
+
+
+def _deposer(file, evenement):
+    try:
+        file.put_nowait(evenement)
+    except asyncio.QueueFull:
+        logger.warning("File d'événements pleine, événement abandonné")
+
+
+class BackendMemoire:
+    """Abonnements des connexions ouvertes dans ce processus"""
+
+    def __init__(self):
+        # utilisateur_id -> {(boucle, file)} ; publier est appelé depuis
+        # n'importe quel thread, les files vivent dans leur boucle
+        self._abonnes = defaultdict(set)
+        self._verrou = threading.Lock()
+
+    def publier(self, utilisateur_ids, evenement):
+        with self._verrou:
+            cibles = [
+                abonne
+                for utilisateur_id in set(utilisateur_ids)
+                for abonne in self._abonnes.get(utilisateur_id, ())
+            ]
+        for boucle, file in cibles:
+            try:
+                boucle.call_soon_threadsafe(_deposer, file, evenement)
+            except RuntimeError:
+                # Boucle fermée : la connexion se désabonne d'elle-même
+                pass
+
+    @asynccontextmanager
+    async def abonnement(self, utilisateur_id):
+        """File des événements de `utilisateur_id`, le temps du bloc"""
+        file = asyncio.Queue(maxsize=TAILLE_FILE)
+        abonne = (asyncio.get_running_loop(), file)
+        with self._verrou:
+            self._abonnes[utilisateur_id].add(abonne)
+        try:
+            yield file
+        finally:
+            with self._verrou:
+                self._abonnes[utilisateur_id].discard(abonne)
+                if not self._abonnes[utilisateur_id]:
+                    del self._abonnes[utilisateur_id]
+
+    def nombre_abonnes(self, utilisateur_id):
+        with self._verrou:
+            return len(self._abonnes.get(utilisateur_id, ()))
+
+
+class BackendRedis(BackendMemoire):
+    """
+    Publie sur un canal Redis ; dans chaque processus ASGI, une tâche
+    unique écoute le canal et distribue aux abonnés locaux
+    """
+
+    def __init__(self, url, canal='sira:evenements'):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("BackendRedis nécessite le paquet redis")
+        self.url = url
+        self.canal = canal
+        self._client = redis.Redis.from_url(url)
+        self._ecoutes = {}
+
+    def publier(self, utilisateur_ids, evenement):
+        self._client.publish(self.canal, json.dumps([list(utilisateur_ids), evenement]))
+
+    @asynccontextmanager
+    async def abonnement(self, utilisateur_id):
+        boucle = asyncio.get_running_loop()
+        ecoute = self._ecoutes.get(boucle)
+        if ecoute is None or ecoute.done():
+            self._ecoutes[boucle] = boucle.create_task(self._ecouter())
+        async with super().abonnement(utilisateur_id) as file:
+            yield file
+
+    async def _ecouter(self):
+        from redis import asyncio as redis_async
+
+        client = redis_async.Redis.from_url(self.url)
+        async with client.pubsub() as pubsub:
+            await pubsub.subscribe(self.canal)
+            async for message in pubsub.listen():
+                if message['type'] != 'message':
+                    continue
+                utilisateur_ids, evenement = json.loads(message['data'])
+                BackendMemoire.publier(self, utilisateur_ids, tuple(evenement))
+
+
+@cache
+def backend():
+    classe = import_string(getattr(settings, 'EVENEMENTS_BACKEND', 'sira_backend.evenements.BackendMemoire'))
+    return classe(**getattr(settings, 'EVENEMENTS_OPTIONS', {}))
+
+
+def publier(utilisateur_ids, type_evenement, donnees):
+    """
+    Envoie l'événement `type_evenement` (données sérialisables en JSON) aux
+    connexions de `utilisateur_ids`, une fois la transaction validée
+    """
+    utilisateur_ids = list(utilisateur_ids)
+    if not utilisateur_ids:
+        return
+    evenement = (type_evenement, json.dumps(donnees, cls=DjangoJSONEncoder))
+
+    def envoyer():
+        try:
+            backend().publier(utilisateur_ids, evenement)
+        except Exception:
+            # Le temps réel ne doit jamais faire échouer l'écriture
+            logger.exception("Échec de la publication d'un événement %s", type_evenement)
+
+    transaction.on_commit(envoyer)
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+TABLE = 'mesure_ecritures'
+LIGNES = 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit de transactions d'écriture concurrentes (lecture puis "
+        "mise à jour, comme une saisie de notes) sur la base configurée. "
+        "Utilise une table temporaire, supprimée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ecrivains', type=int, default=8, help="Threads qui écrivent")
+        parser.add_argument('--lecteurs', type=int, default=2, help="Threads qui lisent en continu")
+        parser.add_argument('--duree', type=float, default=5, help="Durée de la mesure, en secondes")
+        parser.add_argument('--base', default='default', help="Alias de la base à mesurer")
+
+    def handle(self, *args, **options):
+        alias = options['base']
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+            cursor.execute(f'CREATE TABLE {TABLE} (id integer PRIMARY KEY, compteur integer, note varchar(20))')
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (id, compteur, note) VALUES (%s, 0, %s)',
+                [(numero, '') for numero in range(LIGNES)]
+            )
+
+        fin = time.monotonic() + options['duree']
+        mesures = {'latences': [], 'echecs': 0, 'lectures': 0}
+        verrou = threading.Lock()
+
+        def ecrire(numero):
+            latences, echecs = [], 0
+            ligne = numero
+            try:
+                while time.monotonic() < fin:
+                    ligne = (ligne + 7) % LIGNES
+                    debut = time.monotonic()
+                    try:
+                        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                            cursor.execute(f'SELECT compteur FROM {TABLE} WHERE id = %s', [ligne])
+                            compteur = cursor.fetchone()[0]
+                            cursor.execute(
+                                f'UPDATE {TABLE} SET compteur = %s, note = %s WHERE id = %s',
+                                [compteur + 1, f'{compteur % 20}.50', ligne]
+                            )
+                    except OperationalError:
+                        # « database is locked » sous SQLite
+                        echecs += 1
+                        continue
+                    latences.append(time.monotonic() - debut)
+            finally:
+                connections[alias].close()
+            with verrou:
+                mesures['latences'] += latences
+                mesures['echecs'] += echecs
+
+        def lire():
+            lectures = 0
+            try:
+                while time.monotonic() < fin:
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute(f'SELECT COUNT(*), SUM(compteur) FROM {TABLE}')
+                        cursor.fetchone()
+                    lectures += 1
+            finally:
+                connections[alias].close()
+            with verrou:
+                mesures['lectures'] += lectures
+
+        threads = [threading.Thread(target=ecrire, args=(numero,)) for numero in range(options['ecrivains'])]
+        threads += [threading.Thread(target=lire) for _ in range(options['lecteurs'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'DROP TABLE {TABLE}')
+
+        latences = sorted(mesures['latences'])
+        duree = options['duree']
+        self.stdout.write(f"Base {alias} ({connections[alias].vendor}), {options['ecrivains']} écrivain(s), "
+                          f"{options['lecteurs']} lecteur(s), {duree:g} s")
+        self.stdout.write(f"  Transactions validées : {len(latences)} ({len(latences) / duree:.0f}/s)")
+        self.stdout.write(f"  Échecs (base verrouillée) : {mesures['echecs']}")
+        self.stdout.write(f"  Lectures : {mesures['lectures'] / duree:.0f}/s")
+        if latences:
+            self.stdout.write(
+                f"  Latence p50 {latences[len(latences) // 2] * 1000:.1f} ms, "
+                f"p95 {latences[int(len(latences) * 0.95)] * 1000:.1f} ms"
+            )
@@ -0,0 +1,165 @@
+"""
+Pagination par curseur (keyset) commune à toutes les API.
+
+Le curseur encode la valeur de *toutes* les colonnes de tri de la dernière
+ligne servie (et non une seule colonne plus un décalage comme le
+`CursorPagination` de DRF). La page suivante est donc obtenue par une
+comparaison lexicographique indexable, quel que soit le nombre de lignes
+partageant la même date ou le même nom.
+"""
+import json
+from functools import reduce
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # Utilisé uniquement si ni la vue ni le queryset ne définissent de tri
+    ordering = '-pk'
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Reprend le tri du queryset de la vue et le complète par la clé
+        primaire pour que chaque position soit unique.
+        """
+        ordering = getattr(view, 'ordering', None) or [
+            champ for champ in queryset.query.order_by if isinstance(champ, str)
+        ] or [self.ordering]
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        ordering = list(ordering)
+        if not any(champ.lstrip('-') in ('pk', 'id') for champ in ordering):
+            ordering.append('-pk' if ordering[0].startswith('-') else 'pk')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        # Les positions étant uniques, le décalage du curseur DRF reste nul
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (reverse, current_position) = (False, None)
+        else:
+            (_, reverse, current_position) = self.cursor
+
+        # Les colonnes de tri portées par une relation sont lues via une
+        # annotation, pour ne pas charger la relation sur la dernière ligne
+        queryset = queryset.annotate(**{
+            _alias(champ): F(champ.lstrip('-'))
+            for champ in self.ordering if '__' in champ
+        })
+
+        if reverse:
+            queryset = queryset.order_by(*_inverser(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self._filtre_apres(current_position, reverse))
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        results = list(queryset[:self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        has_following_position = len(results) > len(self.page)
+        following_position = None
+        if has_following_position:
+            following_position = self._get_position_from_instance(self.page[-1], self.ordering)
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.next_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.previous_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _filtre_apres(self, position, reverse):
+        """
+        Condition « strictement après `position` » dans le sens de lecture :
+        (a > x) OU (a = x ET b > y) OU ...
+        """
+        try:
+            valeurs = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(valeurs, list) or len(valeurs) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        conditions = []
+        egalites = {}
+        for champ, valeur in zip(self.ordering, valeurs):
+            descendant = champ.startswith('-')
+            nom = champ.lstrip('-')
+            operateur = 'lt' if descendant != reverse else 'gt'
+            conditions.append(Q(**egalites, **{f'{nom}__{operateur}': valeur}))
+            egalites[nom] = valeur
+        return reduce(lambda a, b: a | b, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        valeurs = []
+        for champ in ordering:
+            if hasattr(instance, _alias(champ)):
+                valeur = getattr(instance, _alias(champ))
+            else:
+                valeur = instance
+                for attribut in champ.lstrip('-').split('__'):
+                    valeur = getattr(valeur, attribut)
+            valeurs.append(_serialiser(valeur))
+        return json.dumps(valeurs, separators=(',', ':'))
+
+
+def _alias(champ):
+    return '_curseur_' + champ.lstrip('-')
+
+
+def _inverser(ordering):
+    return tuple(champ[1:] if champ.startswith('-') else '-' + champ for champ in ordering)
+
+
+def _serialiser(valeur):
+    if hasattr(valeur, 'isoformat'):
+        return valeur.isoformat()
+    if isinstance(valeur, (str, int, float, bool)) or valeur is None:
+        return valeur
+    return str(valeur)
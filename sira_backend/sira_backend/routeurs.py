@@ -0,0 +1,171 @@
+"""
+Lectures sur des répliques de la base de données.
+
+Les lectures des vues de lecture (GET, HEAD, OPTIONS) des applications de
+`REPLIQUE_APPS` sont envoyées à l'une des bases de `BASES_REPLIQUES` ;
+tout le reste (écritures, transactions, autres vues, commandes) passe par
+la base principale.
+
+Cohérence de lecture après écriture :
+
+- dans une même requête, toute lecture qui suit une écriture se fait sur
+  la base principale ;
+- un utilisateur qui vient d'écrire lit sur la base principale pendant
+  `REPLIQUE_DELAI_COHERENCE` secondes, le temps que les répliques
+  rattrapent leur retard (la marque est partagée par le cache) ;
+- les calculs mis en cache pour tout le monde se font dans
+  `lecture_principale()`, pour ne jamais conserver un état en retard.
+
+Sans réplique configurée, le routeur ne change rien.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+METHODES_LECTURE = ('GET', 'HEAD', 'OPTIONS')
+PREFIXE = 'repliques:ecriture:'
+
+
+@dataclass
+class _Etat:
+    """Routage de la requête en cours"""
+    repliques: bool = False
+    ecrit: bool = False
+
+
+_etat = ContextVar('routage_repliques', default=None)
+
+
+def choisir_replique():
+    return random.choice(settings.BASES_REPLIQUES)
+
+
+@contextmanager
+def lecture_principale():
+    """Force les lectures du bloc sur la base principale"""
+    etat = _etat.get()
+    if etat is None or not etat.repliques:
+        yield
+        return
+    etat.repliques = False
+    try:
+        yield
+    finally:
+        etat.repliques = True
+
+
+class RouteurRepliques:
+
+    def db_for_read(self, model, **hints):
+        etat = _etat.get()
+        if etat is None or not etat.repliques or etat.ecrit:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Une transaction ouverte doit voir ses propres écritures
+            return None
+        return choisir_replique()
+
+    def db_for_write(self, model, **hints):
+        etat = _etat.get()
+        if etat is not None:
+            etat.ecrit = True
+        # Explicite : sans routeur, Django écrirait un objet lu sur une
+        # réplique dans sa base d'origine (`instance._state.db`)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données sur la principale et ses répliques
+        bases = {DEFAULT_DB_ALIAS, *settings.BASES_REPLIQUES}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+
+def identite(request):
+    """
+    Utilisateur à l'origine de la requête, pour la cohérence après écriture.
+    Le jeton JWT est vérifié sans accès à la base ; à défaut, l'utilisateur
+    de la session.
+    """
+    authentification = JWTAuthentication()
+    entete = authentification.get_header(request)
+    brut = authentification.get_raw_token(entete) if entete else None
+    if brut is not None:
+        try:
+            return authentification.get_validated_token(brut)[jwt_settings.USER_ID_CLAIM]
+        except (InvalidToken, TokenError, KeyError):
+            return None
+    utilisateur = getattr(request, 'user', None)
+    if utilisateur is not None and utilisateur.is_authenticated:
+        return utilisateur.pk
+    return None
+
+
+def a_ecrit_recemment(utilisateur):
+    return cache.get(f'{PREFIXE}{utilisateur}') is not None
+
+
+def marquer_ecriture(utilisateur):
+    cache.set(f'{PREFIXE}{utilisateur}', True, timeout=settings.REPLIQUE_DELAI_COHERENCE)
+
+
+def _en_flux(etat, contenu):
+    """Produit `contenu` en rétablissant le routage de la requête à chaque morceau"""
+    iterateur = iter(contenu)
+    while True:
+        # Posé et retiré autour de chaque morceau : sous ASGI, deux morceaux
+        # peuvent être produits dans des contextes différents
+        jeton = _etat.set(etat)
+        try:
+            morceau = next(iterateur)
+        except StopIteration:
+            return
+        finally:
+            _etat.reset(jeton)
+        yield morceau
+
+
+class RepliqueMiddleware:
+    """
+    Décide du routage de chaque requête (voir le module) et retient les
+    utilisateurs qui viennent d'écrire.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        etat = _Etat()
+        jeton = _etat.set(etat)
+        try:
+            response = self.get_response(request)
+        finally:
+            _etat.reset(jeton)
+        if response.streaming and not response.is_async and etat.repliques:
+            # Le contenu d'une réponse en flux est lu après la sortie du middleware
+            response.streaming_content = _en_flux(etat, response.streaming_content)
+        if etat.ecrit and settings.BASES_REPLIQUES:
+            utilisateur = identite(request)
+            if utilisateur is not None:
+                marquer_ecriture(utilisateur)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.BASES_REPLIQUES or request.method not in METHODES_LECTURE:
+            return None
+        vue = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if vue is None or vue.__module__.split('.')[0] not in settings.REPLIQUE_APPS:
+            return None
+        utilisateur = identite(request)
+        if utilisateur is not None and a_ecrit_recemment(utilisateur):
+            return None
+        _etat.get().repliques = True
+        return None
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 
+from .bases import configuration_bases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,7 +48,7 @@ INSTALLED_APPS = [
     'gestion_academique',        # pour la gestion académique
     'frontend',              # Pour servir le frontend
     'docs', # Pour la documentation
-    # 'sira_backend',  # Pour les configurations du backend
+    'sira_backend',  # Pour les configurations du backend (commande mesurer_ecritures)
     'communication',  # Pour les notifications
 ]
 
@@ -57,6 +59,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'sira_backend.routeurs.RepliqueMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,10 +91,24 @@ WSGI_APPLICATION = 'sira_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Base principale et répliques configurées par l'environnement (SIRA_DB_URL,
+# SIRA_DB_REPLIQUES...) : voir sira_backend/bases.py. Par défaut, db.sqlite3
+# en WAL avec connexions persistantes.
+DATABASES = configuration_bases(BASE_DIR / 'db.sqlite3')
+
+# Lectures des vues de ces applications envoyées aux répliques (sira_backend/routeurs.py)
+DATABASE_ROUTERS = ['sira_backend.routeurs.RouteurRepliques']
+BASES_REPLIQUES = [alias for alias in DATABASES if alias != 'default']
+REPLIQUE_APPS = ['gestion_academique', 'communication']
+# Durée (en secondes) pendant laquelle un utilisateur qui vient d'écrire lit sur la base principale
+REPLIQUE_DELAI_COHERENCE = 5
+
+# Le compteur de version des données de référence (gestion_academique.referentiel)
+# passe par ce cache : utiliser un backend partagé (Redis, Memcached) dès que
+# plusieurs processus servent l'API
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -132,6 +149,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Fichiers produits par l'application (PDF des bulletins et relevés)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -143,9 +164,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ),'DEFAULT_PAGINATION_CLASS': None,
-    # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    # 'PAGE_SIZE': 20,
+    ),
+    # Pagination par curseur sur le tri de chaque vue (?page_size= jusqu'à 100)
+    'DEFAULT_PAGINATION_CLASS': 'sira_backend.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -158,5 +180,16 @@ SIMPLE_JWT = {
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # Autoriser React
 ]
+# Exécute les imports CSV d'utilisateurs dans un thread plutôt que dans la requête
+IMPORTS_EN_ARRIERE_PLAN = True
+# Diffuse les notifications de masse (publication des résultats) dans un thread
+NOTIFICATIONS_EN_ARRIERE_PLAN = True
+# Diffusion des événements temps réel (voir sira_backend/evenements.py) ; pour
+# plusieurs workers : 'sira_backend.evenements.BackendRedis' avec
+# EVENEMENTS_OPTIONS = {'url': 'redis://...'}
+EVENEMENTS_BACKEND = 'sira_backend.evenements.BackendMemoire'
+EVENEMENTS_OPTIONS = {}
+# Intervalle (en secondes) entre deux vérifications de la version des données de référence
+REFERENTIEL_DELAI_VERIFICATION = 2
 # Modèle utilisateur personnalisé
 AUTH_USER_MODEL = 'authentification.Utilisateur'